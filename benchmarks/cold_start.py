@@ -0,0 +1,113 @@
+"""
+Measures the cold start of the function worker: the time it takes a fresh
+interpreter to import the cloud function module, with a report of the
+modules that took the longest to import
+
+Usage: python benchmarks/cold_start.py [--runs N] [--top N] [--with-ingress]
+"""
+import argparse
+from dataclasses import dataclass
+import os
+import statistics
+import subprocess  # nosec B404
+import sys
+
+MODULE = 'functions.ayayot.objectstorage_v1'
+PACKAGE = 'functions.'
+
+INGRESS_MODULES = (
+    'ixoncdkingress.function.context',
+    'ixoncdkingress.function.api_client',
+    'ixoncdkingress.function.objectstorage.types',
+)
+"""
+The modules the ingress has imported before it loads the cloud function
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@dataclass
+class ImportTime:
+    """
+    A line of the `-X importtime` output of the interpreter
+    """
+
+    module: str
+    self_us: int
+    cumulative_us: int
+
+def _parse_import_times(output: str) -> list[ImportTime]:
+    times = []
+
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+
+        self_us, cumulative_us, module = line.removeprefix('import time:').split('|')
+        times.append(ImportTime(module.strip(), int(self_us), int(cumulative_us)))
+
+    return times
+
+def measure(with_ingress: bool) -> list[ImportTime]:
+    """
+    Imports the cloud function module in a fresh interpreter, and returns the
+    time it took to import every module
+
+    Without the ingress, the modules of the ingress are imported first, so
+    only the modules loaded by the cloud function itself are measured.
+    """
+    preload = '' if with_ingress else ''.join(f'import {mod}; ' for mod in INGRESS_MODULES)
+
+    result = subprocess.run(  # nosec B603
+        [sys.executable, '-X', 'importtime', '-c', f'{preload}import {MODULE}'],
+        cwd=ROOT,
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+    return _parse_import_times(result.stderr)
+
+def main() -> None:
+    """
+    Runs the benchmark and prints the report
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument(
+        '--with-ingress',
+        action='store_true',
+        help='Also count the modules of the ingress, as in a worker without a warm interpreter',
+    )
+    args = parser.parse_args()
+
+    runs = [measure(args.with_ingress) for _ in range(args.runs)]
+
+    totals = [
+        sum(time.self_us for time in run if args.with_ingress or time.module.startswith(PACKAGE))
+        for run in runs
+    ]
+    own = [sum(time.self_us for time in run if time.module.startswith(PACKAGE)) for run in runs]
+
+    print(f'{MODULE}, {args.runs} runs')
+    print(f'  import time: median {statistics.median(totals) / 1000:.1f} ms, '
+          f'min {min(totals) / 1000:.1f} ms')
+    print(f'  of which {PACKAGE}*: median {statistics.median(own) / 1000:.1f} ms')
+    print()
+
+    print(f'Slowest modules by self time, median of {args.runs} runs:')
+    self_times: dict[str, list[int]] = {}
+    for run in runs:
+        for time in run:
+            self_times.setdefault(time.module, []).append(time.self_us)
+
+    slowest = sorted(
+        ((statistics.median(values), module) for module, values in self_times.items()),
+        reverse=True,
+    )
+    for self_us, module in slowest[:args.top]:
+        print(f'  {self_us / 1000:8.2f} ms  {module}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Compares the size of the authorize_list responses of large asset trees in the
+default format with the compact formats, and how long creating and
+serialising them takes
+
+Usage: python benchmarks/compact.py [--runs N]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from ixoncdkingress.function.context import FunctionResource
+from ixoncdkingress.function.objectstorage.types import PathMapping, ResourceType
+
+from functions.ayayot import compact
+# pylint: enable=wrong-import-position
+
+TREES = ((10, 100), (100, 1_000), (1_000, 10_000), (1_000, 100_000))
+"""
+The amount of assets and documents of the trees
+"""
+
+def create_tree(assets: int, documents: int) -> tuple[list[Any], list[str]]:
+    """
+    Creates the resources and document IDs of a tree of the given size
+    """
+    return (
+        [
+            (
+                FunctionResource(
+                    public_id=f'asset{index:08d}', name='', custom_properties={}, permissions=set(),
+                ),
+                ResourceType.ASSET,
+            )
+            for index in range(assets)
+        ],
+        [f'{index:08x}-0000-4000-8000-000000000000' for index in range(documents)],
+    )
+
+def create_data(resources: list[Any], object_ids: list[str], response_format: str | None) -> Any:
+    """
+    Creates the data of the response authorize_list returns in the given
+    format, as it does
+    """
+    if response_format:
+        return compact.pack(compact.encode(resources, object_ids), response_format)
+
+    return [
+        *(
+            PathMapping(
+                publicId=resource.public_id, type=typ, path=f'assets/{resource.public_id}/',
+            )
+            for resource, typ in resources
+        ),
+        *(
+            PathMapping(publicId=None, type=ResourceType.ASSET, path=f'assets/{object_id}')
+            for object_id in object_ids
+        ),
+    ]
+
+def measure(
+    tree: tuple[list[Any], list[str]],
+    response_format: str | None,
+    runs: int,
+) -> tuple[int, float]:
+    """
+    Creates and serialises the response in the given format the given amount
+    of times, and returns its size in bytes and the median time in ms
+    """
+    times: list[float] = []
+    body = ''
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        body = json.dumps({'result': 'success', 'data': create_data(*tree, response_format)})
+        times.append(time.perf_counter() - start)
+
+    return len(body.encode()), statistics.median(times) * 1000
+
+def main() -> None:
+    """
+    Runs the benchmark and prints the report
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    formats = (None, compact.COMPACT, compact.COMPACT_GZIP)
+    print(f'{"tree":>14} | ' + ' | '.join(f'{str(name or "default"):>22}' for name in formats))
+
+    for assets, documents in TREES:
+        tree = create_tree(assets, documents)
+        results = [measure(tree, name, args.runs) for name in formats]
+
+        print(f'{assets:>6}/{documents:<7} | ' + ' | '.join(
+            f'{size / 1024:10.1f}KiB {ms:7.1f}ms' for size, ms in results
+        ))
+
+    print()
+    print('tree: the amount of assets/documents')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Compares decoding app configs inline with decoding them in the process pool,
+at several payload sizes
+
+For every size, this reports how long decoding a payload takes, and how long
+decoding a small payload takes in another thread meanwhile, which is what
+other calls of the worker wait for while a large app config is decoded.
+
+Usage: python benchmarks/decoding.py [--runs N] [--processes N]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable-next=wrong-import-position
+from functions.ayayot import decoding
+
+SIZES = (10_000, 100_000, 1_000_000, 10_000_000)
+"""
+The approximate sizes in characters of the payloads
+"""
+
+SMALL = json.dumps([{'id': f'small-{index}', 'name': f'Small {index}'} for index in range(10)])
+
+def create_payload(size: int) -> str:
+    """
+    Creates the values of an app config of approximately the given size
+    """
+    item = {'id': '00000000-0000-0000-0000-000000000000', 'name': 'Manual 0000', 'size': 1}
+    count = max(size // len(json.dumps(item)), 1)
+
+    return json.dumps([
+        {'id': f'{index:08x}-0000-0000-0000-000000000000', 'name': f'Manual {index}', 'size': index}
+        for index in range(count)
+    ])
+
+def _median_ms(times: list[float]) -> float:
+    return statistics.median(times) * 1000
+
+def measure(payload: str, runs: int) -> tuple[float, float]:
+    """
+    Decodes the payload the given amount of times, while decoding the small
+    payload in another thread, and returns the median time of the payload and
+    the longest time of the small payload in ms
+    """
+    large_times: list[float] = []
+    small_times: list[float] = []
+    done = threading.Event()
+
+    def decode_small() -> None:
+        # Includes the time waited for the GIL after sleeping, not just the
+        # time spent decoding once it is held
+        while not done.is_set():
+            start = time.perf_counter()
+            time.sleep(0.001)
+            decoding.decode_objects(SMALL, None)
+            small_times.append(time.perf_counter() - start - 0.001)
+
+    thread = threading.Thread(target=decode_small)
+    thread.start()
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        decoding.decode_objects(payload, None)
+        large_times.append(time.perf_counter() - start)
+
+    done.set()
+    thread.join()
+
+    return _median_ms(large_times), max(small_times) * 1000
+
+def main() -> None:
+    """
+    Runs the benchmark and prints the report
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--processes', type=int, default=2)
+    args = parser.parse_args()
+
+    decoding.PROCESSES = args.processes
+
+    print(f'{"size":>10} | {"inline":>10} {"waited":>10} | {"offloaded":>10} {"waited":>10}')
+
+    for size in SIZES:
+        payload = create_payload(size)
+
+        decoding.OFFLOAD_THRESHOLD = 0
+        inline = measure(payload, args.runs)
+
+        decoding.OFFLOAD_THRESHOLD = len(SMALL) + 1
+        decoding.decode_objects(payload, None)  # Starts the process pool
+        offloaded = measure(payload, args.runs)
+
+        print(
+            f'{len(payload):>10} | {inline[0]:8.1f}ms {inline[1]:8.1f}ms '
+            f'| {offloaded[0]:8.1f}ms {offloaded[1]:8.1f}ms'
+        )
+
+    decoding.shutdown()
+    print()
+    print('waited: the longest a small decode took while the large ones ran')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""
+Replays recorded IXON API traffic through authorize_list and the lookups of
+authorize_download, without a network
+
+The recording is made by a worker with `OBJECTSTORAGE_RECORD_PATH` set. Every
+asset of which the descendants were requested is replayed as a target, and
+the documents in the app configs requested after it are looked up. The API
+calls take their recorded time multiplied by the scale, 0 answers them right
+away.
+
+Usage: python benchmarks/replay.py RECORDING [--scale X] [--runs N] [--lookups N] [--cold]
+"""
+import argparse
+from collections import defaultdict
+import functools
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from typing import Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from ixoncdkingress.function.context import FunctionContext, FunctionResource
+
+from functions.ayayot import cache, metrics, objectstorage_v1
+# pylint: enable=wrong-import-position
+
+_TEMPLATE = re.compile(r'eq\(app\.publicId,"([^"]*)"\)')
+
+def _key(url_name: str, url_args: Any, query: Any) -> str:
+    return json.dumps([url_name, url_args, query], sort_keys=True)
+
+class ReplayApiClient:  # pylint: disable=too-few-public-methods
+    """
+    Answers API calls with the recorded responses, taking the recorded time
+    multiplied by the scale
+    """
+
+    def __init__(self, calls: list[dict[str, Any]], scale: float) -> None:
+        self.scale = scale
+        self.misses = 0
+        self._responses: dict[str, list[tuple[float, Any]]] = defaultdict(list)
+
+        for call in calls:
+            self._responses[_key(call['endpoint'], call['url_args'], call['query'])].append(
+                (call['seconds'], call['response']),
+            )
+
+    def get(
+            self,
+            url_name: str,
+            url_args: dict[str, str] | None = None,
+            query: dict[str, Any] | None = None,
+            **_kwargs: Any,
+        ) -> Any:
+        """
+        Answers a call like `ApiClient.get`, with the first recorded response
+        of the same request, or an error without data if it was not recorded
+        """
+        if not (responses := self._responses.get(_key(url_name, url_args, query))):
+            self.misses += 1
+            return {'type': 'Error', 'status': 'error', 'data': []}
+
+        seconds, response = responses[0]
+        if self.scale > 0:
+            time.sleep(seconds * self.scale)
+
+        return response
+
+def find_targets(calls: list[dict[str, Any]]) -> tuple[str | None, dict[str, list[str]]]:
+    """
+    Returns the template of the recorded app configs, and the recorded
+    targets with the IDs of the documents in the app configs requested after
+    them
+    """
+    template_id = None
+    targets: dict[str, list[str]] = {}
+    target = None
+
+    for call in calls:
+        if call['endpoint'] == 'AssetDescendantList':
+            target = call['url_args']['publicId']
+            targets.setdefault(target, [])
+            continue
+
+        for value in (call['query'] or {}).get('filters', []):
+            if match := _TEMPLATE.search(value):
+                template_id = match[1]
+
+        if target is not None:
+            targets[target].extend(
+                item['id']
+                for app in call['response'].get('data') or []
+                for field in ('values', 'stateValues')
+                for item in json.loads(app.get(field) or '[]')
+                if isinstance(item, dict) and 'id' in item
+            )
+
+    return template_id, targets
+
+def create_context(api_client: Any, template_id: str, target: str) -> FunctionContext:
+    """
+    Creates the context of a call by a company admin for the given asset
+    """
+    def resource(public_id: str) -> FunctionResource:
+        return FunctionResource(public_id, public_id, {}, {'COMPANY_ADMIN'})
+
+    return FunctionContext(
+        config={},
+        api_client=api_client,
+        mongo_client=None,
+        user=resource('user'),
+        company=resource('company'),
+        asset=resource(target),
+        agent=None,
+        template=resource(template_id),
+        document_db_collection_name='',
+    )
+
+def _report(name: str, times: list[float]) -> None:
+    times = sorted(times)
+    print(
+        f'{name:<20} {len(times):>6} {statistics.median(times) * 1000:9.2f}ms '
+        f'{times[int(len(times) * 0.95)] * 1000:9.2f}ms {sum(times):9.2f}s'
+    )
+
+def replay(
+        api_client: ReplayApiClient,
+        template_id: str,
+        targets: dict[str, list[str]],
+        args: argparse.Namespace,
+    ) -> dict[str, list[float]]:
+    """
+    Replays the calls for all targets, and returns the times they took by
+    function
+    """
+    authorize_single = objectstorage_v1._authorize_single  # pylint: disable=protected-access
+    times: dict[str, list[float]] = {'authorize_list': [], '_authorize_single': []}
+
+    for _ in range(args.runs):
+        for target, uuids in targets.items():
+            context = create_context(api_client, template_id, target)
+            lookups = [
+                ('authorize_list', functools.partial(objectstorage_v1.authorize_list, context)),
+                *(
+                    ('_authorize_single', functools.partial(authorize_single, context, uuid, False))
+                    for uuid in uuids[:args.lookups]
+                ),
+            ]
+
+            for name, call in lookups:
+                if args.cold:
+                    cache.clear_all()
+
+                start = time.perf_counter()
+                call()
+                times[name].append(time.perf_counter() - start)
+
+    return times
+
+def main() -> None:
+    """
+    Runs the replay and prints the report
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('recording')
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--runs', type=int, default=1)
+    parser.add_argument('--lookups', type=int, default=5, help='documents looked up per target')
+    parser.add_argument('--cold', action='store_true', help='clear the caches before every call')
+    args = parser.parse_args()
+
+    with open(args.recording, encoding='utf-8') as file:
+        calls = [json.loads(line) for line in file if line.strip()]
+
+    template_id, targets = find_targets(calls)
+    if template_id is None or not targets:
+        sys.exit('The recording has no asset descendant and app config calls')
+
+    api_client = ReplayApiClient(calls, args.scale)
+    times = replay(api_client, template_id, targets, args)
+
+    print(f'{len(targets)} targets, {len(calls)} recorded calls, scale {args.scale}')
+    print(f'{"function":<20} {"calls":>6} {"median":>11} {"p95":>11} {"total":>10}')
+    for name, function_times in times.items():
+        if function_times:
+            _report(name, function_times)
+
+    print()
+    print(f'unrecorded requests: {api_client.misses}')
+    for name, value in sorted(metrics.snapshot().items()):
+        if name.startswith(('api.calls.', 'cache.', 'deadline.')):
+            print(f'{name}: {value:g}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Measures how the throughput of authorize_list scales with the amount of
+worker processes, forked from a warmed process like tools/prefork.py does
+
+The workers call authorize_list for the targets of a generated tree of
+assets and documents, of which the lookups are cached before forking, so the
+calls only do the CPU-bound work of creating the mappings. Expect the
+throughput to scale up to the amount of cores.
+
+Usage: python benchmarks/throughput.py [--workers N,...] [--seconds N]
+    [--assets N] [--documents N]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from typing import Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from ixoncdkingress.function.context import FunctionContext
+
+from benchmarks.replay import create_context
+from functions.ayayot import objectstorage_v1
+# pylint: enable=wrong-import-position
+
+TEMPLATE_ID = 'template01'
+TARGETS = ('asset00000000', 'asset00000001', 'asset00000002', 'asset00000003')
+
+class TreeApiClient:  # pylint: disable=too-few-public-methods
+    """
+    Answers the API calls for the descendants and app configs of a generated
+    tree, in which every target has the same descendants
+    """
+
+    def __init__(self, assets: int, documents: int) -> None:
+        self.descendants = [
+            {'publicId': f'asset{index:08d}', 'name': f'Asset {index}'}
+            for index in range(len(TARGETS), assets)
+        ]
+        per_asset = max(documents // max(assets, 1), 1)
+        self.values = {
+            f'asset{index:08d}': json.dumps([
+                {'id': f'{index:08x}-{item:04x}-4000-8000-000000000000', 'name': f'Manual {item}'}
+                for item in range(per_asset)
+            ])
+            for index in range(assets)
+        }
+
+    def get(
+            self,
+            url_name: str,
+            url_args: dict[str, str] | None = None,
+            query: dict[str, Any] | None = None,
+            **_kwargs: Any,
+        ) -> Any:
+        """
+        Answers a call like `ApiClient.get`
+        """
+        del url_args
+
+        if url_name == 'AssetDescendantList':
+            return {'status': 'success', 'data': self.descendants}
+
+        asset_ids = (query or {})['filters'][1].removeprefix('in(asset.publicId,').removesuffix(')')
+        return {'status': 'success', 'data': [
+            {'asset': {'publicId': asset_id}, 'values': self.values[asset_id], 'stateValues': None}
+            for asset_id in (asset_id.strip('"') for asset_id in asset_ids.split(','))
+        ]}
+
+def work(contexts: list[FunctionContext], seconds: float, calls: Any) -> None:
+    """
+    Calls authorize_list for the targets in turn for the given seconds, and
+    adds the amount of calls to the shared counter
+    """
+    count = 0
+    deadline = time.monotonic() + seconds
+
+    while time.monotonic() < deadline:
+        objectstorage_v1.authorize_list(contexts[count % len(contexts)])
+        count += 1
+
+    with calls.get_lock():
+        calls.value += count
+
+def measure(contexts: list[FunctionContext], workers: int, seconds: float) -> float:
+    """
+    Runs the given amount of forked workers, and returns the calls per second
+    of all of them together
+    """
+    context = multiprocessing.get_context('fork')
+    calls: Any = context.Value('q', 0)
+
+    processes = [
+        context.Process(target=work, args=(contexts, seconds, calls)) for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    return calls.value / seconds
+
+def main() -> None:
+    """
+    Runs the benchmark and prints the report
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', default=None, help='the worker counts, comma separated')
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--assets', type=int, default=100)
+    parser.add_argument('--documents', type=int, default=5000)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    counts = [
+        int(count) for count in args.workers.split(',')
+    ] if args.workers else sorted({1, 2, 4, cores})
+
+    api_client = TreeApiClient(args.assets, args.documents)
+    contexts = [create_context(api_client, TEMPLATE_ID, target) for target in TARGETS]
+
+    # Warms the caches before forking, as tools/prefork.py does
+    for context in contexts:
+        objectstorage_v1.authorize_list(context)
+
+    print(f'{cores} cores, {args.assets} assets, {args.documents} documents')
+    print(f'{"workers":>7} {"calls/s":>10} {"speedup":>8}')
+
+    single = None
+    for workers in counts:
+        rate = measure(contexts, workers, args.seconds)
+        single = single or rate
+        print(f'{workers:>7} {rate:10.1f} {rate / single:7.2f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+import type { FileList } from '../types';
+
+/**
+ * A document list as it was last shown for a target, along with the version
+ * token the `list_documents` cloud function returned for it.
+ */
+export type CachedDocumentList = {
+  version: string | null;
+  locale: string;
+  total: number;
+  files: FileList;
+};
+
+/**
+ * The user and company the cached lists were shown to. Lists are only shown
+ * to the identity that stored them, as the documents a user may see depend
+ * on their permissions.
+ */
+export type CacheIdentity = {
+  companyId: string;
+  userId: string;
+};
+
+const DATABASE_NAME = 'document-management';
+const DATABASE_VERSION = 2;
+const STORE_NAME = 'document-lists';
+const IDENTITY_STORE_NAME = 'identity';
+const IDENTITY_KEY = 'current';
+
+let database: Promise<IDBDatabase> | null = null;
+
+function request<T>(req: IDBRequest<T>): Promise<T> {
+  return new Promise((resolve, reject) => {
+    req.onsuccess = () => resolve(req.result);
+    req.onerror = () => reject(req.error);
+  });
+}
+
+function openDatabase(): Promise<IDBDatabase> {
+  if (!database) {
+    const req = indexedDB.open(DATABASE_NAME, DATABASE_VERSION);
+    req.onupgradeneeded = () => {
+      // The first version kept the lists by target alone, whoever stored them
+      const db = req.result;
+      Array.from(db.objectStoreNames).forEach(name => db.deleteObjectStore(name));
+      db.createObjectStore(STORE_NAME);
+      db.createObjectStore(IDENTITY_STORE_NAME);
+    };
+    database = request(req);
+    database.catch(() => (database = null));
+  }
+  return database;
+}
+
+async function store(mode: IDBTransactionMode): Promise<IDBObjectStore> {
+  return (await openDatabase()).transaction(STORE_NAME, mode).objectStore(STORE_NAME);
+}
+
+/**
+ * Returns the key of the cached document list of a target, as shown to the
+ * given identity.
+ *
+ * @param identity the user and company the list is shown to
+ * @param target the public ID of the target
+ * @return the key to read and store the list by
+ */
+export function cachedListKey(identity: CacheIdentity, target: string): string {
+  return `${identity.companyId}/${identity.userId}/${target}`;
+}
+
+/**
+ * Removes the cached document lists of the previous identity when another
+ * user or company is shown the component, or all of them when nobody is
+ * logged in, so no list outlives the session it was loaded in.
+ *
+ * @param identity the current user and company, or null after a logout
+ */
+export async function switchCacheIdentity(identity: CacheIdentity | null): Promise<void> {
+  try {
+    const transaction = (await openDatabase()).transaction(
+      [STORE_NAME, IDENTITY_STORE_NAME],
+      'readwrite',
+    );
+    const identities = transaction.objectStore(IDENTITY_STORE_NAME);
+    const previous = (await request(identities.get(IDENTITY_KEY))) as CacheIdentity | undefined;
+    if (
+      identity &&
+      previous?.companyId === identity.companyId &&
+      previous?.userId === identity.userId
+    ) {
+      return;
+    }
+
+    transaction.objectStore(STORE_NAME).clear();
+    if (identity) {
+      identities.put(identity, IDENTITY_KEY);
+    } else {
+      identities.delete(IDENTITY_KEY);
+    }
+    await new Promise<void>((resolve, reject) => {
+      transaction.oncomplete = () => resolve();
+      transaction.onerror = () => reject(transaction.error);
+      transaction.onabort = () => reject(transaction.error);
+    });
+  } catch (e) {
+    // Nothing to do
+  }
+}
+
+/**
+ * Reads the cached document list of a target. The cache is only an
+ * optimization, so it is treated as empty when it cannot be read, such as in
+ * a private window.
+ *
+ * @param key the key of the list, see `cachedListKey`
+ * @return the cached list, or null if there is none
+ */
+export async function readCachedList(key: string): Promise<CachedDocumentList | null> {
+  try {
+    const req = (await store('readonly')).get(key);
+    return ((await request(req)) as CachedDocumentList | undefined) ?? null;
+  } catch (e) {
+    return null;
+  }
+}
+
+/**
+ * Stores the document list of a target, replacing the cached one.
+ *
+ * @param key the key of the list, see `cachedListKey`
+ * @param list the list to store
+ */
+export async function writeCachedList(key: string, list: CachedDocumentList): Promise<void> {
+  try {
+    await request((await store('readwrite')).put(list, key));
+  } catch (e) {
+    // The list is loaded from the cloud function next time
+  }
+}
+
+/**
+ * Removes the cached document list of a target.
+ *
+ * @param key the key of the list, see `cachedListKey`
+ */
+export async function deleteCachedList(key: string): Promise<void> {
+  try {
+    await request((await store('readwrite')).delete(key));
+  } catch (e) {
+    // Nothing to do
+  }
+}
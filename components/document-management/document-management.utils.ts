@@ -1,3 +1,7 @@
+import type { ObjectStorageObjectMeta } from '@ixon-cdk/types';
+
+import type { DocumentMeta, FileList, FileListEntry, SortKey } from './types';
+
 /**
  * Ensures `filename` is unique among `files`. If `filename` already exists in
  * the `files` list, will append "` (n)`" before the file's extension. It will
@@ -33,3 +37,154 @@ export function createUniqueFilename(filename: string, files: string[] = []): st
 
   return newFilename.trim();
 }
+
+/**
+ * Converts the metadata of a document, as returned by the cloud function, to
+ * the metadata the object storage client uses to download or delete it.
+ *
+ * @param document the metadata of the document
+ * @return the object storage metadata of the document
+ */
+export function documentToObjectMeta(document: DocumentMeta): ObjectStorageObjectMeta {
+  return {
+    uuid: document.id,
+    size: document.size ?? undefined,
+    tags: {
+      name: document.name ?? document.id,
+    },
+  };
+}
+
+/**
+ * Whether an entry of a file list still shows the given document as it is,
+ * so it can be kept instead of created anew.
+ */
+function isSameDocument(entry: FileListEntry, document: DocumentMeta): boolean {
+  return (
+    entry.meta.uuid === document.id &&
+    entry.meta.size === (document.size ?? undefined) &&
+    entry.name === (document.name ?? document.id) &&
+    entry.sortKey[0] === (document.order === null ? 1 : 0) &&
+    entry.sortKey[1] === (document.order ?? 0)
+  );
+}
+
+/**
+ * Creates the file list of the given documents, keeping the entries of the
+ * previous list for the documents that did not change, so only the added
+ * and changed documents are formatted again.
+ *
+ * @param previous the previous file list
+ * @param documents the documents, in the order they are to be listed
+ * @param create creates the entry of an added or changed document
+ * @return the file list of the documents
+ */
+export function updateFileList(
+  previous: FileList,
+  documents: Array<DocumentMeta>,
+  create: (document: DocumentMeta) => FileListEntry,
+): FileList {
+  const entries = new Map(previous.map(entry => [entry.meta.uuid, entry]));
+
+  return documents.map(document => {
+    const entry = entries.get(document.id);
+    return entry && isSameDocument(entry, document) ? entry : create(document);
+  });
+}
+
+/**
+ * Creates the key to sort a file by, so it is computed once per file instead
+ * of on every comparison. Numbers in the name are sorted by value, so "2"
+ * comes before "10", and files without an order come after those with one.
+ *
+ * @param name the name of the file
+ * @param uuid the uuid of the file
+ * @param order the order of the file, if any
+ * @return the sort key of the file
+ */
+export function createSortKey(name: string, uuid: string, order: number | null = null): SortKey {
+  const chunks = name
+    .toLowerCase()
+    .split(/(\d+)/)
+    .filter(chunk => chunk !== '')
+    .map(chunk => (/^\d+$/.test(chunk) ? parseInt(chunk, 10) : chunk));
+
+  return [order === null ? 1 : 0, order ?? 0, chunks, uuid];
+}
+
+function compareValues(a: number | string, b: number | string): number {
+  if (typeof a !== typeof b) {
+    return typeof a === 'number' ? -1 : 1;
+  }
+  return a < b ? -1 : a > b ? 1 : 0;
+}
+
+/**
+ * Compares two sort keys, as created by `createSortKey`.
+ */
+export function compareSortKeys(a: SortKey, b: SortKey): number {
+  const [aUnordered, aOrder, aChunks, aUuid] = a;
+  const [bUnordered, bOrder, bChunks, bUuid] = b;
+
+  const result = compareValues(aUnordered, bUnordered) || compareValues(aOrder, bOrder);
+  if (result) {
+    return result;
+  }
+
+  for (let i = 0; i < Math.min(aChunks.length, bChunks.length); i++) {
+    const chunkResult = compareValues(aChunks[i], bChunks[i]);
+    if (chunkResult) {
+      return chunkResult;
+    }
+  }
+
+  return compareValues(aChunks.length, bChunks.length) || compareValues(aUuid, bUuid);
+}
+
+/**
+ * Finds the index at which `key` is to be inserted in a list that is sorted
+ * by `compareSortKeys`, using a binary search.
+ *
+ * @param list the sorted list
+ * @param key the sort key of the entry that is to be inserted
+ * @return the index of the first entry that sorts after `key`
+ */
+export function sortedIndex(list: Array<{ sortKey: SortKey }>, key: SortKey): number {
+  let low = 0;
+  let high = list.length;
+  while (low < high) {
+    const middle = (low + high) >>> 1;
+    if (compareSortKeys(list[middle].sortKey, key) <= 0) {
+      low = middle + 1;
+    } else {
+      high = middle;
+    }
+  }
+  return low;
+}
+
+/**
+ * Computes which rows of a virtualized list are to be rendered.
+ *
+ * @param scrollTop the scroll position of the list
+ * @param viewportHeight the height of the visible part of the list
+ * @param rowHeight the height of a single row
+ * @param count the amount of rows in the list
+ * @param overscan the amount of rows to render before and after the visible ones
+ * @return the index of the first row to render, and the index after the last
+ */
+export function visibleRange(
+  scrollTop: number,
+  viewportHeight: number,
+  rowHeight: number,
+  count: number,
+  overscan: number,
+): { start: number; end: number } {
+  const first = Math.floor(scrollTop / rowHeight);
+  const visible = Math.ceil(viewportHeight / rowHeight);
+
+  return {
+    start: Math.min(Math.max(first - overscan, 0), count),
+    end: Math.min(first + visible + overscan, count),
+  };
+}
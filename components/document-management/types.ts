@@ -1,9 +1,48 @@
 import type { ObjectStorageObjectMeta } from '@ixon-cdk/types';
 
+/**
+ * The key a file list is sorted by: whether the file has no order, its order,
+ * the chunks of its name with the numbers in it parsed, and its uuid. Mirrors
+ * the order in which the `list_documents` cloud function returns documents.
+ */
+export type SortKey = [number, number, Array<number | string>, string];
+
 export type FileListEntry = {
   meta: ObjectStorageObjectMeta;
   name: string;
   size: string;
+  sortKey: SortKey;
 };
 
 export type FileList = Array<FileListEntry>;
+
+/**
+ * The metadata of a document, as returned by the `list_documents` cloud
+ * function.
+ */
+export type DocumentMeta = {
+  id: string;
+  path: string;
+  name: string | null;
+  order: number | null;
+  size: number | null;
+  type: string | null;
+  category: string | null;
+};
+
+/**
+ * The response of the `list_documents` cloud function. When it is called with
+ * the `version` of the list the caller has, and that is still current, it is
+ * marked `unchanged` and has no documents.
+ */
+export type DocumentListResponse = {
+  result: 'success';
+  data: {
+    mappings: Array<{ publicId: string | null; path: string; type: string }>;
+    documents: Array<DocumentMeta>;
+    total: number;
+    version: string;
+    unchanged?: true;
+  };
+  partial?: true;
+};
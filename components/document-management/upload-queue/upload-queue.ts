@@ -0,0 +1,114 @@
+export type UploadStatus = 'queued' | 'uploading' | 'done' | 'failed';
+
+export type UploadTask = {
+  id: number;
+  file: File;
+  name: string;
+  status: UploadStatus;
+  attempts: number;
+};
+
+/**
+ * Uploads files with a bounded amount of uploads at once. A failed upload is
+ * retried with an exponential backoff, until it failed `maxAttempts` times,
+ * after which it can be retried by hand.
+ */
+export class UploadQueue {
+  private tasks: Array<UploadTask> = [];
+  private running = 0;
+  private nextId = 0;
+
+  /**
+   * @param upload uploads the file of a task
+   * @param onChange is called with all tasks whenever one of them changed
+   * @param onIdle is called when the last running upload finished
+   * @param concurrency the maximum amount of uploads at once
+   * @param maxAttempts the amount of times an upload is attempted
+   */
+  constructor(
+    private readonly upload: (task: UploadTask) => Promise<void>,
+    private readonly onChange: (tasks: Array<UploadTask>) => void,
+    private readonly onIdle: () => void,
+    private readonly concurrency = 3,
+    private readonly maxAttempts = 3,
+  ) {}
+
+  /**
+   * Queues the given files, stored under the given names. Rejected files are
+   * listed as failed right away.
+   */
+  add(files: Array<{ file: File; name: string; rejected?: boolean }>): void {
+    for (const { file, name, rejected } of files) {
+      this.tasks.push({
+        id: this.nextId++,
+        file,
+        name,
+        status: rejected ? 'failed' : 'queued',
+        attempts: 0,
+      });
+    }
+    this.changed();
+    this.next();
+  }
+
+  /**
+   * Queues a failed upload again.
+   */
+  retry(task: UploadTask): void {
+    if (task.status !== 'failed') {
+      return;
+    }
+    task.status = 'queued';
+    task.attempts = 0;
+    this.changed();
+    this.next();
+  }
+
+  /**
+   * Removes the uploads that are done from the list of tasks.
+   */
+  clearDone(): void {
+    this.tasks = this.tasks.filter(task => task.status !== 'done');
+    this.changed();
+  }
+
+  private next(): void {
+    while (this.running < this.concurrency) {
+      const task = this.tasks.find(t => t.status === 'queued');
+      if (!task) {
+        return;
+      }
+      task.status = 'uploading';
+      this.running++;
+      this.changed();
+      this.run(task).finally(() => {
+        this.running--;
+        this.changed();
+        if (this.running === 0 && !this.tasks.some(t => t.status === 'queued')) {
+          this.onIdle();
+        }
+        this.next();
+      });
+    }
+  }
+
+  private async run(task: UploadTask): Promise<void> {
+    while (task.attempts < this.maxAttempts) {
+      task.attempts++;
+      try {
+        await this.upload(task);
+        task.status = 'done';
+        return;
+      } catch (e) {
+        if (task.attempts < this.maxAttempts) {
+          await new Promise(resolve => setTimeout(resolve, 1000 * 2 ** (task.attempts - 1)));
+        }
+      }
+    }
+    task.status = 'failed';
+  }
+
+  private changed(): void {
+    this.onChange([...this.tasks]);
+  }
+}
@@ -0,0 +1,164 @@
+"""
+Calls to the IXON API, shared by everything in this function worker
+"""
+import hashlib
+import time
+from typing import Any
+
+from ixoncdkingress.function.api_client import ApiClient, ServerResponse
+import requests  # type: ignore[import-untyped]
+
+from . import deadline, metrics, recording, settings
+from .breaker import CircuitBreakers, CircuitOpenError
+from .ratelimit import Limit, RateLimiter, backoff_delay, parse_limits
+
+LIMITER = RateLimiter(
+    Limit.parse(settings.get_str('RATE_LIMIT_DEFAULT', '20/40')) or Limit(20, 40),
+    parse_limits(settings.get_str('RATE_LIMITS', '')),
+)
+"""
+The rate limiter of all API calls of this worker
+"""
+
+BREAKERS = CircuitBreakers(
+    settings.get_int('BREAKER_THRESHOLD', 5),
+    settings.get_float('BREAKER_SLOW_CALL', 5.0),
+    settings.get_float('BREAKER_OPEN_SECONDS', 30.0),
+)
+"""
+The circuit breakers of all API calls of this worker
+"""
+
+MAX_RETRIES = settings.get_int('API_MAX_RETRIES', 3)
+BACKOFF_BASE = settings.get_float('API_BACKOFF_BASE', 0.2)
+BACKOFF_CAP = settings.get_float('API_BACKOFF_CAP', 5.0)
+
+RATE_LIMITED_MESSAGES = ('too many requests', 'rate limit')
+
+class ApiError(Exception):
+    """
+    Raised when the IXON API answers a request with an error
+    """
+
+def data(response: ServerResponse) -> Any:
+    """
+    Returns the data of the given response
+
+    Raises ApiError when the response is an error, so its messages are not
+    taken for data, nor cached as such.
+    """
+    if response.get('status') == 'error':
+        raise ApiError('; '.join(
+            str(error.get('message', ''))
+            for error in response.get('data') or []
+            if isinstance(error, dict)
+        ))
+
+    return response['data']
+
+def is_rate_limited(response: ServerResponse) -> bool:
+    """
+    Checks whether the response is an error telling that the caller is being
+    rate limited
+    """
+    if response.get('status') != 'error':
+        return False
+
+    return any(
+        phrase in str(error.get('message', '')).lower()
+        for error in response.get('data') or []
+        if isinstance(error, dict)
+        for phrase in RATE_LIMITED_MESSAGES
+    )
+
+def caller_scope(company_id: str, api_client: ApiClient) -> str:
+    """
+    Returns the scope of what the given client may see of the given company,
+    which identifies its credentials by a digest, so they are not kept around
+    or shared with other workers
+    """
+    # The client does not expose its headers, and a client without any has
+    # the scope of the company alone
+    headers: dict[str, str] = getattr(api_client, '_default_headers', None) or {}
+    authorization = headers.get('Authorization', '')
+
+    return hashlib.sha256(f'{company_id}\n{authorization}'.encode()).hexdigest()[:32]
+
+def get(api_client: ApiClient, url_name: str, *args: Any, **kwargs: Any) -> ServerResponse:
+    """
+    Performs a GET request through the given client, waiting for the rate
+    limiter first, and retrying with backoff while the server rate limits
+
+    The time spent waiting is counted in the `api.throttled_seconds` metrics.
+
+    Raises CircuitOpenError without calling the endpoint while its circuit
+    breaker is open. Within a call with a deadline, the request may only take
+    the time left, and DeadlineExceeded is raised when it is used up.
+    """
+    bucket = LIMITER.bucket(url_name)
+
+    attempt = 0
+    while True:
+        throttled = LIMITER.acquire(url_name)
+
+        response = _call(api_client, url_name, *args, **kwargs)
+
+        if not is_rate_limited(response):
+            bucket.speed_up()
+            _count_throttled(url_name, throttled)
+            return response
+
+        metrics.increment(f'api.rate_limited.{url_name}')
+        bucket.slow_down()
+
+        delay = backoff_delay(attempt, BACKOFF_BASE, BACKOFF_CAP)
+
+        # Retrying is pointless when no time would be left after the backoff
+        if attempt >= MAX_RETRIES or ((left := deadline.remaining()) is not None and left <= delay):
+            _count_throttled(url_name, throttled)
+            return response
+
+        time.sleep(delay)
+        _count_throttled(url_name, throttled + delay)
+        attempt += 1
+
+def _call(api_client: ApiClient, url_name: str, *args: Any, **kwargs: Any) -> ServerResponse:
+    """
+    Performs a single GET request, through the circuit breaker of the endpoint,
+    and records it when recording
+    """
+    breaker = BREAKERS.breaker(url_name)
+
+    # Checked before the breaker, as a half-open breaker lets this call
+    # through as its probe, which only ends once the call is recorded
+    if (timeout := deadline.timeout()) is not None:
+        kwargs.setdefault('timeout', timeout)
+
+    if not breaker.allow():
+        metrics.increment(f'api.short_circuited.{url_name}')
+        raise CircuitOpenError(url_name)
+
+    start = time.monotonic()
+    failed = True
+    try:
+        response = api_client.get(url_name, *args, **kwargs)
+        failed = False
+    except requests.Timeout as exception:
+        if timeout is None:
+            raise
+        raise deadline.DeadlineExceeded() from exception
+    finally:
+        seconds = time.monotonic() - start
+        if breaker.record(seconds, failed):
+            metrics.increment(f'api.breaker_opened.{url_name}')
+        metrics.increment(f'api.calls.{url_name}')
+
+    if recording.RECORDER is not None:
+        recording.RECORDER.record(url_name, (args, kwargs), seconds, response)
+
+    return response
+
+def _count_throttled(url_name: str, seconds: float) -> None:
+    if seconds > 0:
+        metrics.increment('api.throttled_seconds', seconds)
+        metrics.increment(f'api.throttled_seconds.{url_name}', seconds)
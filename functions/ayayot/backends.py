@@ -0,0 +1,504 @@
+"""
+Backends that share cached lookups between the worker processes
+
+A backend stores opaque values by key, each with a time to live and a set of
+tags, so all values with a tag can be evicted at once. It also keeps sets of
+marks, members with the time they were last marked, which the workers poll
+for the marks added since they last looked. The caches in `cache` keep their
+own entries in the process, and only use a backend to share them.
+
+Values are packed with a version, and the keys are prefixed with it, so
+workers running a different format never read each other's values.
+"""
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Sequence
+import json
+import logging
+import struct
+import threading
+import time
+from typing import TYPE_CHECKING, Any
+from urllib.parse import unquote, urlsplit
+import zlib
+
+if TYPE_CHECKING:
+    # Only needed once a backend is used, so they are not imported at startup
+    import socket
+    import sqlite3
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 3
+"""
+Raised whenever the keys or the data of the stored values change, so the
+values stored by workers of another version are not read, such as those of
+version 1, of which the keys were not scoped to the caller, and those of
+version 2, which were stored without the time they were loaded
+"""
+KEY_PREFIX = f'objectstorage:v{FORMAT_VERSION}:'
+
+_HEADER = struct.Struct('>Bdd')
+"""
+The format version, and the wall clock times at which the value expires and
+at which loading it started
+"""
+
+class BackendError(Exception):
+    """
+    Raised when a backend cannot be reached or fails to handle a command
+    """
+
+def pack(data: Any, expires_at: float, loaded_at: float = 0.0) -> bytes:
+    """
+    Packs JSON serialisable data, along with the wall clock times at which it
+    expires and at which loading it started, as zlib compressed JSON
+    """
+    payload = json.dumps(data, separators=(',', ':')).encode()
+
+    return _HEADER.pack(FORMAT_VERSION, expires_at, loaded_at) + zlib.compress(payload)
+
+def unpack(value: bytes) -> tuple[Any, float, float] | None:
+    """
+    Unpacks the data, and the times at which it expires and at which loading
+    it started, from a packed value
+
+    Returns None if the value is of another format version or is corrupt.
+    """
+    if len(value) < _HEADER.size:
+        return None
+
+    version, expires_at, loaded_at = _HEADER.unpack_from(value)
+    if version != FORMAT_VERSION:
+        return None
+
+    try:
+        return json.loads(zlib.decompress(value[_HEADER.size:])), expires_at, loaded_at
+    except (zlib.error, ValueError):
+        return None
+
+class CacheBackend(ABC):
+    """
+    A store of values with a time to live, shared by the worker processes
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> bytes | None:
+        """
+        Returns the value for the given key, if it has not expired
+        """
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str]) -> None:
+        """
+        Stores the value for the given key for ttl seconds, tagged with the
+        given tags
+        """
+
+    @abstractmethod
+    def delete_tag(self, tag: str) -> int:
+        """
+        Removes the values tagged with the given tag, and returns how many
+        were removed
+        """
+
+    @abstractmethod
+    def add_mark(self, key: str, member: str, marked_at: float, ttl: float) -> None:
+        """
+        Marks the member of the set of marks for the given key at the given
+        wall clock time, for ttl seconds
+        """
+
+    @abstractmethod
+    def get_marks(self, key: str, since: float) -> dict[str, float]:
+        """
+        Returns the members of the set of marks for the given key that were
+        last marked after the given wall clock time, with that time
+        """
+
+class MemoryBackend(CacheBackend):
+    """
+    Backend that keeps the values in this process, for a single worker and
+    for testing
+    """
+
+    _values: dict[str, tuple[bytes, float]]
+    _tags: "dict[str, set[str]]"
+    _marks: dict[str, dict[str, tuple[float, float]]]
+    """
+    The time every member was marked at and expires at, per set of marks
+    """
+    _lock: threading.Lock
+
+    def __init__(self) -> None:
+        self._values = {}
+        self._tags = {}
+        self._marks = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            value, expires_at = self._values.get(key, (None, 0.0))
+
+            if value is None or expires_at <= time.time():
+                return None
+
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str]) -> None:
+        now = time.time()
+
+        with self._lock:
+            expired = [key for key, (_, expires_at) in self._values.items() if expires_at <= now]
+            for expired_key in expired:
+                del self._values[expired_key]
+
+            self._values[key] = (value, now + ttl)
+
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+    def delete_tag(self, tag: str) -> int:
+        with self._lock:
+            keys = self._tags.pop(tag, set())
+
+            return sum(self._values.pop(key, None) is not None for key in keys)
+
+    def add_mark(self, key: str, member: str, marked_at: float, ttl: float) -> None:
+        now = time.time()
+
+        with self._lock:
+            marks = self._marks.setdefault(key, {})
+            expired = [member for member, (_, expires_at) in marks.items() if expires_at <= now]
+            for expired_member in expired:
+                del marks[expired_member]
+
+            previous, _ = marks.get(member, (marked_at, now))
+            marks[member] = (max(previous, marked_at), now + ttl)
+
+    def get_marks(self, key: str, since: float) -> dict[str, float]:
+        now = time.time()
+
+        with self._lock:
+            return {
+                member: marked_at
+                for member, (marked_at, expires_at) in self._marks.get(key, {}).items()
+                if marked_at > since and expires_at > now
+            }
+
+class SqliteBackend(CacheBackend):
+    """
+    Backend that keeps the values in a SQLite database file, shared by the
+    worker processes on the same host
+    """
+
+    path: str
+
+    _local: threading.local
+    """
+    The connection of every thread, as SQLite connections cannot be shared
+    between threads
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> "sqlite3.Connection":
+        import sqlite3  # pylint: disable=import-outside-toplevel
+
+        if (connection := getattr(self._local, 'connection', None)) is None:
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute('PRAGMA journal_mode=WAL')
+            with connection:
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS entries ('
+                    'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)'
+                )
+                connection.execute(
+                    'CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at)'
+                )
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS tags ('
+                    'tag TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (tag, key)) WITHOUT ROWID'
+                )
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS marks ('
+                    'key TEXT NOT NULL, member TEXT NOT NULL, marked_at REAL NOT NULL, '
+                    'expires_at REAL NOT NULL, PRIMARY KEY (key, member)) WITHOUT ROWID'
+                )
+            self._local.connection = connection
+
+        return connection
+
+    def get(self, key: str) -> bytes | None:
+        import sqlite3  # pylint: disable=import-outside-toplevel
+
+        try:
+            row = self._connection().execute(
+                'SELECT value FROM entries WHERE key = ? AND expires_at > ?',
+                (key, time.time()),
+            ).fetchone()
+        except sqlite3.Error as exception:
+            raise BackendError(str(exception)) from exception
+
+        return None if row is None else bytes(row[0])
+
+    def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str]) -> None:
+        import sqlite3  # pylint: disable=import-outside-toplevel
+
+        now = time.time()
+
+        try:
+            with (connection := self._connection()):
+                connection.execute(
+                    'INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)',
+                    (key, value, now + ttl),
+                )
+                connection.executemany(
+                    'INSERT OR IGNORE INTO tags (tag, key) VALUES (?, ?)',
+                    ((tag, key) for tag in tags),
+                )
+
+                # Expired entries are only purged while storing, so reads
+                # never have to wait for a write lock
+                purged = connection.execute('DELETE FROM entries WHERE expires_at <= ?', (now,))
+                if purged.rowcount:
+                    connection.execute(
+                        'DELETE FROM tags WHERE key NOT IN (SELECT key FROM entries)'
+                    )
+        except sqlite3.Error as exception:
+            raise BackendError(str(exception)) from exception
+
+    def delete_tag(self, tag: str) -> int:
+        import sqlite3  # pylint: disable=import-outside-toplevel
+
+        try:
+            with (connection := self._connection()):
+                deleted = connection.execute(
+                    'DELETE FROM entries WHERE key IN (SELECT key FROM tags WHERE tag = ?)',
+                    (tag,),
+                ).rowcount
+                connection.execute('DELETE FROM tags WHERE tag = ?', (tag,))
+        except sqlite3.Error as exception:
+            raise BackendError(str(exception)) from exception
+
+        return deleted
+
+    def add_mark(self, key: str, member: str, marked_at: float, ttl: float) -> None:
+        import sqlite3  # pylint: disable=import-outside-toplevel
+
+        now = time.time()
+
+        try:
+            with (connection := self._connection()):
+                connection.execute(
+                    'INSERT INTO marks (key, member, marked_at, expires_at) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (key, member) DO UPDATE SET '
+                    'marked_at = max(marked_at, excluded.marked_at), '
+                    'expires_at = excluded.expires_at',
+                    (key, member, marked_at, now + ttl),
+                )
+                connection.execute('DELETE FROM marks WHERE expires_at <= ?', (now,))
+        except sqlite3.Error as exception:
+            raise BackendError(str(exception)) from exception
+
+    def get_marks(self, key: str, since: float) -> dict[str, float]:
+        import sqlite3  # pylint: disable=import-outside-toplevel
+
+        try:
+            rows = self._connection().execute(
+                'SELECT member, marked_at FROM marks '
+                'WHERE key = ? AND marked_at > ? AND expires_at > ?',
+                (key, since, time.time()),
+            ).fetchall()
+        except sqlite3.Error as exception:
+            raise BackendError(str(exception)) from exception
+
+        return dict(rows)
+
+RespReply = bytes | int | str | list[Any] | BackendError | None
+"""
+A reply of a Redis protocol server, with error replies as BackendError
+"""
+
+class RedisBackend(CacheBackend):
+    """
+    Backend that keeps the values in a server speaking the Redis protocol,
+    shared by the worker processes on all hosts
+
+    Commands are pipelined over a single connection per backend, which is
+    reconnected after a failure.
+    """
+
+    url: str
+    timeout: float
+
+    _socket: "socket.socket | None"
+    _reader: Any
+    _lock: threading.Lock
+
+    def __init__(self, url: str, timeout: float = 1.0) -> None:
+        self.url = url
+        self.timeout = timeout
+
+        self._socket = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> None:
+        import socket  # pylint: disable=import-outside-toplevel
+
+        url = urlsplit(self.url)
+        self._socket = socket.create_connection((url.hostname, url.port or 6379), self.timeout)
+        self._reader = self._socket.makefile('rb')
+
+        commands: list[tuple[str, ...]] = []
+        if url.password:
+            commands.append(
+                ('AUTH', unquote(url.username), unquote(url.password))
+                if url.username else ('AUTH', unquote(url.password))
+            )
+        if (database := url.path.strip('/')):
+            commands.append(('SELECT', database))
+
+        if commands:
+            self._send(commands)
+
+    def close(self) -> None:
+        """
+        Closes the connection, a new one is made on the next command
+        """
+        if self._socket is not None:
+            self._reader.close()
+            self._socket.close()
+
+        self._socket = None
+        self._reader = None
+
+    def _read(self) -> RespReply:
+        line = self._reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise BackendError('Connection closed by the server')
+
+        kind, data = line[:1], line[1:-2]
+
+        if kind == b'+':
+            return data.decode()
+        if kind == b'-':
+            return BackendError(data.decode())
+        if kind == b':':
+            return int(data)
+        if kind in (b'$', b'*'):
+            if (length := int(data)) < 0:
+                return None
+            if kind == b'$':
+                return self._reader.read(length + 2)[:-2]
+            return [self._read() for _ in range(length)]
+
+        raise BackendError(f'Unexpected reply {line!r}')
+
+    def _send(self, commands: Sequence[tuple[str | bytes, ...]]) -> list[RespReply]:
+        """
+        Sends the commands at once and returns their replies, the caller must
+        hold the lock
+        """
+        assert self._socket is not None  # type check
+
+        request = bytearray()
+        for command in commands:
+            request += b'*%d\r\n' % len(command)
+            for arg in command:
+                arg = arg.encode() if isinstance(arg, str) else arg
+                request += b'$%d\r\n%s\r\n' % (len(arg), arg)
+
+        self._socket.sendall(request)
+        replies = [self._read() for _ in commands]
+
+        for reply in replies:
+            if isinstance(reply, BackendError):
+                raise reply
+
+        return replies
+
+    def execute(self, *commands: tuple[str | bytes, ...]) -> list[RespReply]:
+        """
+        Executes the commands in a single round trip, and returns their
+        replies
+        """
+        with self._lock:
+            try:
+                if self._socket is None:
+                    self._connect()
+
+                return self._send(commands)
+            except (OSError, ValueError, BackendError) as exception:
+                self.close()
+
+                if isinstance(exception, BackendError):
+                    raise
+                raise BackendError(str(exception)) from exception
+
+    def get(self, key: str) -> bytes | None:
+        value, = self.execute(('GET', key))
+
+        return value if isinstance(value, bytes) else None
+
+    def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str]) -> None:
+        ttl_ms = str(max(int(ttl * 1000), 1))
+
+        self.execute(
+            ('SET', key, value, 'PX', ttl_ms),
+            *(
+                command
+                for tag in tags
+                for command in (('SADD', tag, key), ('PEXPIRE', tag, ttl_ms))
+            ),
+        )
+
+    def delete_tag(self, tag: str) -> int:
+        keys, = self.execute(('SMEMBERS', tag))
+        if not keys:
+            return 0
+
+        deleted, _ = self.execute(('DEL', *keys), ('DEL', tag))  # type: ignore[misc]
+        assert isinstance(deleted, int)  # type check
+
+        return deleted
+
+    def add_mark(self, key: str, member: str, marked_at: float, ttl: float) -> None:
+        # The marks are a sorted set scored by the time they were marked at,
+        # which all expire ttl seconds after the last one
+        self.execute(
+            ('ZADD', key, repr(marked_at), member),
+            ('ZREMRANGEBYSCORE', key, '-inf', f'({marked_at - ttl!r}'),
+            ('PEXPIRE', key, str(max(int(ttl * 1000), 1))),
+        )
+
+    def get_marks(self, key: str, since: float) -> dict[str, float]:
+        reply, = self.execute(('ZRANGEBYSCORE', key, f'({since!r}', '+inf', 'WITHSCORES'))
+        assert isinstance(reply, list)  # type check
+
+        return {
+            member.decode(): float(score)
+            for member, score in zip(reply[::2], reply[1::2])
+        }
+
+def create(url: str) -> CacheBackend | None:
+    """
+    Creates the backend configured by the given URL: `memory`,
+    `sqlite:///path/to/file` or `redis://[[user]:password@]host[:port][/db]`
+
+    Returns None if the URL is empty, or is not a valid backend URL.
+    """
+    backend: CacheBackend | None = None
+
+    if url == 'memory':
+        backend = MemoryBackend()
+    elif url.startswith('sqlite://') and (path := url.removeprefix('sqlite://')):
+        backend = SqliteBackend(path)
+    elif url.startswith('redis://'):
+        backend = RedisBackend(url)
+    elif url:
+        logger.warning('Ignoring cache backend %s, as it is not a valid backend URL', url)
+
+    return backend
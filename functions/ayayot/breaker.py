@@ -0,0 +1,159 @@
+"""
+Circuit breakers for the calls done to the IXON API
+
+While the API fails or is slow, a breaker stops calls to it from waiting for
+the API at all, so the worker degrades to answers that need no API calls
+rather than having all its threads wait for the API.
+"""
+import enum
+import threading
+import time
+
+class State(enum.Enum):
+    """
+    The state of a circuit breaker
+    """
+
+    CLOSED = 'closed'
+    """
+    Calls are done
+    """
+    OPEN = 'open'
+    """
+    Calls fail right away, until the open time has passed
+    """
+    HALF_OPEN = 'half_open'
+    """
+    A single call is done as a probe, which closes the breaker if it
+    succeeds, and opens it again if it does not
+    """
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling an endpoint whose circuit breaker is open
+    """
+
+class CircuitBreaker:
+    """
+    A circuit breaker which opens after a number of consecutive calls that
+    failed or were slow
+    """
+
+    threshold: int
+    """
+    The consecutive failed or slow calls after which the breaker opens,
+    0 or less disables the breaker
+    """
+    slow_call: float
+    """
+    The seconds after which a call counts as failed, 0 or less counts only
+    calls that raised
+    """
+    open_seconds: float
+
+    _failures: int
+    _opened_at: float | None
+    _probing: bool
+    _lock: threading.Lock
+
+    def __init__(self, threshold: int, slow_call: float, open_seconds: float) -> None:
+        self.threshold = threshold
+        self.slow_call = slow_call
+        self.open_seconds = open_seconds
+
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> State:
+        """
+        The current state of the breaker
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return State.CLOSED
+
+            if self._probing or time.monotonic() < self._opened_at + self.open_seconds:
+                return State.OPEN
+
+            return State.HALF_OPEN
+
+    def allow(self) -> bool:
+        """
+        Checks whether a call may be done, letting a single call through as
+        the probe once the open time has passed
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return True
+
+            if self._probing or time.monotonic() < self._opened_at + self.open_seconds:
+                return False
+
+            self._probing = True
+            return True
+
+    def record(self, seconds: float, failed: bool) -> bool:
+        """
+        Records the outcome of a call that took the given seconds, and
+        returns whether this opened the breaker
+        """
+        failed = failed or 0 < self.slow_call <= seconds
+
+        with self._lock:
+            if self._probing:
+                self._probing = False
+                self._failures = 0
+                self._opened_at = time.monotonic() if failed else None
+                return failed
+
+            if not failed:
+                self._failures = 0
+                return False
+
+            self._failures += 1
+            if self._opened_at is None and 0 < self.threshold <= self._failures:
+                self._opened_at = time.monotonic()
+                return True
+
+            return False
+
+class CircuitBreakers:
+    """
+    Circuit breakers per endpoint, shared by all API calls of this worker
+    """
+
+    threshold: int
+    slow_call: float
+    open_seconds: float
+
+    _breakers: dict[str, CircuitBreaker]
+    _lock: threading.Lock
+
+    def __init__(self, threshold: int, slow_call: float, open_seconds: float) -> None:
+        self.threshold = threshold
+        self.slow_call = slow_call
+        self.open_seconds = open_seconds
+
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        """
+        Returns the breaker of the given endpoint
+        """
+        with self._lock:
+            if (breaker := self._breakers.get(endpoint)) is None:
+                breaker = CircuitBreaker(self.threshold, self.slow_call, self.open_seconds)
+                self._breakers[endpoint] = breaker
+
+            return breaker
+
+    def reset(self) -> None:
+        """
+        Forgets the state of all breakers
+        """
+        with self._lock:
+            self._breakers.clear()
@@ -0,0 +1,677 @@
+"""
+In-process caches for the lookups done while authorizing object storage access
+"""
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable
+from dataclasses import dataclass, field
+import enum
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Generic, TypeVar
+
+from . import backends, metrics, settings
+from .documents import ObjectIndex, ObjectMeta
+
+if TYPE_CHECKING:
+    # Only needed once a stale value is refreshed, so it is not imported at startup
+    from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+MARK_MARGIN = 5.0
+"""
+The seconds by which the invalidation marks in the backend are checked
+again, so marks that were stored late, or by a worker whose clock is behind,
+are not missed
+"""
+
+class Freshness(enum.Enum):
+    """
+    How fresh a value returned by a cache has to be
+    """
+
+    CACHED = 'cached'
+    """
+    A value that has not expired, loading it if there is none
+    """
+    STALE = 'stale'
+    """
+    Like CACHED, but a value that expired less than the maximum staleness ago
+    is returned right away, while it is reloaded in the background
+    """
+    FRESH = 'fresh'
+    """
+    A freshly loaded value, bypassing the cached one
+    """
+
+@dataclass
+class CacheEntry(Generic[V]):
+    """
+    A single cached value, with the moments it expires and was loaded
+    """
+
+    value: V
+    expires_at: float
+    loaded_at: float = field(default=0.0, compare=False)
+    """
+    The moment loading the value started, by this worker or by another
+    """
+
+@dataclass
+class SharedStore(Generic[K, V]):
+    """
+    How the entries of a cache are shared with other workers through a backend
+    """
+
+    backend: backends.CacheBackend
+    to_data: Callable[[V], Any]
+    """
+    Converts a value to JSON serialisable data
+    """
+    from_data: Callable[[Any], V]
+    tags: Callable[[K], Iterable[str]]
+    """
+    Returns the tags of the entry for a key, by which it can be evicted
+    """
+
+_refresher_lock = threading.Lock()
+_refresher: "ThreadPoolExecutor | None" = None
+
+def _get_refresher() -> "ThreadPoolExecutor":
+    """
+    Returns the executor that reloads stale values in the background
+    """
+    from concurrent.futures import ThreadPoolExecutor  # pylint: disable=import-outside-toplevel
+
+    global _refresher  # pylint: disable=global-statement
+
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = ThreadPoolExecutor(
+                max_workers=settings.get_int('CACHE_REFRESH_CONCURRENCY', 2),
+                thread_name_prefix='objectstorage-cache-refresh',
+            )
+
+        return _refresher
+
+class TtlCache(Generic[K, V]):  # pylint: disable=too-many-instance-attributes
+    """
+    A thread-safe, size-bounded cache whose entries expire after a fixed time
+
+    The least recently used entry is evicted when the cache is full. Expired
+    entries are kept around, so they can be served while being reloaded.
+
+    When shared, the entries are also stored in a backend, and the entries
+    missing in this worker are looked up there. Invalidations are marked per
+    tag in the backend too, and every worker checks the new marks at most
+    once per sync interval, evicting its entries with a marked tag that were
+    loaded before the mark. Values loaded before a known mark of one of their
+    tags are neither stored in the backend nor taken from it.
+    """
+
+    name: str
+    ttl: float
+    max_entries: int
+    max_stale: float
+    sync_interval: float
+
+    _entries: OrderedDict[K, CacheEntry[V]]
+    _refreshing: dict[K, object]
+    """
+    The keys being reloaded in the background, with a token identifying the
+    reload, so a reload of an invalidated key does not store its result
+    """
+    _synced_at: float
+    """
+    The moment the invalidation marks were last checked in the backend
+    """
+    _marks_since: float
+    """
+    The wall clock time up to which the invalidation marks in the backend
+    were checked
+    """
+    _marks: dict[str, float]
+    """
+    The moment every tag was last invalidated by any worker, as far as known,
+    for as long as values loaded before could still be served
+    """
+    _lock: threading.Lock
+    shared: SharedStore[K, V] | None
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        name: str,
+        ttl: float,
+        max_entries: int,
+        max_stale: float = 0.0,
+        sync_interval: float = 1.0,
+    ) -> None:
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_stale = max_stale
+        self.sync_interval = sync_interval
+
+        self._entries = OrderedDict()
+        self._refreshing = {}
+        self._synced_at = float('-inf')
+        self._marks_since = 0.0
+        self._marks = {}
+        self._lock = threading.Lock()
+        self.shared = None
+
+    def share(self, shared: SharedStore[K, V] | None) -> None:
+        """
+        Shares the entries through the given store, or stops sharing them
+        """
+        self.shared = shared
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def entry(self, key: K) -> CacheEntry[V] | None:
+        """
+        Returns the entry for the given key, whether it has expired or not
+        """
+        self._sync()
+
+        with self._lock:
+            return self._entries.get(key)
+
+    def get(self, key: K) -> V | None:
+        """
+        Returns the value for the given key, if it is cached and has not expired
+        """
+        self._sync()
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and entry.expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                return entry.value
+
+        return self._load_shared(key)
+
+    def set(self, key: K, value: V, loaded_at: float | None = None) -> None:
+        """
+        Stores the value for the given key, evicting the least recently used
+        entry if the cache is full
+
+        A value that started loading before one of its tags was invalidated,
+        at the given moment or now, is not stored.
+        """
+        if loaded_at is None:
+            loaded_at = time.monotonic()
+
+        with self._lock:
+            stored = self._store(key, value, loaded_at)
+
+        if stored:
+            self._save_shared(key, value, loaded_at)
+
+    def get_or_load(
+        self,
+        key: K,
+        loader: Callable[[], V],
+        freshness: Freshness = Freshness.CACHED,
+    ) -> V:
+        """
+        Returns the cached value for the given key, calling the loader and
+        storing its result if there is no value that is fresh enough
+        """
+        if freshness is not Freshness.FRESH:
+            if (value := self.get(key)) is not None:
+                metrics.increment(f'cache.{self.name}.hits')
+                return value
+
+            if freshness is Freshness.STALE and (entry := self._get_stale(key)) is not None:
+                metrics.increment(f'cache.{self.name}.stale_hits')
+                self._refresh_in_background(key, loader)
+                return entry.value
+
+        metrics.increment(f'cache.{self.name}.misses')
+        loaded_at = time.monotonic()
+        value = loader()
+        self.set(key, value, loaded_at)
+
+        return value
+
+    def delete(self, key: K) -> None:
+        """
+        Removes the entry for the given key, if any
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._refreshing.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[K], bool]) -> int:
+        """
+        Removes the entries whose key matches the predicate, and returns how
+        many were removed
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+
+            for key in keys:
+                del self._entries[key]
+
+            for key in [key for key in self._refreshing if predicate(key)]:
+                del self._refreshing[key]
+
+        return len(keys)
+
+    def delete_tag(self, tag: str) -> int:
+        """
+        Removes the shared entries with the given tag, and returns how many
+        were removed
+        """
+        if self.shared is None:
+            return 0
+
+        try:
+            return self.shared.backend.delete_tag(self._shared_tag(tag))
+        except backends.BackendError:
+            self._count_shared_error('delete')
+            return 0
+
+    def mark_invalidated(self, tag: str) -> None:
+        """
+        Marks the entries with the given tag loaded until now as invalidated
+        in the backend, so every worker evicts its own copies of them once it
+        checks the marks, and no worker shares them again
+        """
+        if self.shared is None or self.ttl <= 0:
+            return
+
+        with self._lock:
+            self._add_marks({tag: time.monotonic()})
+
+        # Entries loaded before the mark expire, and stop being served stale,
+        # before the mark does
+        try:
+            self.shared.backend.add_mark(
+                self._marks_key(), tag, time.time(), self.ttl + self.max_stale,
+            )
+        except backends.BackendError:
+            self._count_shared_error('invalidate')
+
+    def _sync(self) -> None:
+        """
+        Evicts the entries loaded before their tags were last invalidated by
+        any worker, checking the new marks in the backend at most once per
+        sync interval
+        """
+        if self.shared is None:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            if now < self._synced_at + self.sync_interval:
+                return
+            self._synced_at = now
+            since = self._marks_since - MARK_MARGIN
+
+        wall_now = time.time()
+        try:
+            marks = self.shared.backend.get_marks(self._marks_key(), since)
+        except backends.BackendError:
+            self._count_shared_error('sync')
+            return
+
+        # The backend keeps wall clock time, which is shared between hosts
+        marked = {tag: now - (wall_now - marked_at) for tag, marked_at in marks.items()}
+        with self._lock:
+            self._marks_since = max(self._marks_since, wall_now)
+            self._add_marks(marked)
+
+            keys = [
+                key for key, entry in self._entries.items()
+                if self._is_invalidated(key, entry.loaded_at, marked)
+            ]
+
+            for key in keys:
+                del self._entries[key]
+                self._refreshing.pop(key, None)
+
+        if keys:
+            metrics.increment(f'cache.{self.name}.synced', len(keys))
+
+    def _add_marks(self, marks: dict[str, float]) -> None:
+        """
+        Adds the moments the given tags were invalidated, forgetting those of
+        which no entry loaded before can be served anymore, the caller must
+        hold the lock
+        """
+        for tag, marked_at in marks.items():
+            if marked_at > self._marks.get(tag, float('-inf')):
+                self._marks[tag] = marked_at
+
+        forget_before = time.monotonic() - self.ttl - self.max_stale
+        for tag in [tag for tag, marked_at in self._marks.items() if marked_at < forget_before]:
+            del self._marks[tag]
+
+    def _is_invalidated(self, key: K, loaded_at: float, marks: dict[str, float]) -> bool:
+        """
+        Checks whether a tag of the entry for the given key was invalidated
+        since loading its value started, by the given marks
+        """
+        if self.shared is None or not marks:
+            return False
+
+        return any(marks.get(tag, float('-inf')) >= loaded_at for tag in self.shared.tags(key))
+
+    def clear(self) -> None:
+        """
+        Removes all entries
+        """
+        with self._lock:
+            self._entries.clear()
+            self._refreshing.clear()
+
+    def _get_stale(self, key: K) -> CacheEntry[V] | None:
+        """
+        Returns the entry for the given key, if it expired no longer than the
+        maximum staleness ago
+        """
+        entry = self.entry(key)
+
+        if entry is None or entry.expires_at + self.max_stale <= time.monotonic():
+            return None
+
+        return entry
+
+    def _refresh_in_background(self, key: K, loader: Callable[[], V]) -> None:
+        """
+        Reloads the value for the given key in the background, unless that is
+        already happening
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing[key] = token = object()
+
+        _get_refresher().submit(self._refresh, key, loader, token)
+
+    def _refresh(self, key: K, loader: Callable[[], V], token: object) -> None:
+        loaded_at = time.monotonic()
+        try:
+            value = loader()
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.exception('Failed to refresh %s cache entry %r', self.name, key)
+            value = None
+
+        with self._lock:
+            if self._refreshing.get(key) is not token:
+                return
+            del self._refreshing[key]
+
+            if value is None or not self._store(key, value, loaded_at):
+                return
+
+        self._save_shared(key, value, loaded_at)
+
+    def _store(
+        self,
+        key: K,
+        value: V,
+        loaded_at: float,
+        expires_at: float | None = None,
+    ) -> bool:
+        """
+        Stores the value for the given key, unless caching is disabled or one
+        of its tags was invalidated since loading it started, and returns
+        whether it was stored, the caller must hold the lock
+        """
+        if self.ttl <= 0 or self._is_invalidated(key, loaded_at, self._marks):
+            return False
+
+        if expires_at is None:
+            expires_at = time.monotonic() + self.ttl
+
+        self._entries[key] = CacheEntry(value, expires_at, loaded_at)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        return True
+
+    def _shared_key(self, key: K) -> str:
+        digest = hashlib.sha256(json.dumps(key).encode()).hexdigest()
+
+        return f'{backends.KEY_PREFIX}{self.name}:{digest}'
+
+    def _shared_tag(self, tag: str) -> str:
+        return f'{backends.KEY_PREFIX}{self.name}:tag:{tag}'
+
+    def _marks_key(self) -> str:
+        return f'{backends.KEY_PREFIX}{self.name}:invalidated'
+
+    def _count_shared_error(self, action: str) -> None:
+        logger.warning('Failed to %s a shared %s cache entry', action, self.name, exc_info=True)
+        metrics.increment(f'cache.{self.name}.shared_errors')
+
+    def _load_shared(self, key: K) -> V | None:
+        """
+        Looks up the value for the given key in the backend, and stores it in
+        this worker, returning it if it has not expired
+
+        An expired value is only stored, so it can be served as stale. A value
+        loaded before one of its tags was invalidated is ignored.
+        """
+        if self.shared is None:
+            return None
+
+        try:
+            packed = self.shared.backend.get(self._shared_key(key))
+        except backends.BackendError:
+            self._count_shared_error('load')
+            return None
+
+        if packed is None or (unpacked := backends.unpack(packed)) is None:
+            return None
+
+        data, expires_at, loaded_at = unpacked
+        try:
+            value = self.shared.from_data(data)
+        except (TypeError, ValueError):
+            return None
+
+        # The backend keeps wall clock time, which is shared between hosts
+        now = time.monotonic()
+        wall_now = time.time()
+        expires_at = now + (expires_at - wall_now)
+        loaded_at = now + (loaded_at - wall_now)
+
+        with self._lock:
+            invalidated = self._is_invalidated(key, loaded_at, self._marks)
+
+            if not invalidated and (
+                    (entry := self._entries.get(key)) is None or entry.expires_at < expires_at
+                ):
+                self._store(key, value, loaded_at, expires_at)
+
+        if invalidated or expires_at <= now:
+            return None
+
+        metrics.increment(f'cache.{self.name}.shared_hits')
+        return value
+
+    def _save_shared(self, key: K, value: V, loaded_at: float) -> None:
+        """
+        Stores the value for the given key, of which loading started at the
+        given moment, in the backend, long enough for it to be served as stale
+        """
+        if self.shared is None or self.ttl <= 0:
+            return
+
+        now = time.time()
+        packed = backends.pack(
+            self.shared.to_data(value), now + self.ttl, now - (time.monotonic() - loaded_at),
+        )
+        try:
+            self.shared.backend.set(
+                self._shared_key(key),
+                packed,
+                self.ttl + self.max_stale,
+                [self._shared_tag(tag) for tag in self.shared.tags(key)],
+            )
+        except backends.BackendError:
+            self._count_shared_error('store')
+
+DescendantList = tuple[tuple[str, str], ...]
+"""
+The public ID and name of every descendant of an asset
+"""
+
+DescendantKey = tuple[str, str]
+"""
+The scope of the caller and the public ID of the asset of which the
+descendants were requested
+"""
+
+AppConfigKey = tuple[str, str, tuple[str, ...]]
+"""
+The scope of the caller, the public ID of the app template and those of the
+assets of which the app config objects were requested
+"""
+
+DESCENDANTS: TtlCache[DescendantKey, DescendantList] = TtlCache(
+    'descendants',
+    settings.get_float('CACHE_TTL', 30.0),
+    settings.get_int('CACHE_MAX_ENTRIES', 1024),
+    settings.get_float('CACHE_MAX_STALE', 300.0),
+    settings.get_float('CACHE_SYNC_INTERVAL', 1.0),
+)
+"""
+The descendants of an asset, by scope of the caller and public ID of the asset
+
+What the IXON API returns depends on the permissions of the caller, so the
+lookups of one caller are never served to another.
+"""
+
+APP_CONFIG_OBJECTS: TtlCache[AppConfigKey, ObjectIndex] = TtlCache(
+    'app_config_objects',
+    settings.get_float('CACHE_TTL', 30.0),
+    settings.get_int('CACHE_MAX_ENTRIES', 1024),
+    settings.get_float('CACHE_MAX_STALE', 300.0),
+    settings.get_float('CACHE_SYNC_INTERVAL', 1.0),
+)
+"""
+The index of the objects in the app configs of a set of assets
+"""
+
+def asset_tree_keys(
+    scope: str,
+    asset_id: str,
+    template_id: str,
+) -> tuple[DescendantKey, AppConfigKey] | None:
+    """
+    Returns the cache keys of an asset's descendants and of the app config
+    objects of the asset and its descendants, as looked up by the caller
+    with the given scope
+
+    Returns None if the descendants of the asset are not cached, as the key
+    of the app config objects cannot be known without them.
+    """
+    if (entry := DESCENDANTS.entry((scope, asset_id))) is None:
+        return None
+
+    return (scope, asset_id), (
+        scope, template_id, (asset_id, *(public_id for public_id, _ in entry.value)),
+    )
+
+def asset_tree_expires_at(scope: str, asset_id: str, template_id: str) -> float | None:
+    """
+    Returns the moment the first of the cached lookups for the tree of the
+    given asset expires, or None when any of them is not cached
+    """
+    if (keys := asset_tree_keys(scope, asset_id, template_id)) is None:
+        return None
+
+    descendants = DESCENDANTS.entry(keys[0])
+    objects = APP_CONFIG_OBJECTS.entry(keys[1])
+
+    if descendants is None or objects is None:
+        return None
+
+    return min(descendants.expires_at, objects.expires_at)
+
+def cached_tree_index(scope: str, asset_id: str, template_id: str) -> ObjectIndex | None:
+    """
+    Returns the cached index of the app config objects of the tree of the
+    given asset, expired or not, as looked up by the caller with the given
+    scope, or None when it is not cached
+    """
+    if (keys := asset_tree_keys(scope, asset_id, template_id)) is None:
+        return None
+
+    entry = APP_CONFIG_OBJECTS.entry(keys[1])
+
+    return None if entry is None else entry.value
+
+def invalidate_asset(asset_id: str) -> int:
+    """
+    Evicts the cached lookups affected by a change to the given asset: its
+    descendants, and the app config objects of every cached asset tree that
+    contains it, which includes those of its ancestors, looked up by any caller
+
+    Returns how many entries were evicted, from this worker and from the
+    shared backend. The other workers evict their entries of the asset loaded
+    before, once they check the invalidation marks in the backend.
+    """
+    evicted = DESCENDANTS.delete_where(lambda key: key[1] == asset_id)
+    evicted += APP_CONFIG_OBJECTS.delete_where(lambda key: asset_id in key[2])
+    evicted += DESCENDANTS.delete_tag(asset_id) + APP_CONFIG_OBJECTS.delete_tag(asset_id)
+
+    DESCENDANTS.mark_invalidated(asset_id)
+    APP_CONFIG_OBJECTS.mark_invalidated(asset_id)
+
+    metrics.increment('cache.invalidated', evicted)
+
+    return evicted
+
+def clear_all() -> None:
+    """
+    Removes all entries from all caches
+    """
+    DESCENDANTS.clear()
+    APP_CONFIG_OBJECTS.clear()
+
+def _descendants_from_data(data: list[list[str]]) -> DescendantList:
+    return tuple((public_id, name) for public_id, name in data)
+
+def _index_to_data(index: ObjectIndex) -> list[tuple[Any, ...]]:
+    return [
+        (obj.id, obj.name, obj.order, obj.size, obj.type, obj.category)
+        for obj in index.objects
+    ]
+
+def _index_from_data(data: list[list[Any]]) -> ObjectIndex:
+    return ObjectIndex.build(tuple(ObjectMeta(*fields) for fields in data))
+
+def use_backend(backend: backends.CacheBackend | None) -> None:
+    """
+    Shares the entries of all caches with other workers through the given
+    backend, or stops sharing them if None
+    """
+    DESCENDANTS.share(
+        None if backend is None else SharedStore(
+            backend, list, _descendants_from_data, lambda key: (key[1],),
+        )
+    )
+    APP_CONFIG_OBJECTS.share(
+        None if backend is None else SharedStore(
+            backend, _index_to_data, _index_from_data, lambda key: key[2],
+        )
+    )
+
+use_backend(backends.create(settings.get_str('CACHE_BACKEND', '')))
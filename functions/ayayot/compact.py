@@ -0,0 +1,218 @@
+"""
+The compact format of the path mappings returned by the list functions
+
+In the default format, every mapping is an object repeating its type, the
+`assets/` or `agents/` prefix of its path and, for documents, a null public
+ID. In the compact format the mappings are grouped by type, and only the IDs
+are listed:
+
+    {
+        "prefixes": {"Asset": "assets/", "Agent": "agents/"},
+        "resources": {"Asset": ["asset01"], "Agent": ["agent01"]},
+        "objects": {"Asset": ["uuid1", "uuid2"]},
+        "other": []
+    }
+
+A resource maps its public ID to `{prefix}{publicId}/`, an object has no
+public ID and maps to `{prefix}{id}`. Mappings that fit neither are listed
+in `other` as they are. The order of the mappings is not kept.
+
+With `compact+gzip`, the data is the compact format as JSON, compressed with
+gzip and encoded as base64.
+"""
+import base64
+from collections.abc import Iterable
+import gzip
+import json
+from typing import Any, Literal, NotRequired, TypedDict, TypeVar
+
+from ixoncdkingress.function.context import FunctionResource
+from ixoncdkingress.function.objectstorage.types import ListPathResponse, PathMapping, \
+    ResourceType
+
+from . import metrics
+from .responses import BatchError
+
+R = TypeVar('R', bound=ListPathResponse)
+
+COMPACT = 'compact'
+COMPACT_GZIP = 'compact+gzip'
+
+FORMATS = frozenset({COMPACT, COMPACT_GZIP})
+"""
+The formats a list function may be asked to respond in, besides the default
+"""
+
+PREFIXES = {ResourceType.ASSET.value: 'assets/', ResourceType.AGENT.value: 'agents/'}
+
+GZIP_LEVEL = 6
+"""
+The compression level of gzip, the higher levels take much longer while
+barely compressing the repeated IDs better
+"""
+
+class CompactMappings(TypedDict, total=True):
+    """
+    Path mappings in the compact format
+    """
+    prefixes: dict[str, str]
+    resources: dict[str, list[str]]
+    objects: dict[str, list[str]]
+    other: list[PathMapping]
+
+class CompactListPathResponse(TypedDict, total=True):
+    """
+    The response of authorize_list and search_documents in a compact format,
+    with the mappings as CompactMappings, or gzipped in base64
+    """
+    result: Literal['success']
+    format: str
+    data: CompactMappings | str
+    partial: NotRequired[Literal[True]]
+
+class CompactBatchListResponse(TypedDict, total=True):
+    """
+    The response of authorize_list_batch in a compact format, with the
+    mappings per asset as CompactMappings, or all of them gzipped in base64
+    """
+    result: Literal['success']
+    format: str
+    data: dict[str, CompactMappings | BatchError | None] | str
+    partial: NotRequired[Literal[True]]
+
+def encode(
+    resources: Iterable[tuple[FunctionResource, ResourceType]],
+    object_ids: list[str],
+) -> CompactMappings:
+    """
+    Creates the compact mappings of the given resources and the objects with
+    the given IDs, without creating a mapping for each of them first
+    """
+    resource_ids: dict[str, list[str]] = {}
+    for resource, typ in resources:
+        resource_ids.setdefault(typ, []).append(resource.public_id)
+
+    return CompactMappings(
+        prefixes=dict(PREFIXES),
+        resources=resource_ids,
+        objects={ResourceType.ASSET.value: object_ids} if object_ids else {},
+        other=[],
+    )
+
+def encode_mappings(mappings: Iterable[PathMapping]) -> CompactMappings:
+    """
+    Converts path mappings to the compact format
+    """
+    resources: dict[str, list[str]] = {}
+    objects: dict[str, list[str]] = {}
+    other: list[PathMapping] = []
+
+    for mapping in mappings:
+        typ = mapping['type']
+        public_id = mapping['publicId']
+        path = mapping['path']
+        prefix = PREFIXES.get(typ, '')
+
+        if not prefix or not path.startswith(prefix):
+            other.append(mapping)
+        elif public_id is None and path.find('/', len(prefix)) < 0:
+            objects.setdefault(typ, []).append(path[len(prefix):])
+        elif public_id is not None and path == f'{prefix}{public_id}/':
+            resources.setdefault(typ, []).append(public_id)
+        else:
+            other.append(mapping)
+
+    return CompactMappings(
+        prefixes=dict(PREFIXES), resources=resources, objects=objects, other=other,
+    )
+
+def decode_mappings(compact: CompactMappings) -> list[PathMapping]:
+    """
+    Converts path mappings in the compact format back to the default format
+    """
+    prefixes = compact['prefixes']
+
+    return [
+        *(
+            PathMapping(
+                publicId=public_id, type=ResourceType(typ), path=f'{prefixes[typ]}{public_id}/',
+            )
+            for typ, public_ids in compact['resources'].items()
+            for public_id in public_ids
+        ),
+        *(
+            PathMapping(
+                publicId=None, type=ResourceType(typ), path=f'{prefixes[typ]}{object_id}',
+            )
+            for typ, object_ids in compact['objects'].items()
+            for object_id in object_ids
+        ),
+        *compact['other'],
+    ]
+
+def pack(data: Any, response_format: str) -> Any:
+    """
+    Returns the data of a response in the given format, which is the data
+    itself, or the data as gzipped JSON in base64
+    """
+    if response_format != COMPACT_GZIP:
+        return data
+
+    encoded = json.dumps(data, separators=(',', ':')).encode()
+    return base64.b64encode(gzip.compress(encoded, GZIP_LEVEL, mtime=0)).decode('ascii')
+
+def unpack(data: Any, response_format: str) -> Any:
+    """
+    Returns the data of a response in the given format, as it was before it
+    was packed
+    """
+    if response_format != COMPACT_GZIP:
+        return data
+
+    return json.loads(gzip.decompress(base64.b64decode(data)))
+
+def create_list_response(
+    mappings: CompactMappings,
+    response_format: str,
+) -> CompactListPathResponse:
+    """
+    Creates a list response with the given mappings in the given format
+    """
+    metrics.increment(f'format.{response_format}')
+    return CompactListPathResponse(
+        result='success',
+        format=response_format,
+        data=pack(mappings, response_format),
+    )
+
+def create_batch_response(
+    mappings: dict[str, CompactMappings | BatchError | None],
+    response_format: str,
+) -> CompactBatchListResponse:
+    """
+    Creates a batch list response with the given mappings per asset in the
+    given format
+    """
+    metrics.increment(f'format.{response_format}')
+    return CompactBatchListResponse(
+        result='success',
+        format=response_format,
+        data=pack(mappings, response_format),
+    )
+
+def format_list_response(
+    response: R,
+    response_format: str | None,
+) -> R | CompactListPathResponse:
+    """
+    Returns a list response in the given format, as it is unless a compact
+    format is given
+    """
+    if response_format not in FORMATS:
+        return response
+
+    formatted = create_list_response(encode_mappings(response['data']), response_format)
+    if 'partial' in response:
+        formatted['partial'] = True
+
+    return formatted
@@ -0,0 +1,106 @@
+"""
+Time budget of the calls to the exposed functions
+
+Every call gets a deadline, which is shared by all IXON API calls done while
+handling it: each of them may only take the time that is left. Work that is
+not needed for a correct answer is skipped once too little time is left, and
+the answer is then marked as partial.
+"""
+from collections.abc import Callable
+import contextvars
+from dataclasses import dataclass
+import functools
+import time
+from typing import Any, TypeVar
+
+from . import metrics, settings
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+BUDGET = settings.get_float('REQUEST_BUDGET', 10.0)
+"""
+The seconds a call may take, 0 disables the deadline
+"""
+OPTIONAL_BUDGET = settings.get_float('OPTIONAL_WORK_BUDGET', 1.0)
+"""
+The seconds that have to be left to start work that may be skipped
+"""
+
+class DeadlineExceeded(Exception):
+    """
+    Raised instead of calling the IXON API once no time is left
+    """
+
+@dataclass
+class Budget:
+    """
+    The deadline of a call, and whether work was skipped to meet it
+    """
+
+    deadline: float
+    partial: bool = False
+
+_budget: contextvars.ContextVar[Budget | None] = contextvars.ContextVar('budget', default=None)
+
+def remaining() -> float | None:
+    """
+    Returns the seconds left of the current call, or None without a deadline
+    """
+    if (budget := _budget.get()) is None:
+        return None
+
+    return budget.deadline - time.monotonic()
+
+def timeout() -> float | None:
+    """
+    Returns the seconds an IXON API call may take, or None without a deadline
+
+    Raises DeadlineExceeded if no time is left.
+    """
+    if (left := remaining()) is not None and left <= 0:
+        raise DeadlineExceeded()
+
+    return left
+
+def allows_optional_work() -> bool:
+    """
+    Checks whether enough time is left to start work that may be skipped,
+    marking the call as partial if not
+    """
+    if (left := remaining()) is None or left >= OPTIONAL_BUDGET:
+        return True
+
+    skip()
+    return False
+
+def skip() -> None:
+    """
+    Marks the current call as partial, as work was skipped
+    """
+    if (budget := _budget.get()) is not None and not budget.partial:
+        budget.partial = True
+        metrics.increment('deadline.partial')
+
+def is_partial() -> bool:
+    """
+    Checks whether work was skipped in the current call
+    """
+    return (budget := _budget.get()) is not None and budget.partial
+
+def budgeted(function: F) -> F:
+    """
+    Decorator which sets the deadline of the calls of the given function, as
+    configured by `OBJECTSTORAGE_REQUEST_BUDGET`
+    """
+    @functools.wraps(function)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if BUDGET <= 0:
+            return function(*args, **kwargs)
+
+        token = _budget.set(Budget(time.monotonic() + BUDGET))
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _budget.reset(token)
+
+    return wrapper  # type: ignore[return-value]
@@ -0,0 +1,139 @@
+"""
+Decoding of the objects in the app config of an asset
+
+Large app configs can be decoded in a process pool, so decoding them does not
+hold the GIL while other calls of the worker are waiting for it.
+"""
+import json
+import logging
+import os
+import threading
+from typing import TYPE_CHECKING
+
+from . import metrics, settings
+from .documents import ObjectMeta
+
+if TYPE_CHECKING:
+    # Only needed once the process pool is used, so it is not imported at startup
+    from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+OFFLOAD_THRESHOLD = settings.get_int('DECODE_OFFLOAD_THRESHOLD', 0)
+"""
+The size in characters from which app configs are decoded in the process
+pool, 0 disables the process pool
+"""
+PROCESSES = settings.get_int('DECODE_PROCESSES', 2)
+
+ObjectFields = tuple[str, str | None, int | None, int | None, str | None, str | None]
+
+_pool_lock = threading.Lock()
+_pool: "ProcessPoolExecutor | None" = None
+_broken: bool = False
+"""
+Whether the processes of the pool failed, after which app configs are only
+decoded in the worker itself
+"""
+
+def _import_root() -> str:
+    """
+    Returns the directory this module is imported from, the ingress only adds
+    it to the import path while it imports the function module
+    """
+    root = os.path.abspath(__file__)
+    for _ in range(__name__.count('.') + 1):
+        root = os.path.dirname(root)
+
+    return root
+
+def _get_pool() -> "ProcessPoolExecutor":
+    """
+    Returns the process pool, the processes are spawned rather than forked,
+    as forking a process with running threads is unsafe
+    """
+    # pylint: disable=import-outside-toplevel
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+    import site
+
+    global _pool  # pylint: disable=global-statement
+
+    with _pool_lock:
+        if _pool is None:
+            # The spawned processes get the import path of this process once
+            # it is started, so they are told where to import this module
+            # from, by a function they can import without it
+            _pool = ProcessPoolExecutor(
+                max_workers=max(PROCESSES, 1),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=site.addsitedir,
+                initargs=(_import_root(),),
+            )
+
+        return _pool
+
+def shutdown() -> None:
+    """
+    Shuts down the process pool, a new one is started when it is needed again
+    """
+    global _pool  # pylint: disable=global-statement
+
+    with _pool_lock:
+        pool, _pool = _pool, None
+
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _disable() -> None:
+    global _broken  # pylint: disable=global-statement
+
+    _broken = True
+    shutdown()
+
+def _decode(values: str | None, state_values: str | None) -> list[ObjectMeta]:
+    objects = [
+        ObjectMeta.from_dict(item)
+        for item in json.loads(values or "[]")
+    ] + [
+        ObjectMeta.from_dict(item)
+        for item in json.loads(state_values or "[]")
+    ]
+
+    return [obj for obj in objects if obj]
+
+def decode_fields(values: str | None, state_values: str | None) -> list[ObjectFields]:
+    """
+    Decodes the objects in an app config to the tuples of their fields, which
+    are cheaper to hand back from the process pool than the objects
+    """
+    return [
+        (obj.id, obj.name, obj.order, obj.size, obj.type, obj.category)
+        for obj in _decode(values, state_values)
+    ]
+
+def decode_objects(values: str | None, state_values: str | None) -> list[ObjectMeta]:
+    """
+    Decodes the objects in the values and state values of an app config,
+    in the process pool if they are large
+    """
+    size = len(values or '') + len(state_values or '')
+
+    if 0 < OFFLOAD_THRESHOLD <= size and not _broken:
+        # pylint: disable-next=import-outside-toplevel
+        from concurrent.futures.process import BrokenProcessPool
+
+        try:
+            fields = _get_pool().submit(decode_fields, values, state_values).result()
+        except (BrokenProcessPool, OSError):
+            # Processes that failed once would fail again, so no new ones are
+            # started for every large app config
+            logger.exception(
+                'Failed to decode an app config in the process pool, no longer using it',
+            )
+            _disable()
+        else:
+            metrics.increment('decode.offloaded')
+            return [ObjectMeta(*obj) for obj in fields]
+
+    return _decode(values, state_values)
@@ -0,0 +1,344 @@
+"""
+The documents referenced by the app configs of assets
+"""
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+import functools
+import json
+import re
+from typing import Any
+
+@dataclass(frozen=True)
+class ObjectMeta:
+    """
+    The metadata of an object in the object storage
+    """
+
+    id: str
+    name: str | None = None
+    order: int | None = None
+    size: int | None = None
+    type: str | None = None
+    category: str | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ObjectMeta | None":
+        """
+        Creates an ObjectMeta instance from a dictionary
+
+        Returns None if it cannot be parsed. An optional field of another
+        type is left out, as the objects are indexed and hashed by their
+        fields, but the object itself is kept.
+        """
+        if not isinstance(data, dict) or not isinstance(data.get("id"), str):
+            return None
+
+        fields: dict[str, Any] = {
+            field: value if isinstance(value := data.get(field), types) else None
+            for field, types in _OPTIONAL_FIELDS.items()
+        }
+
+        return cls(id=data["id"], **fields)
+
+_OPTIONAL_FIELDS: dict[str, tuple[type, ...]] = {
+    "name": (str,),
+    "order": (int, float, str),
+    "size": (int, float, str),
+    "type": (str,),
+    "category": (str,),
+}
+"""
+The types of the values kept of every optional field of ObjectMeta. The name,
+type and category are matched as text, the order and size are only sorted by
+and shown, so any scalar is kept as it was before these were checked.
+"""
+
+_NUMBERS = re.compile(r'(\d+)')
+
+NaturalKey = tuple[tuple[int, int, str], ...]
+
+def natural_key(text: str) -> NaturalKey:
+    """
+    Returns a key that sorts text case-insensitively, with the numbers in it
+    sorted by value, so "2" comes before "10"
+    """
+    return tuple(
+        (0, int(chunk), '') if chunk.isdigit() else (1, 0, chunk)
+        for chunk in _NUMBERS.split(text.casefold())
+        if chunk
+    )
+
+def sort_key(obj: ObjectMeta) -> tuple[bool, int, NaturalKey, str]:
+    """
+    Returns the key that sorts objects by their order, then by their name
+
+    Objects without an order come after those with one.
+    """
+    order = obj.order if isinstance(obj.order, int) else None
+
+    return order is None, order or 0, natural_key(obj.name or obj.id), obj.id
+
+@dataclass(frozen=True)
+class ObjectFilter:
+    """
+    Selects objects by category and type, a field that is None matches all
+    """
+
+    category: str | None = None
+    type: str | None = None
+
+    @classmethod
+    def create(cls, category: str | None, type_: str | None) -> "ObjectFilter | None":
+        """
+        Creates a filter, or returns None if it would match all objects
+        """
+        if not category and not type_:
+            return None
+
+        return cls(category=category or None, type=type_ or None)
+
+_WORDS = re.compile(r'\w+')
+
+MAX_PREFIX_LENGTH = 16
+"""
+The length of the longest indexed prefix of a word, longer search terms are
+matched by checking the names of the objects found by their prefix
+"""
+
+def search_terms(text: str) -> tuple[str, ...]:
+    """
+    Returns the case-folded words in the given text
+    """
+    return tuple(_WORDS.findall(text.casefold()))
+
+@functools.lru_cache(maxsize=4096)
+def _name_prefixes(name: str) -> frozenset[str]:
+    """
+    Returns all prefixes of the words in the given name, up to the maximum
+    prefix length
+    """
+    return frozenset(
+        word[:length]
+        for word in search_terms(name)
+        for length in range(1, min(len(word), MAX_PREFIX_LENGTH) + 1)
+    )
+
+def _object_prefixes(objects: Iterable[ObjectMeta]) -> frozenset[str]:
+    return frozenset().union(*(_name_prefixes(obj.name) for obj in objects if obj.name))
+
+def _matches(name: str, terms: tuple[str, ...]) -> bool:
+    """
+    Checks whether the name contains a word starting with each of the terms
+    """
+    words = search_terms(name)
+
+    return all(any(word.startswith(term) for word in words) for term in terms)
+
+def _index_by(
+    objects: tuple[ObjectMeta, ...],
+    field: str,
+) -> dict[str, tuple[int, ...]]:
+    """
+    Returns the positions of the objects per case-folded value of the field
+    """
+    index: dict[str, list[int]] = {}
+
+    for position, obj in enumerate(objects):
+        if isinstance(value := getattr(obj, field), str):
+            index.setdefault(value.casefold(), []).append(position)
+
+    return {value: tuple(positions) for value, positions in index.items()}
+
+def _index_by_name(objects: Iterable[ObjectMeta]) -> dict[str, frozenset[str]]:
+    """
+    Returns the IDs of the objects per prefix of the words in their name
+    """
+    index: dict[str, set[str]] = {}
+
+    for obj in objects:
+        if obj.name:
+            for prefix in _name_prefixes(obj.name):
+                index.setdefault(prefix, set()).add(obj.id)
+
+    return {prefix: frozenset(ids) for prefix, ids in index.items()}
+
+@dataclass(frozen=True)
+class ObjectIndex:
+    """
+    The objects in the app configs of an asset tree, indexed by category,
+    type and the words in their name, so selecting or searching a subset
+    does not scan all objects
+    """
+
+    objects: tuple[ObjectMeta, ...]
+    by_category: dict[str, tuple[int, ...]]
+    by_type: dict[str, tuple[int, ...]]
+    by_id: dict[str, tuple[int, ...]]
+    by_name: dict[str, frozenset[str]]
+    """
+    The IDs of the objects per prefix of the words in their name
+    """
+
+    @classmethod
+    def build(cls, objects: tuple[ObjectMeta, ...]) -> "ObjectIndex":
+        """
+        Indexes the given objects
+        """
+        return cls(
+            objects=objects,
+            by_category=_index_by(objects, 'category'),
+            by_type=_index_by(objects, 'type'),
+            by_id=_index_by(objects, 'id'),
+            by_name=_index_by_name(objects),
+        )
+
+    def update(self, objects: tuple[ObjectMeta, ...]) -> "ObjectIndex":
+        """
+        Returns the index of the given objects, which replace the indexed ones
+
+        Only the name index entries of the objects that were added, removed
+        or changed are updated, the index itself is left untouched.
+        """
+        if objects == self.objects:
+            return self
+
+        changed_ids = {obj.id for obj in set(objects).symmetric_difference(self.objects)}
+        by_id = _index_by(objects, 'id')
+        by_name = dict(self.by_name)
+
+        for object_id in changed_ids:
+            old = _object_prefixes(self.objects[pos] for pos in self.by_id.get(object_id, ()))
+            new = _object_prefixes(objects[pos] for pos in by_id.get(object_id, ()))
+
+            for prefix in old - new:
+                if not (ids := by_name[prefix] - {object_id}):
+                    del by_name[prefix]
+                else:
+                    by_name[prefix] = ids
+
+            for prefix in new - old:
+                by_name[prefix] = by_name.get(prefix, frozenset()) | {object_id}
+
+        return ObjectIndex(
+            objects=objects,
+            by_category=_index_by(objects, 'category'),
+            by_type=_index_by(objects, 'type'),
+            by_id=by_id,
+            by_name=by_name,
+        )
+
+    @functools.cached_property
+    def sort_order(self) -> tuple[int, ...]:
+        """
+        The positions of the objects, sorted by their sort key
+        """
+        return tuple(sorted(range(len(self.objects)), key=lambda pos: sort_key(self.objects[pos])))
+
+    def select(self, object_filter: ObjectFilter | None) -> tuple[ObjectMeta, ...]:
+        """
+        Returns the objects matching the filter, in their original order
+        """
+        if (positions := self._select_positions(object_filter)) is None:
+            return self.objects
+
+        return tuple(self.objects[position] for position in sorted(positions))
+
+    def select_sorted(self, object_filter: ObjectFilter | None) -> tuple[ObjectMeta, ...]:
+        """
+        Returns the objects matching the filter, sorted by their sort key
+        """
+        positions = self._select_positions(object_filter)
+
+        return tuple(
+            self.objects[position]
+            for position in self.sort_order
+            if positions is None or position in positions
+        )
+
+    def _select_positions(self, object_filter: ObjectFilter | None) -> set[int] | None:
+        """
+        Returns the positions of the objects matching the filter, or None if
+        all objects match
+        """
+        if object_filter is None:
+            return None
+
+        selections = [
+            set(index.get(value.casefold(), ()))
+            for index, value in (
+                (self.by_category, object_filter.category),
+                (self.by_type, object_filter.type),
+            )
+            if value is not None
+        ]
+
+        if not selections:
+            return None
+
+        return set.intersection(*selections)
+
+    def search(self, query: str) -> tuple[ObjectMeta, ...]:
+        """
+        Returns the objects with a name containing a word starting with each
+        of the words in the query, in their original order
+
+        The time this takes depends on the amount of objects found, not on
+        the amount of objects indexed.
+        """
+        if not (terms := search_terms(query)):
+            return ()
+
+        ids = frozenset.intersection(*(
+            self.by_name.get(term[:MAX_PREFIX_LENGTH], frozenset()) for term in terms
+        ))
+        positions = sorted(position for object_id in ids for position in self.by_id[object_id])
+
+        # Objects sharing an ID are found by the name of either of them, and
+        # terms longer than the indexed prefixes only match by their prefix
+        return tuple(
+            obj
+            for obj in (self.objects[position] for position in positions)
+            if obj.name and _matches(obj.name, terms)
+        )
+
+def compact_app_config(
+    values: str | None,
+    exists: Callable[[str], bool] | None = None,
+) -> tuple[str | None, int]:
+    """
+    Compacts the objects in the values or state values of an app config, and
+    returns them along with the amount of entries that were removed
+
+    Fields without a value and repeated entries are removed, and when given,
+    the entries of the objects which do not exist according to `exists`. The
+    values are encoded as minimal JSON. Values which are not a list of
+    entries are returned as they are.
+    """
+    if not values:
+        return values, 0
+
+    try:
+        items = json.loads(values)
+    except ValueError:
+        return values, 0
+
+    if not isinstance(items, list):
+        return values, 0
+
+    compacted: list[Any] = []
+    seen: set[str] = set()
+
+    for item in items:
+        if isinstance(item, dict):
+            if exists is not None and isinstance(item.get("id"), str) and not exists(item["id"]):
+                continue
+            item = {key: value for key, value in item.items() if value is not None}
+
+        if (encoded := json.dumps(item, separators=(',', ':'), sort_keys=True)) not in seen:
+            seen.add(encoded)
+            compacted.append(item)
+
+    return (
+        json.dumps(compacted, separators=(',', ':'), ensure_ascii=False),
+        len(items) - len(compacted),
+    )
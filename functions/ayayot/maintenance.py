@@ -0,0 +1,427 @@
+"""
+Maintenance jobs over the app configs of all assets of a template, and the
+objects they reference
+
+These are not run by the function worker, but offline by the scripts in
+`tools`, with an API client of their own.
+"""
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import enum
+import heapq
+import itertools
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, TypeVar
+import uuid
+
+from ixoncdkingress.function.api_client import ApiClient
+
+from . import api
+from .documents import compact_app_config
+from .ratelimit import Limit, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+PAGE_SIZE = 500
+"""
+The amount of app configs requested per page
+"""
+
+APP_CONFIG_FIELDS = ('values', 'stateValues')
+
+_LISTED_OBJECT = re.compile(
+    r'(?:^|/)assets/([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})(?:/|$)',
+    re.IGNORECASE,
+)
+"""
+Matches the key of an uploaded object, which is stored under its UUID, so
+the folders of assets, `assets/{assetPublicId}/...`, are not matched
+"""
+
+class MaintenanceError(Exception):
+    """
+    Raised when the IXON API does not answer a maintenance job as expected
+    """
+
+def create_api_client(environ: dict[str, str] | None = None) -> ApiClient:
+    """
+    Creates an API client from the `IXON_API_*` environment variables, which
+    are also used to deploy, with the access token from
+    `IXON_API_ACCESS_TOKEN` or the `.accesstoken` file
+    """
+    environ = dict(os.environ) if environ is None else environ
+
+    if not (token := environ.get('IXON_API_ACCESS_TOKEN', '')):
+        try:
+            with open('.accesstoken', encoding='utf-8') as file:
+                token = file.read().strip()
+        except OSError as exception:
+            raise MaintenanceError('No IXON API access token found') from exception
+
+    return ApiClient(
+        environ.get('IXON_API_BASE_URL', 'https://api.ayayot.com'),
+        api_application=environ.get('IXON_API_APPLICATION_ID'),
+        api_company=environ.get('IXON_API_COMPANY_ID'),
+        authorization=f'Bearer {token}',
+    )
+
+def batched(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    """
+    Yields the items in lists of at most the given size
+    """
+    iterator = iter(items)
+
+    while batch := list(itertools.islice(iterator, max(size, 1))):
+        yield batch
+
+def iter_app_configs(
+    api_client: ApiClient,
+    template_id: str,
+    fields: str = 'publicId,asset.publicId,values,stateValues',
+) -> Iterator[dict[str, Any]]:
+    """
+    Yields the app configs of all assets of the template, a page at a time,
+    so only a single page is held in memory
+    """
+    after: str | None = None
+
+    while True:
+        query: dict[str, Any] = {
+            'filters': [f'eq(app.publicId,"{template_id}")'],
+            'fields': fields,
+            'page-size': str(PAGE_SIZE),
+        }
+        if after is not None:
+            query['page-after'] = after
+
+        response = api.get(api_client, 'AssetAppConfigList', query=query)
+        if response.get('status') != 'success':
+            raise MaintenanceError(f'Failed to list the app configs: {response.get("data")}')
+
+        yield from response['data']
+
+        if not (after := response.get('moreAfter')):
+            return
+
+def parse_listing(lines: Iterable[str]) -> Iterator[tuple[str, str]]:
+    """
+    Yields the keys and IDs of the objects in a listing of the object storage,
+    which has the key of an object, `assets/{uuid}/...`, on every line, along
+    with other columns
+
+    Only keys under a UUID are yielded, as those of other files, such as the
+    files in the folder of an asset, are not referenced by the app configs
+    and would be reported as orphans otherwise.
+    """
+    for line in lines:
+        for key in reversed(line.split()):
+            if match := _LISTED_OBJECT.search(key):
+                yield key, match[1]
+                break
+
+@dataclass
+class CompactionOptions:
+    """
+    The options of a compaction job
+    """
+
+    dry_run: bool = True
+    """
+    Whether to only report what would be compacted, without writing
+    """
+    batch_size: int = 100
+    """
+    The amount of app configs compacted before the changed ones are written
+    """
+    concurrency: int = 4
+    """
+    The maximum amount of app configs written at the same time
+    """
+
+@dataclass
+class CompactionReport:  # pylint: disable=too-many-instance-attributes
+    """
+    What a compaction job did, or would do in a dry run
+    """
+
+    configs: int = 0
+    changed: int = 0
+    removed: int = 0
+    """
+    The amount of entries removed from the changed app configs
+    """
+    bytes_before: int = 0
+    bytes_after: int = 0
+    written: int = 0
+    skipped: int = 0
+    """
+    The amount of changed app configs that were modified meanwhile, and were
+    not written
+    """
+    failed: int = 0
+
+class WriteResult(enum.Enum):
+    """
+    The result of writing a compacted app config
+    """
+
+    WRITTEN = 'written'
+    SKIPPED = 'skipped'
+    FAILED = 'failed'
+
+def _write_app_config(
+    api_client: ApiClient,
+    app_config: dict[str, Any],
+    compacted: dict[str, str | None],
+) -> WriteResult:
+    """
+    Writes the compacted fields of an app config, unless it was modified
+    since it was read
+    """
+    url_args = {'publicId': app_config['publicId']}
+
+    current = api.get(
+        api_client, 'AssetAppConfig', url_args, query={'fields': ','.join(APP_CONFIG_FIELDS)},
+    )
+    if current.get('status') != 'success' or any(
+            current['data'].get(field) != app_config.get(field) for field in APP_CONFIG_FIELDS
+        ):
+        return WriteResult.SKIPPED
+
+    api.LIMITER.acquire('AssetAppConfig')
+    response = api_client.patch('AssetAppConfig', compacted, url_args=url_args)
+
+    if response.get('status') != 'success':
+        logger.error('Failed to write app config %s: %s', url_args['publicId'], response)
+        return WriteResult.FAILED
+
+    return WriteResult.WRITTEN
+
+def _compact(
+    app_config: dict[str, Any],
+    exists: Callable[[str], bool] | None,
+    report: CompactionReport,
+) -> dict[str, str | None] | None:
+    """
+    Returns the compacted fields of an app config, or None if compacting
+    does not change it
+    """
+    compacted: dict[str, str | None] = {}
+    removed = 0
+
+    for field in APP_CONFIG_FIELDS:
+        compacted[field], field_removed = compact_app_config(app_config.get(field), exists)
+        removed += field_removed
+
+    before = sum(len(app_config.get(field) or '') for field in APP_CONFIG_FIELDS)
+    after = sum(len(value or '') for value in compacted.values())
+
+    report.configs += 1
+    if all(compacted[field] == app_config.get(field) for field in APP_CONFIG_FIELDS):
+        return None
+
+    report.changed += 1
+    report.removed += removed
+    report.bytes_before += before
+    report.bytes_after += after
+
+    return compacted
+
+def compact_app_configs(
+    api_client: ApiClient,
+    template_id: str,
+    exists: Callable[[str], bool] | None,
+    options: CompactionOptions,
+) -> CompactionReport:
+    """
+    Compacts the values and state values of the app configs of all assets of
+    the template, removing the entries of the objects that do not exist
+    according to `exists` when it is given
+
+    The app configs are handled in batches, and the changed ones of a batch
+    are written concurrently. An app config which was modified since it was
+    read is skipped, so uploads and deletes done while the job runs are only
+    undone if they happen between that check and the write.
+    """
+    report = CompactionReport()
+
+    with ThreadPoolExecutor(max_workers=max(options.concurrency, 1)) as executor:
+        for batch in batched(iter_app_configs(api_client, template_id), options.batch_size):
+            changes = [
+                (app_config, compacted)
+                for app_config in batch
+                if (compacted := _compact(app_config, exists, report)) is not None
+            ]
+
+            if options.dry_run:
+                continue
+
+            results = Counter(executor.map(
+                lambda change: _write_app_config(api_client, *change),
+                changes,
+            ))
+            report.written += results[WriteResult.WRITTEN]
+            report.skipped += results[WriteResult.SKIPPED]
+            report.failed += results[WriteResult.FAILED]
+
+    return report
+
+class IdSet:
+    """
+    A set of object IDs that takes 16 bytes per UUID, so the IDs of millions
+    of objects fit in memory
+
+    The UUIDs are added to runs, which are sorted once they are full, and
+    merged into a single sorted array when the set is first queried. IDs
+    that are not UUIDs are kept as they are.
+    """
+
+    RUN_SIZE = 65536
+    _WIDTH = 16
+
+    _ids: bytearray
+    _run: list[bytes]
+    _runs: list[bytes]
+    _other: set[str]
+
+    def __init__(self) -> None:
+        self._ids = bytearray()
+        self._run = []
+        self._runs = []
+        self._other = set()
+
+    def add(self, object_id: str) -> None:
+        """
+        Adds the given ID to the set, which may not be queried afterwards
+        """
+        try:
+            self._run.append(uuid.UUID(object_id).bytes)
+        except ValueError:
+            self._other.add(object_id)
+            return
+
+        if len(self._run) >= self.RUN_SIZE:
+            self._end_run()
+
+    def _end_run(self) -> None:
+        self._runs.append(b''.join(sorted(self._run)))
+        self._run = []
+
+    def _entries(self, run: bytes | bytearray) -> Iterator[bytes]:
+        return (run[start:start + self._WIDTH] for start in range(0, len(run), self._WIDTH))
+
+    def _merge(self) -> None:
+        """
+        Merges the runs into the sorted array, leaving out repeated IDs
+        """
+        if self._run:
+            self._end_run()
+
+        if self._runs:
+            ids = bytearray()
+            merged = heapq.merge(*map(self._entries, [self._ids, *self._runs]))
+            for entry, _ in itertools.groupby(merged):
+                ids += entry
+
+            self._ids = ids
+            self._runs = []
+
+    def __len__(self) -> int:
+        self._merge()
+
+        return len(self._ids) // self._WIDTH + len(self._other)
+
+    def __contains__(self, object_id: object) -> bool:
+        if not isinstance(object_id, str):
+            return False
+
+        try:
+            key = uuid.UUID(object_id).bytes
+        except ValueError:
+            return object_id in self._other
+
+        self._merge()
+
+        low, high = 0, len(self._ids) // self._WIDTH
+        while low < high:
+            middle = (low + high) // 2
+            if self._ids[middle * self._WIDTH:(middle + 1) * self._WIDTH] < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        return self._ids[low * self._WIDTH:(low + 1) * self._WIDTH] == key
+
+def _referenced_in(values: str | None) -> Iterator[str]:
+    """
+    Yields the IDs of all objects in the given values of an app config
+
+    Unlike decoding them, this does not skip objects with other fields of an
+    unexpected type, as an object that is skipped would be deleted.
+
+    Raises ValueError if the values are not a JSON list.
+    """
+    if not isinstance(items := json.loads(values or '[]'), list):
+        raise ValueError('Not a list of objects')
+
+    for item in items:
+        if isinstance(item, dict) and isinstance(object_id := item.get('id'), str):
+            yield object_id
+
+def referenced_ids(api_client: ApiClient, template_id: str) -> IdSet:
+    """
+    Returns the IDs of all objects referenced by the app configs of all
+    assets of the template, including those the authorize functions skip
+
+    Raises MaintenanceError if an app config cannot be decoded.
+    """
+    ids = IdSet()
+
+    for app_config in iter_app_configs(api_client, template_id, 'publicId,values,stateValues'):
+        try:
+            for field in APP_CONFIG_FIELDS:
+                for object_id in _referenced_in(app_config.get(field)):
+                    ids.add(object_id)
+        except ValueError as exception:
+            # The objects it references are unknown, so none may be orphaned
+            raise MaintenanceError(
+                f'Failed to decode app config {app_config.get("publicId")}',
+            ) from exception
+
+    return ids
+
+def find_orphans(listing: Iterable[tuple[str, str]], referenced: IdSet) -> Iterator[str]:
+    """
+    Yields the keys of the listed objects that are not referenced
+    """
+    for key, object_id in listing:
+        if object_id not in referenced:
+            yield key
+
+def delete_in_batches(
+    keys: Iterable[str],
+    delete: Callable[[list[str]], None],
+    batch_size: int,
+    rate: float,
+) -> int:
+    """
+    Deletes the objects with the given keys in batches, at most `rate`
+    batches per second, and returns how many were deleted
+    """
+    bucket = TokenBucket(Limit(rate, 1))
+    deleted = 0
+
+    for batch in batched(keys, batch_size):
+        time.sleep(bucket.reserve())
+        delete(batch)
+        deleted += len(batch)
+
+    return deleted
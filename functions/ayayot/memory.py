@@ -0,0 +1,193 @@
+"""
+Opt-in accounting of the memory allocated by the exposed functions
+
+When enabled, tracemalloc traces all allocations of the worker, and the peak
+allocated while handling a call is counted in the `memory.*` metrics. Calls
+that exceed the memory budget are logged with their largest allocations.
+
+The budget is not a hard limit. A call that holds more than the budget
+requests and parses the rest of its large lookups in ever smaller chunks,
+and calls that exceeded it shrink the chunks of later calls, until calls stay
+well within the budget again. What a call has to return is still allocated.
+
+Tracing is process wide, so calls that run at the same time are attributed
+each other's allocations. The peak is only reset when no other call is being
+traced, so the peak of overlapping calls is counted from the first of them.
+"""
+from collections.abc import Callable, Iterator
+import contextvars
+import functools
+import logging
+import threading
+import tracemalloc
+from typing import Any, TypeVar
+
+from . import metrics, settings
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar('F', bound=Callable[..., Any])
+T = TypeVar('T')
+
+ENABLED = settings.get_bool('TRACEMALLOC', False)
+FRAMES = settings.get_int('TRACEMALLOC_FRAMES', 1)
+"""
+The amount of frames traced per allocation, more frames give more precise
+reports but slow down tracing
+"""
+BUDGET = settings.get_int('MEMORY_BUDGET', 0)
+"""
+The bytes a call may allocate before it is logged and the chunks are shrunk,
+0 disables the budget
+"""
+TOP_ALLOCATIONS = 10
+MAX_DIVISOR = 128
+"""
+The most the chunk sizes are divided by
+"""
+
+_lock = threading.Lock()
+_divisor: int = 1
+"""
+What the chunk sizes are divided by, doubled whenever a call exceeds the
+budget, and halved whenever a call allocates less than half of it
+"""
+_active: int = 0
+"""
+The amount of calls being traced
+"""
+_baseline: contextvars.ContextVar[int | None] = contextvars.ContextVar(
+    'memory_baseline', default=None,
+)
+"""
+The bytes that were allocated when the current call started
+"""
+
+def _start() -> None:
+    with _lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(FRAMES)
+
+def chunk_size(size: int) -> int:
+    """
+    Returns the given chunk size, shrunk while calls exceed the budget
+    """
+    return max(size // _divisor, 1)
+
+def _over_budget() -> bool:
+    """
+    Checks whether more than the budget is allocated since the current call
+    started
+    """
+    if BUDGET <= 0 or (baseline := _baseline.get()) is None:
+        return False
+
+    current, _ = tracemalloc.get_traced_memory()
+
+    return current - baseline > BUDGET
+
+def chunks(items: tuple[T, ...], size: int) -> Iterator[tuple[T, ...]]:
+    """
+    Yields the items in chunks of the given size, shrunk while calls exceed
+    the budget, and halved for the rest of the current call whenever it holds
+    more than the budget before the next chunk
+    """
+    smallest = max(size // MAX_DIVISOR, 1)
+    size = chunk_size(size)
+
+    start = 0
+    while start < len(items):
+        if size > smallest and _over_budget():
+            size = max(size // 2, smallest)
+            metrics.increment('memory.rechunked')
+
+        yield items[start:start + size]
+        start += size
+
+def _scale_chunks(peak: int) -> int:
+    """
+    Shrinks the chunks when the peak exceeds the budget, or grows them back
+    when it is less than half of it, and returns the new divisor
+    """
+    global _divisor  # pylint: disable=global-statement
+
+    with _lock:
+        if peak > BUDGET:
+            _divisor = min(_divisor * 2, MAX_DIVISOR)
+        elif peak < BUDGET // 2:
+            _divisor = max(_divisor // 2, 1)
+
+        return _divisor
+
+def reset() -> None:
+    """
+    Restores the configured chunk sizes
+    """
+    global _divisor  # pylint: disable=global-statement
+
+    with _lock:
+        _divisor = 1
+
+def report(name: str, peak: int) -> None:
+    """
+    Counts the peak allocation of a call to the function with the given name
+    and, if it exceeds the budget, logs the largest allocations and shrinks
+    the chunks of later calls
+    """
+    metrics.increment(f'memory.calls.{name}')
+    metrics.increment(f'memory.peak_bytes.{name}', peak)
+    metrics.maximum(f'memory.max_peak_bytes.{name}', peak)
+
+    if BUDGET <= 0:
+        return
+
+    divisor = _scale_chunks(peak)
+    if peak <= BUDGET:
+        return
+
+    metrics.increment(f'memory.over_budget.{name}')
+
+    statistics = tracemalloc.take_snapshot().statistics('lineno')[:TOP_ALLOCATIONS]
+    logger.warning(
+        '%s allocated %d bytes at its peak, over the budget of %d bytes, so chunks are '
+        'divided by %d from now on, the largest allocations still held are:\n%s',
+        name,
+        peak,
+        BUDGET,
+        divisor,
+        '\n'.join(map(str, statistics)),
+    )
+
+def accounted(function: F) -> F:
+    """
+    Decorator which counts the peak memory allocated by the calls of the
+    given function, when enabled by `OBJECTSTORAGE_TRACEMALLOC`
+    """
+    @functools.wraps(function)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        global _active  # pylint: disable=global-statement
+
+        if not ENABLED:
+            return function(*args, **kwargs)
+
+        _start()
+        with _lock:
+            # Resetting the peak while other calls are traced would lose theirs
+            if _active == 0:
+                tracemalloc.reset_peak()
+            _active += 1
+
+        baseline, _ = tracemalloc.get_traced_memory()
+        token = _baseline.set(baseline)
+
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            _baseline.reset(token)
+            with _lock:
+                _active -= 1
+
+            report(function.__name__, max(peak - baseline, 0))
+
+    return wrapper  # type: ignore[return-value]
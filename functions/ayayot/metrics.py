@@ -0,0 +1,35 @@
+"""
+Counters describing the work done by this function worker
+"""
+import threading
+
+_counters: dict[str, float] = {}
+_lock = threading.Lock()
+
+def increment(name: str, value: float = 1.0) -> None:
+    """
+    Adds the given value to the counter with the given name
+    """
+    with _lock:
+        _counters[name] = _counters.get(name, 0.0) + value
+
+def maximum(name: str, value: float) -> None:
+    """
+    Sets the counter with the given name to the given value, if it is higher
+    """
+    with _lock:
+        _counters[name] = max(_counters.get(name, value), value)
+
+def snapshot() -> dict[str, float]:
+    """
+    Returns the current value of all counters
+    """
+    with _lock:
+        return dict(sorted(_counters.items()))
+
+def reset() -> None:
+    """
+    Resets all counters
+    """
+    with _lock:
+        _counters.clear()
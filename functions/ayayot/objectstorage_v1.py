@@ -1,12 +1,47 @@
 """
 API that authorizes access to objects in object storage
 """
+# pylint: disable=too-many-lines
 from dataclasses import dataclass
-import json
+import functools
+import hashlib
+import os
 from typing import Any
+from ixoncdkingress.function.api_client import ApiClient
 from ixoncdkingress.function.context import FunctionContext, FunctionResource
 from ixoncdkingress.function.objectstorage.types import ResourceType, PathMapping, PathResponse, \
-    ListPathResponse, PathData
+    PathData
+
+from . import api, cache, compact, deadline, decoding, memory, metrics, profiling, settings
+from .breaker import CircuitOpenError
+from .documents import ObjectFilter, ObjectIndex, ObjectMeta
+from .compact import CompactBatchListResponse, CompactListPathResponse
+from .responses import BatchError, BatchListResponse, DocumentListData, DocumentListResponse, \
+    DocumentMeta, InvalidateData, InvalidateResponse, MetricsData, MetricsResponse, \
+    PartialListPathResponse, ProfileData, ProfileResponse
+from .warmer import WARMER
+
+APP_CONFIG_CHUNK_SIZE = max(settings.get_int('APP_CONFIG_CHUNK_SIZE', 100), 1)
+"""
+The maximum amount of assets of which the app configs are requested at once,
+larger asset trees are requested in chunks, so only the response of a single
+chunk is held in memory while it is parsed. The chunks are shrunk while calls
+exceed the memory budget, and while the call itself holds more than it.
+"""
+
+BATCH_MAX_ASSETS = max(settings.get_int('BATCH_MAX_ASSETS', 100), 1)
+"""
+The maximum amount of assets authorize_list_batch lists at once
+"""
+
+MUTATION_FRESHNESS = (
+    cache.Freshness.FRESH
+    if settings.get_bool('MUTATIONS_REQUIRE_FRESH', True)
+    else cache.Freshness.CACHED
+)
+"""
+How fresh the lookups of authorize_update and authorize_delete have to be
+"""
 
 @dataclass
 class AssetAppResult:
@@ -17,39 +52,6 @@ class AssetAppResult:
     values: str
     stateValues: str # pylint: disable=C0103
 
-@dataclass
-class ObjectMeta:
-    """
-    The metadata of an object in the object storage
-    """
-
-    id: str
-    name: str | None = None
-    order: int | None = None
-    size: int | None = None
-    type: str | None = None
-    category: str | None = None
-
-    @classmethod
-    def from_dict(cls, data: dict[str, Any]) -> "ObjectMeta | None":
-        """
-        Creates an ObjectMeta instance from a dictionary
-
-        Returns None if it cannot be parsed
-        """
-        try:
-            return cls(
-                id=data["id"],
-                name=data.get("name"),
-                order=data.get("order"),
-                size=data.get("size"),
-                type=data.get("type"),
-                category=data.get("category"),
-            )
-        except (KeyError, ValueError):
-            return None
-
-
 def _has_access_to_files_of_resource(
         company: FunctionResource,
         resource: FunctionResource,
@@ -68,6 +70,21 @@ def _has_access_to_files_of_resource(
 
     return True
 
+def _is_company_admin(context: FunctionContext) -> bool:
+    """
+    Validates if the caller is an administrator of its company
+    """
+    return context.company is not None and 'COMPANY_ADMIN' in (context.company.permissions or ())
+
+def _caller_scope(context: FunctionContext) -> str:
+    """
+    Returns the scope of the lookups done with the caller's API client, of
+    which the results depend on the permissions of the caller
+    """
+    return api.caller_scope(
+        context.company.public_id if context.company else '', context.api_client,
+    )
+
 def _format_path_for_resource(resource: FunctionResource, typ: ResourceType) -> str:
     """
     Formats the path at which files for the given resource are stored
@@ -101,29 +118,112 @@ def _create_mapping_for_resource(res: tuple[FunctionResource, ResourceType]):
         path=_format_path_for_resource(resource, typ)
     )
 
+def _create_mapping_for_object(obj: ObjectMeta) -> PathMapping:
+    return PathMapping(
+        publicId=None,
+        type=ResourceType.ASSET,
+        path=f"assets/{obj.id}",
+    )
+
+def _create_document(obj: ObjectMeta) -> DocumentMeta:
+    return DocumentMeta(
+        id=obj.id,
+        path=f"assets/{obj.id}/",
+        name=obj.name,
+        order=obj.order,
+        size=obj.size,
+        type=obj.type,
+        category=obj.category,
+    )
+
+def _documents_version(
+    resources: list[tuple[FunctionResource, ResourceType]],
+    objects: tuple[ObjectMeta, ...],
+) -> str:
+    """
+    Returns a token that changes whenever the listed resources or documents
+    change, which is the same on every worker
+    """
+    digest = hashlib.sha256()
+
+    for resource, typ in resources:
+        digest.update(f'{typ.value}:{resource.public_id}\n'.encode())
+    for obj in objects:
+        fields = (obj.id, obj.name, obj.order, obj.size, obj.type, obj.category)
+        digest.update(repr(fields).encode())
+
+    return digest.hexdigest()[:16]
+
 def _create_multi_response(
-    context: FunctionContext, resources: list[tuple[FunctionResource, ResourceType]]
-) -> ListPathResponse:
+    context: FunctionContext,
+    resources: list[tuple[FunctionResource, ResourceType]],
+    freshness: cache.Freshness = cache.Freshness.CACHED,
+    object_filter: ObjectFilter | None = None,
+) -> PartialListPathResponse:
     """
     Creates a multi-path response, as is used by authorize_list
+
+    When a filter is given, only the mappings of the matching objects are
+    returned, so the caller may list those but not the rest. The mappings of
+    the objects are skipped when too little time is left.
     """
-    mappings = list(map(_create_mapping_for_resource, resources))
-    mappings.extend(
-        _get_asset_app_config_object_mappings(
-            context,
-            [resource for resource, typ in resources if typ == ResourceType.ASSET],
+    mappings = [] if object_filter else list(map(_create_mapping_for_resource, resources))
+    if deadline.allows_optional_work():
+        mappings.extend(
+            _get_asset_app_config_object_mappings(
+                context,
+                [resource for resource, typ in resources if typ == ResourceType.ASSET],
+                freshness,
+                object_filter,
+            )
         )
-    )
 
-    return ListPathResponse(
+    return PartialListPathResponse(
         result="success",
         data=mappings,
     )
 
 
+def _create_compact_response(
+    context: FunctionContext,
+    resources: list[tuple[FunctionResource, ResourceType]],
+    object_filter: ObjectFilter | None,
+    response_format: str,
+) -> CompactListPathResponse:
+    """
+    Creates the response of _create_multi_response in a compact format,
+    without creating a mapping for every object
+    """
+    objects: tuple[ObjectMeta, ...] = ()
+    if deadline.allows_optional_work():
+        objects = _get_asset_app_config_objects(
+            context,
+            [resource for resource, typ in resources if typ == ResourceType.ASSET],
+            cache.Freshness.STALE,
+            object_filter,
+        )
+
+    return compact.create_list_response(
+        compact.encode([] if object_filter else resources, [obj.id for obj in objects]),
+        response_format,
+    )
+
+def _fetch_asset_descendants(api_client: ApiClient, asset_id: str) -> cache.DescendantList:
+    """
+    Fetches the public ID and name of all descendants of the given asset
+    """
+    result: list[dict[str, str]] = api.data(api.get(
+        api_client,
+        "AssetDescendantList",
+        {"publicId": asset_id, "fields": "publicId,name"},
+    ))
+
+    return tuple((res["publicId"], res["name"]) for res in result)
+
 def _add_asset_descendant_resources(
     context: FunctionContext,
     resources: list[tuple[FunctionResource, ResourceType]],
+    freshness: cache.Freshness = cache.Freshness.CACHED,
 ) -> list[tuple[FunctionResource, ResourceType]]:
     """
     Adds all resources that are descendants of the given asset to the given resources list
@@ -131,82 +231,239 @@ def _add_asset_descendant_resources(
     children: list[tuple[FunctionResource, ResourceType]] = []
     for resource, r_type in resources:
         if r_type == ResourceType.ASSET:
-            result: list[dict[str, str]] = context.api_client.get(
-                "AssetDescendantList",
-                {"publicId": resource.public_id, "fields": "publicId,name"},
-            )["data"]
+            descendants = cache.DESCENDANTS.get_or_load(
+                (_caller_scope(context), resource.public_id),
+                functools.partial(_fetch_asset_descendants, context.api_client, resource.public_id),
+                freshness,
+            )
             children.extend(
                 [
                     (
                         FunctionResource(
-                            public_id=res["publicId"],
-                            name=res["name"],
+                            public_id=public_id,
+                            name=name,
                             custom_properties={},
                             permissions=set(),
                         ),
                         ResourceType.ASSET,
                     )
-                    for res in result
+                    for public_id, name in descendants
                 ]
             )
 
     resources.extend(children)
     return resources
 
-def _get_asset_app_config_object_mappings(
-    context: FunctionContext,
-    asset_resources: list[FunctionResource],
-) -> list[PathMapping]:
+def _fetch_app_config_objects_chunk(
+    api_client: ApiClient,
+    template_id: str,
+    asset_ids: tuple[str, ...],
+) -> list[ObjectMeta]:
     """
-    Returns a list of all asset app config objects
+    Fetches the metadata of all objects in the app configs of the given
+    assets with a single request
     """
-    if not context.template or not asset_resources:
-        return []
-
-    pub_ids = [f'"{res.public_id}"' for res in asset_resources]
-    result: list[dict[str, Any]] = context.api_client.get(
+    pub_ids = [f'"{asset_id}"' for asset_id in asset_ids]
+    result: list[dict[str, Any]] = api.data(api.get(
+        api_client,
         "AssetAppConfigList",
         query={
             "filters": [
-                f'eq(app.publicId,"{context.template.public_id}")',
+                f'eq(app.publicId,"{template_id}")',
                 f"in(asset.publicId,{','.join(pub_ids)})",
             ],
             "fields": "values,stateValues",
         },
-    )["data"]
+    ))
 
     return [
-        PathMapping(
-            publicId=None,
-            type=ResourceType.ASSET,
-            path=f"assets/{file}",
-        )
+        obj
         for app in result
-        if (files := _parse_asset_meta(AssetAppResult(
+        for obj in _parse_asset_objects(AssetAppResult(
             values=app["values"],
             stateValues=app["stateValues"],
-        )))
-        for file in files
+        ))
     ]
 
+def _fetch_asset_app_config_objects(
+    api_client: ApiClient,
+    scope: str,
+    template_id: str,
+    asset_ids: tuple[str, ...],
+) -> ObjectIndex:
+    """
+    Fetches the metadata of all objects in the app configs of the given
+    assets, for the caller with the given scope
+    """
+    objects = tuple(
+        obj
+        for chunk in memory.chunks(asset_ids, APP_CONFIG_CHUNK_SIZE)
+        for obj in _fetch_app_config_objects_chunk(api_client, template_id, chunk)
+    )
 
-def _parse_asset_meta(asset_app_config: AssetAppResult | None) -> list[str]:
+    # When the objects are reloaded, only the changed ones are reindexed
+    if (previous := cache.APP_CONFIG_OBJECTS.entry((scope, template_id, asset_ids))) is not None:
+        return previous.value.update(objects)
+
+    return ObjectIndex.build(objects)
+
+def _fetch_app_config_objects_by_asset(
+    api_client: ApiClient,
+    template_id: str,
+    asset_ids: tuple[str, ...],
+) -> dict[str, list[ObjectMeta]]:
     """
-    Parses the metadata of an asset
+    Fetches the metadata of all objects in the app configs of the given
+    assets in chunks, grouped by the public ID of their asset
+    """
+    objects: dict[str, list[ObjectMeta]] = {}
+
+    for chunk in memory.chunks(asset_ids, APP_CONFIG_CHUNK_SIZE):
+        pub_ids = [f'"{asset_id}"' for asset_id in chunk]
+        result: list[dict[str, Any]] = api.data(api.get(
+            api_client,
+            "AssetAppConfigList",
+            query={
+                "filters": [
+                    f'eq(app.publicId,"{template_id}")',
+                    f"in(asset.publicId,{','.join(pub_ids)})",
+                ],
+                "fields": "asset.publicId,values,stateValues",
+            },
+        ))
+
+        for app in result:
+            objects.setdefault(app["asset"]["publicId"], []).extend(_parse_asset_objects(
+                AssetAppResult(values=app["values"], stateValues=app["stateValues"]),
+            ))
+
+    return objects
+
+def _get_asset_app_config_index(
+    context: FunctionContext,
+    asset_resources: list[FunctionResource],
+    freshness: cache.Freshness = cache.Freshness.CACHED,
+) -> ObjectIndex:
+    """
+    Returns the index of all asset app config objects
+    """
+    if not context.template or not asset_resources:
+        return ObjectIndex.build(())
+
+    template_id = context.template.public_id
+    asset_ids = tuple(res.public_id for res in asset_resources)
+
+    scope = _caller_scope(context)
+
+    return cache.APP_CONFIG_OBJECTS.get_or_load(
+        (scope, template_id, asset_ids),
+        functools.partial(
+            _fetch_asset_app_config_objects, context.api_client, scope, template_id, asset_ids,
+        ),
+        freshness,
+    )
+
+def _get_asset_app_config_objects(
+    context: FunctionContext,
+    asset_resources: list[FunctionResource],
+    freshness: cache.Freshness = cache.Freshness.CACHED,
+    object_filter: ObjectFilter | None = None,
+) -> tuple[ObjectMeta, ...]:
+    """
+    Returns the metadata of the asset app config objects matching the filter
+    """
+    return _get_asset_app_config_index(context, asset_resources, freshness).select(object_filter)
+
+def _get_asset_app_config_object_mappings(
+    context: FunctionContext,
+    asset_resources: list[FunctionResource],
+    freshness: cache.Freshness = cache.Freshness.CACHED,
+    object_filter: ObjectFilter | None = None,
+) -> list[PathMapping]:
+    """
+    Returns a list of the asset app config objects matching the filter
+    """
+    return list(map(
+        _create_mapping_for_object,
+        _get_asset_app_config_objects(context, asset_resources, freshness, object_filter),
+    ))
+
+def refresh_asset_tree_caches(
+    api_client: ApiClient,
+    scope: str,
+    asset_id: str,
+    template_id: str,
+) -> None:
+    """
+    Refreshes the cached descendants of the given asset and the cached app
+    config objects of the asset and its descendants, as looked up with the
+    given client, which has the given scope
+    """
+    descendants = _fetch_asset_descendants(api_client, asset_id)
+    cache.DESCENDANTS.set((scope, asset_id), descendants)
+
+    asset_ids = (asset_id, *(public_id for public_id, _ in descendants))
+    cache.APP_CONFIG_OBJECTS.set(
+        (scope, template_id, asset_ids),
+        _fetch_asset_app_config_objects(api_client, scope, template_id, asset_ids),
+    )
+
+def _record_authorization(context: FunctionContext, target: FunctionResource) -> None:
+    """
+    Records the authorization of the given asset with the cache warmer
+    """
+    if not context.template:
+        return
+
+    scope = _caller_scope(context)
+
+    WARMER.record(
+        scope,
+        target.public_id,
+        context.template.public_id,
+        functools.partial(
+            refresh_asset_tree_caches,
+            context.api_client,
+            scope,
+            target.public_id,
+            context.template.public_id,
+        ),
+    )
+
+
+def _parse_asset_objects(asset_app_config: AssetAppResult | None) -> list[ObjectMeta]:
+    """
+    Parses the metadata of the objects of an asset
     """
     if not asset_app_config:
         return []
 
-    objects = [
-        ObjectMeta.from_dict(item)
-        for item in json.loads(asset_app_config.values or "[]")
-    ] + [
-        ObjectMeta.from_dict(item)
-        for item in json.loads(asset_app_config.stateValues or "[]")
-    ]
+    return decoding.decode_objects(asset_app_config.values, asset_app_config.stateValues)
+
+def _parse_asset_meta(asset_app_config: AssetAppResult | None) -> list[str]:
+    """
+    Parses the metadata of an asset
+    """
+    return [object.id for object in _parse_asset_objects(asset_app_config)]
+
+
+def _cached_index(context: FunctionContext, target: FunctionResource) -> ObjectIndex:
+    """
+    Returns the cached index of the objects of the tree of the target, expired
+    or not, as looked up by the caller, or an empty index when it is not cached
+    """
+    index = None if not context.template else cache.cached_tree_index(
+        _caller_scope(context), target.public_id, context.template.public_id,
+    )
 
-    return [object.id for object in objects if object]
+    return index or ObjectIndex.build(())
 
+def _has_cached_object(context: FunctionContext, target: FunctionResource, uuid: str) -> bool:
+    """
+    Checks whether the cached objects of the tree of the target, expired or
+    not, as looked up by the caller, contain the object with the given uuid
+    """
+    return uuid in _cached_index(context, target).by_id
 
 def _request_for(context: FunctionContext) -> tuple[FunctionResource, ResourceType] | None:
     """
@@ -234,6 +491,7 @@ def _authorize_single(
     uuid: str | None,
     check_has_manage: bool,
     upload: bool = False,
+    freshness: cache.Freshness = cache.Freshness.CACHED,
 ) -> PathResponse | None:
     if (target_typ := _request_for(context)) is None:
         return None
@@ -254,21 +512,36 @@ def _authorize_single(
         if upload:
             return PathResponse(result="success", data=PathData(path=path))
 
-        mappings = _get_asset_app_config_object_mappings(
-            context,
-            [
-                target
-                for target, _ in _add_asset_descendant_resources(
-                    context, [(target, typ)]
-                )
-            ],
-        )
-        if f"assets/{uuid}" in [mapping["path"] for mapping in mappings]:
+        _record_authorization(context, target)
+        try:
+            mappings = _get_asset_app_config_object_mappings(
+                context,
+                [
+                    target
+                    for target, _ in _add_asset_descendant_resources(
+                        context, [(target, typ)], freshness
+                    )
+                ],
+                freshness,
+            )
+            found = f"assets/{uuid}" in [mapping["path"] for mapping in mappings]
+        except (CircuitOpenError, deadline.DeadlineExceeded):
+            # The IXON API is failing or too slow, so only a cached lookup is
+            # used, unless the caller requires a fresh one
+            metrics.increment('degraded.authorize_single')
+            found = freshness is not cache.Freshness.FRESH and _has_cached_object(
+                context, target, uuid,
+            )
+
+        if found:
             return PathResponse(result="success", data=PathData(path=path))
 
     return _create_single_response(target, typ)
 
 @FunctionContext.expose
+@profiling.profiled
+@memory.accounted
+@deadline.budgeted
 def authorize_upload(context: FunctionContext, uuid: str | None = None) -> PathResponse | None:
     """
     Method to validate if and where the caller is allowed
@@ -276,13 +549,11 @@ def authorize_upload(context: FunctionContext, uuid: str | None = None) -> PathR
     """
     return _authorize_single(context, uuid, True, upload=True)
 
-@FunctionContext.expose
-def authorize_list(
-        context: FunctionContext
-    ) -> ListPathResponse | None:
+def _target_resources(
+    context: FunctionContext,
+) -> list[tuple[FunctionResource, ResourceType]] | None:
     """
-    Method to validate if and where the caller is allowed
-    to get the blob list from the object storage.
+    Returns the target and its linked agent
     """
     if (target_typ := _request_for(context)) is None:
         return None
@@ -295,11 +566,406 @@ def authorize_list(
     if typ == ResourceType.ASSET and context.agent is not None:
         resources.append((context.agent, ResourceType.AGENT))
 
-    _add_asset_descendant_resources(context, resources)
+    return resources
+
+def _list_resources(
+    context: FunctionContext,
+) -> list[tuple[FunctionResource, ResourceType]] | None:
+    """
+    Returns the resources whose files the caller may list: the target, its
+    linked agent and the descendants of the target, which are skipped when
+    too little time is left
+    """
+    if (resources := _target_resources(context)) is None:
+        return None
+
+    target, typ = resources[0]
+
+    if typ == ResourceType.ASSET:
+        _record_authorization(context, target)
+
+    # Listing is read-only, so a slightly stale list is served right away
+    # rather than waiting for the API
+    if deadline.allows_optional_work():
+        _add_asset_descendant_resources(context, resources, cache.Freshness.STALE)
+
+    return resources
+
+def _degrade(name: str, exception: Exception) -> None:
+    """
+    Counts the degraded response of the function with the given name, which
+    counts as partial as well when the deadline of the call was exceeded
+    """
+    metrics.increment(f'degraded.{name}')
+    if isinstance(exception, deadline.DeadlineExceeded):
+        deadline.skip()
+
+def _degraded_lookups(
+    context: FunctionContext,
+) -> tuple[list[tuple[FunctionResource, ResourceType]], ObjectIndex]:
+    """
+    Returns the resources and objects to list in a degraded response, while
+    the IXON API is failing or too slow: the target, its linked agent and
+    the cached objects of the tree of the target, expired or not
+    """
+    resources = _target_resources(context) or []
+    if not resources or resources[0][1] != ResourceType.ASSET:
+        return resources, ObjectIndex.build(())
+
+    return resources, _cached_index(context, resources[0][0])
+
+@FunctionContext.expose
+@profiling.profiled
+@memory.accounted
+@deadline.budgeted
+def authorize_list(
+        context: FunctionContext,
+        category: str | None = None,
+        object_type: str | None = None,
+        response_format: str | None = None,
+    ) -> PartialListPathResponse | CompactListPathResponse | None:
+    """
+    Method to validate if and where the caller is allowed
+    to get the blob list from the object storage.
+
+    When a category or type is given, only the paths of the documents with
+    that category and type are returned. When a compact response format is
+    given, the paths are returned in that format.
+
+    While the IXON API is failing, or once too little time is left, only the
+    paths of the target and its linked agent are returned, and the response
+    is marked as partial.
+    """
+    response: PartialListPathResponse | CompactListPathResponse
+    try:
+        if (resources := _list_resources(context)) is None:
+            return None
+
+        object_filter = ObjectFilter.create(category, object_type)
+        if response_format in compact.FORMATS:
+            response = _create_compact_response(
+                context, resources, object_filter, response_format,
+            )
+        else:
+            response = _create_multi_response(
+                context, resources, cache.Freshness.STALE, object_filter,
+            )
+    except (CircuitOpenError, deadline.DeadlineExceeded) as exception:
+        _degrade('authorize_list', exception)
+
+        response = compact.format_list_response(
+            PartialListPathResponse(
+                result="success",
+                data=list(map(_create_mapping_for_resource, _target_resources(context) or [])),
+                partial=True,
+            ),
+            response_format,
+        )
+
+    if deadline.is_partial():
+        response['partial'] = True
+
+    return response
+
+def _fetch_accessible_assets(api_client: ApiClient, asset_ids: list[str]) -> dict[str, str]:
+    """
+    Fetches the name of those of the given assets the caller may access, by
+    their public ID
+    """
+    pub_ids = [f'"{asset_id}"' for asset_id in asset_ids]
+    result: list[dict[str, str]] = api.data(api.get(
+        api_client,
+        "AssetList",
+        query={
+            "filters": [f"in(publicId,{','.join(pub_ids)})"],
+            "fields": "publicId,name",
+        },
+    ))
+
+    return {res["publicId"]: res["name"] for res in result}
+
+def _get_batch_app_config_indexes(
+    context: FunctionContext,
+    trees: dict[str, tuple[str, ...]],
+) -> dict[str, ObjectIndex]:
+    """
+    Returns the index of the app config objects of every given asset tree,
+    by the public ID of its root asset
+
+    The objects of all trees that are not cached are fetched at once, and
+    then cached per tree, as they are by _get_asset_app_config_index.
+    """
+    if not context.template:
+        return {asset_id: ObjectIndex.build(()) for asset_id in trees}
+
+    scope = _caller_scope(context)
+    template_id = context.template.public_id
+    indexes = {
+        asset_id: index
+        for asset_id, asset_ids in trees.items()
+        if (index := cache.APP_CONFIG_OBJECTS.get((scope, template_id, asset_ids))) is not None
+    }
+
+    missing = tuple(dict.fromkeys(
+        asset_id
+        for root_id, asset_ids in trees.items()
+        if root_id not in indexes
+        for asset_id in asset_ids
+    ))
+    if not missing:
+        return indexes
+
+    objects = _fetch_app_config_objects_by_asset(context.api_client, template_id, missing)
+
+    for root_id, asset_ids in trees.items():
+        if root_id not in indexes:
+            index = ObjectIndex.build(tuple(
+                obj for asset_id in asset_ids for obj in objects.get(asset_id, ())
+            ))
+            cache.APP_CONFIG_OBJECTS.set((scope, template_id, asset_ids), index)
+            indexes[root_id] = index
+
+    return indexes
+
+def _batch_error(exception: Exception) -> BatchError:
+    """
+    Returns the entry of authorize_list_batch for the assets of which the
+    access could not be checked because of the given exception
+    """
+    if isinstance(exception, api.ApiError):
+        return BatchError(error=f'Access check failed: {exception}')
+
+    return BatchError(error='Access check skipped, the IXON API is failing or too slow')
+
+@FunctionContext.expose
+@profiling.profiled
+@memory.accounted
+@deadline.budgeted
+def authorize_list_batch(  # pylint: disable=too-many-arguments
+        context: FunctionContext,
+        asset_ids: list[str],
+        category: str | None = None,
+        object_type: str | None = None,
+        response_format: str | None = None,
+    ) -> BatchListResponse | CompactBatchListResponse | None:
+    """
+    Method to validate if and where the caller is allowed to get the blob
+    lists of several assets from the object storage, as authorize_list does
+    for a single asset, for instance for a dashboard showing many assets.
+
+    The access of the caller is checked per asset, and the mappings are
+    returned per asset, or None for the assets the caller may not access.
+    The app config objects of all assets are fetched at once. When a compact
+    response format is given, the mappings are returned in that format.
+
+    While the IXON API is failing, or once too little time is left, only the
+    mappings of the assets and their cached objects are returned, and the
+    response is marked as partial. When the access itself could not be
+    checked, every asset gets a BatchError instead, so a failure is not
+    taken for a denial.
+    """
+    asset_ids = list(dict.fromkeys(asset_id for asset_id in asset_ids if asset_id))
+
+    if not context.company or not asset_ids or len(asset_ids) > BATCH_MAX_ASSETS:
+        return None
+
+    accessible: dict[str, FunctionResource] | None = None
+    resources: dict[str, list[tuple[FunctionResource, ResourceType]]] = {}
+    unchecked: BatchError | None = None
+    try:
+        accessible = {
+            asset_id: FunctionResource(
+                public_id=asset_id,
+                name=name,
+                custom_properties={},
+                permissions=set(),
+            )
+            for asset_id, name in _fetch_accessible_assets(context.api_client, asset_ids).items()
+        }
+
+        for asset_id, target in accessible.items():
+            _record_authorization(context, target)
+            resources[asset_id] = _add_asset_descendant_resources(
+                context, [(target, ResourceType.ASSET)], cache.Freshness.STALE,
+            )
+
+        indexes = _get_batch_app_config_indexes(context, {
+            asset_id: tuple(resource.public_id for resource, _ in asset_resources)
+            for asset_id, asset_resources in resources.items()
+        })
+        partial = False
+    except (api.ApiError, CircuitOpenError, deadline.DeadlineExceeded) as exception:
+        _degrade('authorize_list_batch', exception)
+
+        # Without the access check, the assets are not known to be denied
+        if accessible is None:
+            unchecked = _batch_error(exception)
+            accessible = {}
+
+        resources = {
+            asset_id: [(target, ResourceType.ASSET)] for asset_id, target in accessible.items()
+        }
+        indexes = {
+            asset_id: _cached_index(context, target) for asset_id, target in accessible.items()
+        }
+        partial = True
+
+    object_filter = ObjectFilter.create(category, object_type)
+    response: BatchListResponse | CompactBatchListResponse
+    if response_format in compact.FORMATS:
+        response = compact.create_batch_response({
+            asset_id: unchecked if asset_id not in resources else compact.encode(
+                [] if object_filter else resources[asset_id],
+                [obj.id for obj in indexes[asset_id].select(object_filter)],
+            )
+            for asset_id in asset_ids
+        }, response_format)
+    else:
+        response = BatchListResponse(
+            result='success',
+            data={
+                asset_id: unchecked if asset_id not in resources else [
+                    *([] if object_filter else map(
+                        _create_mapping_for_resource, resources[asset_id],
+                    )),
+                    *map(_create_mapping_for_object, indexes[asset_id].select(object_filter)),
+                ]
+                for asset_id in asset_ids
+            },
+        )
+
+    if partial:
+        response['partial'] = True
 
-    return _create_multi_response(context, resources)
+    return response
 
 @FunctionContext.expose
+@profiling.profiled
+@memory.accounted
+@deadline.budgeted
+def list_documents(  # pylint: disable=too-many-arguments
+        context: FunctionContext,
+        category: str | None = None,
+        object_type: str | None = None,
+        offset: int = 0,
+        limit: int | None = None,
+        version: str | None = None,
+    ) -> DocumentListResponse | None:
+    """
+    Method to get the paths the caller may list, like authorize_list, along
+    with the metadata of the documents of the caller's asset and its
+    descendants, sorted by order and name.
+
+    When a category or type is given, only the documents with that category
+    and type, and their paths, are returned. When an offset or limit is
+    given, only that page of the documents is returned, along with the total
+    amount of documents. The response is marked as partial when the
+    descendants were skipped to meet the deadline of the call, or when only
+    the cached documents are returned, as the IXON API is failing or the
+    deadline was exceeded.
+
+    The response has the version of the listed documents. When the caller
+    passes the version of the list it has, and that is still current, the
+    response is marked as unchanged and has no mappings or documents.
+    """
+    try:
+        if (resources := _list_resources(context)) is None:
+            return None
+
+        index = _get_asset_app_config_index(
+            context,
+            [resource for resource, typ in resources if typ == ResourceType.ASSET],
+            cache.Freshness.STALE,
+        )
+        partial = deadline.is_partial()
+    except (CircuitOpenError, deadline.DeadlineExceeded) as exception:
+        _degrade('list_documents', exception)
+        resources, index = _degraded_lookups(context)
+        partial = True
+
+    object_filter = ObjectFilter.create(category, object_type)
+    objects = index.select_sorted(object_filter)
+
+    current = _documents_version(resources, objects)
+    if version == current and not partial:
+        return DocumentListResponse(
+            result='success',
+            data=DocumentListData(
+                mappings=[],
+                documents=[],
+                total=len(objects),
+                version=current,
+                unchanged=True,
+            ),
+        )
+
+    offset = max(offset, 0)
+    page = objects[offset:None if limit is None else offset + max(limit, 0)]
+
+    response = DocumentListResponse(
+        result='success',
+        data=DocumentListData(
+            mappings=[
+                *([] if object_filter else map(_create_mapping_for_resource, resources)),
+                *map(_create_mapping_for_object, page),
+            ],
+            documents=list(map(_create_document, page)),
+            total=len(objects),
+            version=current,
+        ),
+    )
+
+    if partial:
+        response['partial'] = True
+
+    return response
+
+@FunctionContext.expose
+@profiling.profiled
+@memory.accounted
+@deadline.budgeted
+def search_documents(
+        context: FunctionContext,
+        query: str = '',
+        response_format: str | None = None,
+    ) -> PartialListPathResponse | CompactListPathResponse | None:
+    """
+    Method to get the paths of the documents of the caller's asset and its
+    descendants with a name containing words starting with those in the
+    query, so the caller may list only those, in the given response format.
+
+    While the IXON API is failing, or once the deadline is exceeded, only the
+    cached documents are searched, and the response is marked as partial.
+    """
+    try:
+        if (resources := _list_resources(context)) is None:
+            return None
+
+        index = _get_asset_app_config_index(
+            context,
+            [resource for resource, typ in resources if typ == ResourceType.ASSET],
+            cache.Freshness.STALE,
+        )
+        partial = deadline.is_partial()
+    except (CircuitOpenError, deadline.DeadlineExceeded) as exception:
+        _degrade('search_documents', exception)
+        index = _degraded_lookups(context)[1]
+        partial = True
+
+    response = PartialListPathResponse(
+        result="success",
+        data=list(map(_create_mapping_for_object, index.search(query))),
+    )
+
+    if partial:
+        response['partial'] = True
+
+    return compact.format_list_response(response, response_format)
+
+@FunctionContext.expose
+@profiling.profiled
+@memory.accounted
+@deadline.budgeted
 def authorize_download(context: FunctionContext, uuid: str | None = None) -> PathResponse | None:
     """
     Method to validate if and where the caller is allowed
@@ -308,17 +974,87 @@ def authorize_download(context: FunctionContext, uuid: str | None = None) -> Pat
     return _authorize_single(context, uuid, False)
 
 @FunctionContext.expose
+@profiling.profiled
+@memory.accounted
+@deadline.budgeted
 def authorize_update(context: FunctionContext, uuid: str | None = None) -> PathResponse | None:
     """
     Method to validate if and where the caller is allowed
     to update a blob in the object storage.
     """
-    return _authorize_single(context, uuid, True)
+    return _authorize_single(context, uuid, True, freshness=MUTATION_FRESHNESS)
 
 @FunctionContext.expose
+@profiling.profiled
+@memory.accounted
+@deadline.budgeted
 def authorize_delete(context: FunctionContext, uuid: str | None = None) -> PathResponse | None:
     """
     Method to validate if and where the caller is allowed
     to delete a blob from the object storage.
     """
-    return _authorize_single(context, uuid, True)
+    return _authorize_single(context, uuid, True, freshness=MUTATION_FRESHNESS)
+
+@FunctionContext.expose
+@profiling.profiled
+@memory.accounted
+@deadline.budgeted
+def invalidate_documents(context: FunctionContext) -> InvalidateResponse | None:
+    """
+    Method to evict the cached lookups of the caller's asset, after the
+    documents of that asset have changed. Also evicts the cached lookups of
+    its ancestors that include the documents of the asset.
+    """
+    if (target_typ := _request_for(context)) is None:
+        return None
+
+    target, typ = target_typ
+
+    assert context.company  # type check
+
+    if not _has_access_to_files_of_resource(context.company, target):
+        return None
+
+    evicted = 0
+    if typ == ResourceType.ASSET:
+        evicted = cache.invalidate_asset(target.public_id)
+
+    return InvalidateResponse(result='success', data=InvalidateData(evicted=evicted))
+
+@FunctionContext.expose
+def get_profile(context: FunctionContext, reset: bool = False) -> ProfileResponse | None:
+    """
+    Method for company administrators to get the profile of the sampled
+    calls to this worker, as collapsed stacks for a flame graph
+
+    Profiling is enabled by setting `OBJECTSTORAGE_PROFILE_SAMPLE_RATE`.
+    """
+    if not _is_company_admin(context):
+        return None
+
+    response = ProfileResponse(
+        result='success',
+        data=ProfileData(
+            samples=profiling.SAMPLER.samples(),
+            stacks=profiling.SAMPLER.collapsed(),
+        ),
+    )
+
+    if reset:
+        profiling.SAMPLER.reset()
+
+    return response
+
+@FunctionContext.expose
+def get_metrics(context: FunctionContext) -> MetricsResponse | None:
+    """
+    Method for company administrators to get the metrics of the worker that
+    handles the call, as every worker of a preforked server keeps its own
+    """
+    if not _is_company_admin(context):
+        return None
+
+    return MetricsResponse(
+        result='success',
+        data=MetricsData(worker=os.getpid(), counters=metrics.snapshot()),
+    )
@@ -0,0 +1,217 @@
+"""
+Opt-in sampling profiler for the exposed functions
+
+A fraction of the calls is profiled by sampling the stack of the thread
+handling the call. The samples are aggregated as collapsed stacks, the input
+format of flame graph tools such as flamegraph.pl and speedscope.
+"""
+from collections.abc import Callable, Iterator
+import contextlib
+import functools
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from types import CodeType, FrameType
+from typing import Any, TypeVar
+
+from . import metrics, settings
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+SAMPLE_RATE = settings.get_float('PROFILE_SAMPLE_RATE', 0.0)
+"""
+The fraction of the calls that is profiled, 0 disables profiling
+"""
+INTERVAL = settings.get_float('PROFILE_INTERVAL', 0.005)
+MAX_STACKS = settings.get_int('PROFILE_MAX_STACKS', 10000)
+OUTPUT_DIR = settings.get_str('PROFILE_DIR', '')
+"""
+The directory the collapsed stacks are written to after every profiled
+call, nothing is written if empty
+"""
+
+TRUNCATED = '[truncated]'
+"""
+The stack the samples are counted under once the maximum amount of distinct
+stacks is reached
+"""
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '?')
+
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+def collapse(frame: FrameType | None, root: CodeType) -> str | None:
+    """
+    Returns the stack of the given frame as a semicolon separated list of
+    function names, from the frame of the root code up to the given frame
+
+    Returns None if the frame is not called from the root code.
+    """
+    names = []
+
+    while frame is not None:
+        names.append(_frame_name(frame))
+
+        if frame.f_code is root:
+            return ';'.join(reversed(names))
+
+        frame = frame.f_back
+
+    return None
+
+class StackSampler:
+    """
+    Samples the stacks of the threads that are being profiled, from a single
+    background thread which only runs while any thread is being profiled
+    """
+
+    interval: float
+    max_stacks: int
+
+    _stacks: dict[str, int]
+    _active: dict[int, CodeType]
+    """
+    The code of the profiled function, by ID of the thread calling it
+    """
+    _condition: threading.Condition
+    _thread: threading.Thread | None
+
+    def __init__(self, interval: float, max_stacks: int) -> None:
+        self.interval = interval
+        self.max_stacks = max_stacks
+
+        self._stacks = {}
+        self._active = {}
+        self._condition = threading.Condition()
+        self._thread = None
+
+    @contextlib.contextmanager
+    def track(self, code: CodeType) -> Iterator[None]:
+        """
+        Samples the stack of the current thread while it is in the context,
+        starting at the frame of the given code
+        """
+        thread_id = threading.get_ident()
+
+        with self._condition:
+            self._active[thread_id] = code
+            self._start()
+            self._condition.notify()
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active.pop(thread_id, None)
+
+    def sample(self) -> None:
+        """
+        Samples the stacks of all threads being profiled once
+        """
+        frames = sys._current_frames()  # pylint: disable=protected-access
+
+        with self._condition:
+            for thread_id, code in self._active.items():
+                if (stack := collapse(frames.get(thread_id), code)) is None:
+                    continue
+
+                if stack not in self._stacks and len(self._stacks) >= self.max_stacks:
+                    stack = TRUNCATED
+
+                self._stacks[stack] = self._stacks.get(stack, 0) + 1
+
+    def collapsed(self) -> str:
+        """
+        Returns the samples as collapsed stacks, one `stack count` line per
+        distinct stack
+        """
+        with self._condition:
+            return ''.join(f'{stack} {count}\n' for stack, count in sorted(self._stacks.items()))
+
+    def samples(self) -> int:
+        """
+        Returns the amount of samples taken
+        """
+        with self._condition:
+            return sum(self._stacks.values())
+
+    def write(self, directory: str) -> str:
+        """
+        Writes the collapsed stacks to a file per process in the given
+        directory, and returns its path
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'profile-{os.getpid()}.folded')
+
+        with tempfile.NamedTemporaryFile('w', dir=directory, delete=False) as file:
+            file.write(self.collapsed())
+        os.replace(file.name, path)
+
+        return path
+
+    def reset(self) -> None:
+        """
+        Forgets all samples
+        """
+        with self._condition:
+            self._stacks.clear()
+
+    def _start(self) -> None:
+        """
+        Starts the background thread, the caller must hold the lock
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name='objectstorage-profiler', daemon=True,
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._active:
+                    self._condition.wait()
+
+            self.sample()
+            time.sleep(self.interval)
+
+SAMPLER = StackSampler(INTERVAL, MAX_STACKS)
+
+def _write(directory: str) -> None:
+    try:
+        SAMPLER.write(directory)
+    except OSError:
+        logger.exception('Failed to write the profile to %s', directory)
+
+_random = random.SystemRandom()
+
+def profiled(function: F) -> F:
+    """
+    Decorator which profiles a fraction of the calls of the given function,
+    as configured by `OBJECTSTORAGE_PROFILE_SAMPLE_RATE`
+
+    Calls that are not profiled only cost a random number.
+    """
+    @functools.wraps(function)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if SAMPLE_RATE <= 0 or _random.random() >= SAMPLE_RATE:
+            return function(*args, **kwargs)
+
+        metrics.increment('profile.calls')
+
+        try:
+            with SAMPLER.track(function.__code__):
+                return function(*args, **kwargs)
+        finally:
+            if OUTPUT_DIR:
+                _write(OUTPUT_DIR)
+
+    return wrapper  # type: ignore[return-value]
@@ -0,0 +1,195 @@
+"""
+Client-side rate limiting of the calls done to the IXON API
+"""
+from dataclasses import dataclass
+import random
+import threading
+import time
+
+from . import deadline
+
+@dataclass
+class Limit:
+    """
+    The rate limit of an endpoint
+    """
+
+    rate: float
+    """
+    The sustained amount of calls per second, 0 or less means unlimited
+    """
+    burst: float
+    """
+    The amount of calls that may be done at once after being idle
+    """
+
+    @classmethod
+    def parse(cls, value: str) -> "Limit | None":
+        """
+        Parses a limit formatted as `rate` or `rate/burst`
+
+        Returns None if it cannot be parsed
+        """
+        rate, _, burst = value.partition('/')
+
+        try:
+            return cls(float(rate), float(burst or rate))
+        except ValueError:
+            return None
+
+def parse_limits(value: str) -> dict[str, Limit]:
+    """
+    Parses the limits per endpoint, formatted as a comma separated list of
+    `Endpoint=rate/burst` items, skipping the items that cannot be parsed
+    """
+    limits: dict[str, Limit] = {}
+
+    for item in value.split(','):
+        endpoint, _, limit_value = item.partition('=')
+        if endpoint.strip() and (limit := Limit.parse(limit_value.strip())):
+            limits[endpoint.strip()] = limit
+
+    return limits
+
+class TokenBucket:
+    """
+    A token bucket which adapts its rate to the responses of the server
+
+    When the server reports that it is rate limiting, the rate is halved,
+    down to a tenth of the configured rate. Every call that succeeds after
+    that restores a tenth of the configured rate.
+    """
+
+    MIN_RATE_FRACTION = 0.1
+
+    limit: Limit
+
+    _rate: float
+    _tokens: float
+    _updated_at: float
+    _lock: threading.Lock
+
+    def __init__(self, limit: Limit) -> None:
+        self.limit = limit
+
+        self._rate = limit.rate
+        self._tokens = limit.burst
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        """
+        The current rate of the bucket
+        """
+        return self._rate
+
+    def reserve(self) -> float:
+        """
+        Takes a token from the bucket, and returns how many seconds the caller
+        has to wait before it may use it
+        """
+        if self.limit.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.limit.burst,
+                self._tokens + (now - self._updated_at) * self._rate,
+            )
+            self._updated_at = now
+            self._tokens -= 1
+
+            if self._tokens >= 0:
+                return 0.0
+
+            return -self._tokens / self._rate
+
+    def cancel(self) -> None:
+        """
+        Returns the token of a reservation that will not be used
+        """
+        if self.limit.rate <= 0:
+            return
+
+        with self._lock:
+            self._tokens = min(self.limit.burst, self._tokens + 1)
+
+    def slow_down(self) -> None:
+        """
+        Halves the rate after the server reported that it is rate limiting
+        """
+        with self._lock:
+            self._rate = max(self._rate / 2, self.limit.rate * self.MIN_RATE_FRACTION)
+
+    def speed_up(self) -> None:
+        """
+        Gradually restores the configured rate after a successful call
+        """
+        with self._lock:
+            self._rate = min(self._rate + self.limit.rate * self.MIN_RATE_FRACTION, self.limit.rate)
+
+class RateLimiter:
+    """
+    Token buckets per endpoint, shared by all API calls of this worker
+    """
+
+    default: Limit
+    limits: dict[str, Limit]
+
+    _buckets: dict[str, TokenBucket]
+    _lock: threading.Lock
+
+    def __init__(self, default: Limit, limits: dict[str, Limit]) -> None:
+        self.default = default
+        self.limits = limits
+
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, endpoint: str) -> TokenBucket:
+        """
+        Returns the bucket of the given endpoint
+        """
+        with self._lock:
+            if (bucket := self._buckets.get(endpoint)) is None:
+                bucket = TokenBucket(self.limits.get(endpoint, self.default))
+                self._buckets[endpoint] = bucket
+
+            return bucket
+
+    def acquire(self, endpoint: str) -> float:
+        """
+        Waits until a call to the given endpoint may be done, and returns
+        how many seconds were waited
+
+        Within a call with a deadline, DeadlineExceeded is raised right away
+        if no time would be left after waiting.
+        """
+        bucket = self.bucket(endpoint)
+
+        if (delay := bucket.reserve()) > 0:
+            if (left := deadline.remaining()) is not None and left <= delay:
+                bucket.cancel()
+                raise deadline.DeadlineExceeded()
+
+            time.sleep(delay)
+
+        return delay
+
+    def reset(self) -> None:
+        """
+        Forgets the state of all buckets
+        """
+        with self._lock:
+            self._buckets.clear()
+
+_random = random.SystemRandom()
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """
+    Returns how many seconds to wait before retrying, using exponential
+    backoff with full jitter
+    """
+    return _random.uniform(0, min(cap, base * 2 ** attempt))
@@ -0,0 +1,182 @@
+"""
+Recording of the IXON API traffic of the worker, to replay it offline
+
+When `OBJECTSTORAGE_RECORD_PATH` is set, the requests for asset descendants
+and app configs are written to that file as JSON lines, along with their
+responses and the seconds they took, so `benchmarks/replay.py` can replay
+production-shaped trees and app configs without a network.
+
+The recordings are sanitised: public IDs are replaced with pseudonyms, which
+are the same for the same ID within a recording, and the letters of names
+and other free text are masked, keeping their length. The IDs of the
+documents are random UUIDs, and are kept.
+"""
+import hashlib
+import json
+import logging
+import re
+import secrets
+import threading
+from typing import Any
+
+from . import settings
+
+logger = logging.getLogger(__name__)
+
+RECORD_PATH = settings.get_str('RECORD_PATH', '')
+"""
+The file the API calls are recorded to, empty disables recording
+"""
+
+ENDPOINTS = frozenset({'AssetDescendantList', 'AssetAppConfigList'})
+"""
+The endpoints of which the calls are recorded
+"""
+
+KEPT_FIELDS = frozenset({'id', 'order', 'size', 'type', 'category'})
+"""
+The fields of the objects in app configs which are recorded as they are
+"""
+
+_LETTERS = re.compile(r'[^\W\d_]')
+_QUOTED = re.compile(r'"([^"]*)"')
+
+def mask(text: str) -> str:
+    """
+    Masks the letters in the given text, keeping its length, digits and
+    punctuation
+    """
+    return _LETTERS.sub('x', text)
+
+class Recorder:
+    """
+    Writes sanitised API calls to a JSON lines file
+    """
+
+    path: str
+
+    _salt: bytes
+    """
+    The salt of the pseudonyms, random per recording so they cannot be
+    matched with other recordings
+    """
+    _lock: threading.Lock
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+        self._salt = secrets.token_bytes(16)
+        self._lock = threading.Lock()
+
+    def pseudonym(self, public_id: str) -> str:
+        """
+        Returns the pseudonym of the given public ID
+        """
+        return hashlib.sha256(self._salt + public_id.encode()).hexdigest()[:12]
+
+    def _sanitise_query(self, query: dict[str, Any] | None) -> dict[str, Any] | None:
+        if query is None:
+            return None
+
+        filters = [
+            _QUOTED.sub(lambda match: f'"{self.pseudonym(match[1])}"', value)
+            for value in query.get('filters', [])
+        ]
+
+        return {**query, 'filters': filters} if 'filters' in query else query
+
+    def _sanitise_item(self, item: dict[str, Any]) -> dict[str, Any]:
+        item = dict(item)
+
+        if isinstance(public_id := item.get('publicId'), str):
+            item['publicId'] = self.pseudonym(public_id)
+        if isinstance(name := item.get('name'), str):
+            item['name'] = mask(name)
+        if isinstance(asset := item.get('asset'), dict):
+            item['asset'] = self._sanitise_item(asset)
+
+        for field in ('values', 'stateValues'):
+            if isinstance(item.get(field), str):
+                item[field] = _sanitise_app_config(item[field])
+
+        return item
+
+    def sanitise(self, call: dict[str, Any]) -> dict[str, Any]:
+        """
+        Sanitises a recorded call, without changing its shape
+        """
+        url_args = call['url_args']
+        if url_args and 'publicId' in url_args:
+            url_args = {**url_args, 'publicId': self.pseudonym(url_args['publicId'])}
+
+        response = call['response']
+        if isinstance(response, dict) and isinstance(response.get('data'), list):
+            response = {
+                **response,
+                'data': [
+                    self._sanitise_item(item) if isinstance(item, dict) else item
+                    for item in response['data']
+                ],
+            }
+
+        return {
+            **call,
+            'url_args': url_args,
+            'query': self._sanitise_query(call['query']),
+            'response': response,
+        }
+
+    def record(
+            self,
+            url_name: str,
+            call: tuple[tuple[Any, ...], dict[str, Any]],
+            seconds: float,
+            response: Any,
+        ) -> None:
+        """
+        Records a call with the arguments of `ApiClient.get` which took the
+        given seconds, if it is of one of the recorded endpoints
+        """
+        if url_name not in ENDPOINTS:
+            return
+
+        args, kwargs = call
+        line = json.dumps(self.sanitise({
+            'endpoint': url_name,
+            'url_args': kwargs.get('url_args', args[0] if args else None),
+            'query': kwargs.get('query', args[1] if len(args) > 1 else None),
+            'seconds': round(seconds, 6),
+            'response': response,
+        }), separators=(',', ':'))
+
+        try:
+            with self._lock, open(self.path, 'a', encoding='utf-8') as file:
+                file.write(line + '\n')
+        except OSError:
+            logger.exception('Failed to record a call to %s', url_name)
+
+def _sanitise_app_config(values: str) -> str:
+    """
+    Masks the free text of the objects in the values of an app config,
+    keeping the fields which documents are listed and filtered by
+    """
+    try:
+        items = json.loads(values)
+    except ValueError:
+        return mask(values)
+
+    if not isinstance(items, list):
+        return mask(values)
+
+    return json.dumps([
+        {
+            key: value if key in KEPT_FIELDS or not isinstance(value, str) else mask(value)
+            for key, value in item.items()
+        } if isinstance(item, dict) else item
+        for item in items
+    ])
+
+RECORDER = Recorder(RECORD_PATH) if RECORD_PATH else None
+"""
+The recorder of the API calls of this worker, or None when not recording
+"""
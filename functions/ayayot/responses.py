@@ -0,0 +1,105 @@
+"""
+The responses of the functions in objectstorage_v1, besides those of the
+ingress
+"""
+from typing import Literal, NotRequired, TypedDict
+
+from ixoncdkingress.function.objectstorage.types import ListPathResponse, PathMapping
+
+class DocumentMeta(TypedDict, total=True):
+    """
+    The metadata of a document, with the path at which it is stored
+    """
+    id: str
+    path: str
+    name: str | None
+    order: int | None
+    size: int | None
+    type: str | None
+    category: str | None
+
+class PartialListPathResponse(ListPathResponse, total=True):
+    """
+    The response of authorize_list and search_documents, marked as partial
+    when work was skipped to meet the deadline of the call, or while the IXON
+    API was failing
+    """
+    partial: NotRequired[Literal[True]]
+
+class DocumentListData(TypedDict, total=True):
+    """
+    Response data of list_documents
+    """
+    mappings: list[PathMapping]
+    documents: list[DocumentMeta]
+    total: int
+    version: str
+    unchanged: NotRequired[Literal[True]]
+
+class DocumentListResponse(TypedDict, total=True):
+    """
+    The response of list_documents, marked as partial when work was skipped
+    to meet the deadline of the call, or while the IXON API was failing
+    """
+    result: Literal['success']
+    data: DocumentListData
+    partial: NotRequired[Literal[True]]
+
+class BatchError(TypedDict, total=True):
+    """
+    The entry of authorize_list_batch for an asset of which the access of the
+    caller could not be checked
+    """
+    error: str
+
+class BatchListResponse(TypedDict, total=True):
+    """
+    The response of authorize_list_batch, with the mappings per asset public
+    ID, None for the assets the caller may not access, or a BatchError when
+    the access could not be checked, marked as partial when only the cached
+    objects were listed
+    """
+    result: Literal['success']
+    data: dict[str, list[PathMapping] | BatchError | None]
+    partial: NotRequired[Literal[True]]
+
+class ProfileData(TypedDict, total=True):
+    """
+    Response data of get_profile
+    """
+    samples: int
+    stacks: str
+
+class ProfileResponse(TypedDict, total=True):
+    """
+    The response of get_profile
+    """
+    result: Literal['success']
+    data: ProfileData
+
+class MetricsData(TypedDict, total=True):
+    """
+    Response data of get_metrics, with the process ID of the worker
+    """
+    worker: int
+    counters: dict[str, float]
+
+class MetricsResponse(TypedDict, total=True):
+    """
+    The response of get_metrics
+    """
+    result: Literal['success']
+    data: MetricsData
+
+class InvalidateData(TypedDict, total=True):
+    """
+    Response data of invalidate_documents
+    """
+    evicted: int
+
+class InvalidateResponse(TypedDict, total=True):
+    """
+    The response of invalidate_documents
+    """
+    result: Literal['success']
+    data: InvalidateData
@@ -0,0 +1,67 @@
+"""
+Worker-level settings, read from the environment of the function worker
+"""
+import os
+
+PREFIX = 'OBJECTSTORAGE_'
+
+def _get_raw(name: str) -> str | None:
+    """
+    Returns the raw value of the setting with the given name, if set
+    """
+    value = os.environ.get(f'{PREFIX}{name}')
+
+    if value is None or not value.strip():
+        return None
+
+    return value.strip()
+
+def get_str(name: str, default: str) -> str:
+    """
+    Returns the setting with the given name as a string
+
+    Falls back to the default when it is not set
+    """
+    if (value := _get_raw(name)) is None:
+        return default
+
+    return value
+
+def get_float(name: str, default: float) -> float:
+    """
+    Returns the setting with the given name as a float
+
+    Falls back to the default when it is not set or cannot be parsed
+    """
+    if (value := _get_raw(name)) is None:
+        return default
+
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+def get_int(name: str, default: int) -> int:
+    """
+    Returns the setting with the given name as an int
+
+    Falls back to the default when it is not set or cannot be parsed
+    """
+    if (value := _get_raw(name)) is None:
+        return default
+
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+def get_bool(name: str, default: bool) -> bool:
+    """
+    Returns the setting with the given name as a bool
+
+    Falls back to the default when it is not set
+    """
+    if (value := _get_raw(name)) is None:
+        return default
+
+    return value.lower() in ('1', 'true', 'yes', 'on')
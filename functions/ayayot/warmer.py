@@ -0,0 +1,214 @@
+"""
+Background warmer, which refreshes the cached lookups of the most frequently
+authorized asset trees just before they expire
+"""
+from collections.abc import Callable
+from dataclasses import dataclass
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from . import cache, settings
+
+if TYPE_CHECKING:
+    # Only needed once the warmer runs, so it is not imported at startup
+    from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class WarmerConfig:
+    """
+    The configuration of a cache warmer
+    """
+
+    enabled: bool
+    top_n: int
+    """
+    The maximum amount of pairs to keep warm
+    """
+    lead_time: float
+    """
+    How many seconds before expiry the lookups of a pair are refreshed
+    """
+    concurrency: int
+    """
+    The maximum amount of pairs that are refreshed at the same time
+    """
+    rate: float
+    """
+    The maximum amount of pairs that are refreshed per second
+    """
+    interval: float
+    """
+    How many seconds to wait between checks for pairs that are due
+    """
+    client_max_age: float
+    """
+    How many seconds after its last authorization a pair is dropped
+    """
+
+@dataclass
+class WarmTarget:
+    """
+    An asset and template pair seen by the authorize entry points for a caller
+    """
+
+    hits: float
+    refresh: Callable[[], None]
+    recorded_at: float
+
+class CacheWarmer:
+    """
+    Tracks how often asset and template pairs are authorized per caller scope,
+    and refreshes the cached lookups of the most frequent ones in a background
+    thread
+
+    The refresh functions hold on to the API client of the last request of
+    the caller for a pair, and only refresh the lookups of that caller. Pairs
+    that have not been seen for `client_max_age` seconds are dropped, as the
+    credentials of that client may have expired.
+    """
+
+    config: WarmerConfig
+
+    _targets: dict[tuple[str, str, str], WarmTarget]
+    _lock: threading.Lock
+    _thread: threading.Thread | None
+    _stop: threading.Event
+
+    def __init__(self, config: WarmerConfig) -> None:
+        self.config = config
+
+        self._targets = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def record(
+        self,
+        scope: str,
+        asset_id: str,
+        template_id: str,
+        refresh: Callable[[], None],
+    ) -> None:
+        """
+        Records an authorization for the given pair by a caller with the given
+        scope, starting the background thread on first use
+        """
+        if not self.config.enabled:
+            return
+
+        key = (scope, asset_id, template_id)
+        with self._lock:
+            if (target := self._targets.get(key)) is None:
+                self._targets[key] = WarmTarget(1, refresh, time.monotonic())
+            else:
+                target.hits += 1
+                target.refresh = refresh
+                target.recorded_at = time.monotonic()
+
+        self.start()
+
+    def due(self, now: float) -> list[tuple[tuple[str, str, str], WarmTarget]]:
+        """
+        Returns the most frequently seen pairs whose cached lookups expire
+        within the lead time
+
+        Drops the pairs whose API client may no longer be valid, and halves
+        the hits of the others, so recent traffic weighs the heaviest.
+        """
+        with self._lock:
+            for key in [
+                key for key, target in self._targets.items()
+                if now - target.recorded_at > self.config.client_max_age
+            ]:
+                del self._targets[key]
+
+            hottest = sorted(
+                self._targets.items(),
+                key=lambda item: item[1].hits,
+                reverse=True,
+            )[:self.config.top_n]
+
+            for target in self._targets.values():
+                target.hits /= 2
+
+        return [
+            (key, target)
+            for key, target in hottest
+            if (expires_at := cache.asset_tree_expires_at(*key)) is None
+            or expires_at - now <= self.config.lead_time
+        ]
+
+    def run_once(self, executor: "ThreadPoolExecutor") -> int:
+        """
+        Refreshes all due pairs, at most `rate` per second, and returns how
+        many were refreshed
+        """
+        from concurrent.futures import wait  # pylint: disable=import-outside-toplevel
+
+        due = self.due(time.monotonic())
+
+        futures = []
+        for index, (key, target) in enumerate(due):
+            if index and self.config.rate > 0 and self._stop.wait(1 / self.config.rate):
+                break
+            futures.append(executor.submit(self._refresh, key, target.refresh))
+
+        wait(futures)
+
+        return len(futures)
+
+    def start(self) -> None:
+        """
+        Starts the background thread, if it is not running yet
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='objectstorage-cache-warmer', daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops the background thread and waits for it to finish
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _run(self) -> None:
+        from concurrent.futures import ThreadPoolExecutor  # pylint: disable=import-outside-toplevel
+
+        with ThreadPoolExecutor(max_workers=max(self.config.concurrency, 1)) as executor:
+            while not self._stop.wait(self.config.interval):
+                self.run_once(executor)
+
+    @staticmethod
+    def _refresh(key: tuple[str, str, str], refresh: Callable[[], None]) -> None:
+        try:
+            refresh()
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.exception('Failed to warm the caches of asset %s for template %s', *key[1:])
+
+WARMER = CacheWarmer(WarmerConfig(
+    enabled=settings.get_bool('WARMER_ENABLED', False),
+    top_n=settings.get_int('WARMER_TOP_N', 50),
+    lead_time=settings.get_float('WARMER_LEAD_TIME', 5.0),
+    concurrency=settings.get_int('WARMER_CONCURRENCY', 2),
+    rate=settings.get_float('WARMER_RATE', 5.0),
+    interval=settings.get_float('WARMER_INTERVAL', 2.0),
+    client_max_age=settings.get_float('WARMER_CLIENT_MAX_AGE', 300.0),
+))
+"""
+The warmer of the caches of this worker
+"""
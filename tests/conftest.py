@@ -0,0 +1,21 @@
+from collections.abc import Iterator
+
+import pytest
+
+from functions.ayayot import api, cache, memory, metrics, profiling
+
+@pytest.fixture(autouse=True)
+def reset_worker_state() -> Iterator[None]:
+    cache.clear_all()
+    api.LIMITER.reset()
+    api.BREAKERS.reset()
+    memory.reset()
+    metrics.reset()
+    profiling.SAMPLER.reset()
+    yield
+    cache.clear_all()
+    api.LIMITER.reset()
+    api.BREAKERS.reset()
+    memory.reset()
+    metrics.reset()
+    profiling.SAMPLER.reset()
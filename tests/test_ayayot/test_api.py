@@ -0,0 +1,303 @@
+from unittest import mock
+
+import pytest
+
+from ixoncdkingress.function.api_client import ApiClient
+
+from functions.ayayot import api as sut
+from functions.ayayot.breaker import State
+
+RATE_LIMITED = {
+    'type': 'Error',
+    'data': [{'message': '429 Too Many Requests'}],
+    'status': 'error',
+}
+
+@pytest.mark.parametrize('response,expected', [
+    pytest.param({'status': 'success', 'data': []}, False, id='success'),
+    pytest.param(
+        {'status': 'error', 'data': [{'message': 'Not found'}, 'other']},
+        False,
+        id='other-error',
+    ),
+    pytest.param({'status': 'error'}, False, id='error-without-data'),
+    pytest.param(RATE_LIMITED, True, id='too-many-requests'),
+    pytest.param(
+        {'status': 'error', 'data': [{'message': 'Rate limit exceeded'}]},
+        True,
+        id='rate-limit-exceeded',
+    ),
+])
+def test_is_rate_limited(response: dict, expected: bool):
+    mut = sut.is_rate_limited
+
+    assert expected is mut(response)
+
+@pytest.mark.parametrize('response', [
+    pytest.param({'status': 'success', 'data': [{'publicId': 'asset01'}]}, id='success'),
+    pytest.param({'data': [{'publicId': 'asset01'}]}, id='no-status'),
+])
+def test_data(response: dict):
+    mut = sut.data
+
+    assert [{'publicId': 'asset01'}] == mut(response)
+
+@pytest.mark.parametrize('response,message', [
+    pytest.param(
+        {'status': 'error', 'data': [{'message': 'Not found'}, 'other', {'message': 'Gone'}]},
+        'Not found; Gone',
+        id='messages',
+    ),
+    pytest.param({'status': 'error', 'data': []}, '', id='no-messages'),
+    pytest.param({'status': 'error'}, '', id='no-data'),
+])
+def test_data_error(response: dict, message: str):
+    mut = sut.data
+
+    with pytest.raises(sut.ApiError) as excinfo:
+        mut(response)
+
+    assert message == str(excinfo.value)
+
+def test_caller_scope():
+    mut = sut.caller_scope
+
+    user1 = ApiClient('https://api.example.com', authorization='Bearer user1')
+    user2 = ApiClient('https://api.example.com', authorization='Bearer user2')
+
+    output = mut('company01', user1)
+
+    assert output == mut('company01', ApiClient('https://api.example.com', authorization='Bearer user1'))
+    assert output != mut('company01', user2)
+    assert output != mut('company02', user1)
+    assert 'user1' not in output
+    # A client without headers has the scope of the company alone
+    assert mut('company01', ApiClient('https://api.example.com')) == mut(
+        'company01', mock.create_autospec(spec=ApiClient, instance=True),
+    )
+
+@mock.patch('functions.ayayot.api.LIMITER', autospec=True)
+def test_get(LIMITER: mock.Mock):
+    mut = sut.get
+
+    LIMITER.acquire.return_value = 0.25
+
+    api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    api_client.get.return_value = {'status': 'success', 'data': []}
+
+    output = mut(api_client, 'AssetDescendantList', {'publicId': 'asset01'}, query={'a': 'b'})
+
+    assert api_client.get.return_value is output
+
+    assert [
+        mock.call('AssetDescendantList', {'publicId': 'asset01'}, query={'a': 'b'})
+    ] == api_client.get.call_args_list
+
+    assert [mock.call('AssetDescendantList')] == LIMITER.bucket.call_args_list
+    assert [mock.call()] == LIMITER.bucket.return_value.speed_up.call_args_list
+
+    assert {
+        'api.calls.AssetDescendantList': 1.0,
+        'api.throttled_seconds': 0.25,
+        'api.throttled_seconds.AssetDescendantList': 0.25,
+    } == sut.metrics.snapshot()
+
+@mock.patch('functions.ayayot.api.backoff_delay', autospec=True)
+@mock.patch('functions.ayayot.api.time.sleep', autospec=True)
+@mock.patch('functions.ayayot.api.LIMITER', autospec=True)
+def test_get_rate_limited(LIMITER: mock.Mock, sleep: mock.Mock, backoff_delay: mock.Mock):
+    mut = sut.get
+
+    LIMITER.acquire.return_value = 0.0
+    backoff_delay.return_value = 0.5
+
+    api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    api_client.get.side_effect = [RATE_LIMITED, {'status': 'success', 'data': []}]
+
+    output = mut(api_client, 'AssetAppConfigList')
+
+    assert {'status': 'success', 'data': []} == output
+
+    assert [mock.call(0, sut.BACKOFF_BASE, sut.BACKOFF_CAP)] == backoff_delay.call_args_list
+    assert [mock.call(0.5)] == sleep.call_args_list
+    assert [mock.call()] == LIMITER.bucket.return_value.slow_down.call_args_list
+
+    assert {
+        'api.calls.AssetAppConfigList': 2.0,
+        'api.rate_limited.AssetAppConfigList': 1.0,
+        'api.throttled_seconds': 0.5,
+        'api.throttled_seconds.AssetAppConfigList': 0.5,
+    } == sut.metrics.snapshot()
+
+@mock.patch('functions.ayayot.api.MAX_RETRIES', 1)
+@mock.patch('functions.ayayot.api.backoff_delay', autospec=True)
+@mock.patch('functions.ayayot.api.time.sleep', autospec=True)
+@mock.patch('functions.ayayot.api.LIMITER', autospec=True)
+def test_get_rate_limited_gives_up(LIMITER: mock.Mock, sleep: mock.Mock, backoff_delay: mock.Mock):
+    mut = sut.get
+
+    LIMITER.acquire.return_value = 0.0
+    backoff_delay.return_value = 0.0
+
+    api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    api_client.get.return_value = RATE_LIMITED
+
+    assert RATE_LIMITED == mut(api_client, 'AssetAppConfigList')
+
+    assert 2 == api_client.get.call_count
+    assert [mock.call(0.0)] == sleep.call_args_list
+    assert 'api.throttled_seconds' not in sut.metrics.snapshot()
+
+def test_get_short_circuited():
+    mut = sut.get
+
+    api_client = mock.create_autospec(spec=ApiClient, instance=True)
+
+    with mock.patch.object(sut.BREAKERS.breaker('AssetAppConfigList'), 'allow', return_value=False):
+        with pytest.raises(sut.CircuitOpenError):
+            mut(api_client, 'AssetAppConfigList')
+
+    assert [] == api_client.get.call_args_list
+    assert {'api.short_circuited.AssetAppConfigList': 1.0} == sut.metrics.snapshot()
+
+@mock.patch('functions.ayayot.api.BREAKERS', autospec=True)
+def test_get_failed(BREAKERS: mock.Mock):
+    mut = sut.get
+
+    breaker = BREAKERS.breaker.return_value
+    breaker.allow.return_value = True
+    breaker.record.return_value = True
+
+    api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    api_client.get.side_effect = TimeoutError
+
+    with pytest.raises(TimeoutError):
+        mut(api_client, 'AssetAppConfigList')
+
+    assert [mock.call('AssetAppConfigList')] == BREAKERS.breaker.call_args_list
+    assert [mock.call(mock.ANY, True)] == breaker.record.call_args_list
+    assert {
+        'api.breaker_opened.AssetAppConfigList': 1.0,
+        'api.calls.AssetAppConfigList': 1.0,
+    } == sut.metrics.snapshot()
+
+def test_get_opens_breaker():
+    mut = sut.get
+
+    api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    api_client.get.side_effect = ConnectionError
+
+    for _ in range(sut.BREAKERS.threshold):
+        with pytest.raises(ConnectionError):
+            mut(api_client, 'AssetDescendantList')
+
+    with pytest.raises(sut.CircuitOpenError):
+        mut(api_client, 'AssetDescendantList')
+
+    assert sut.BREAKERS.threshold == api_client.get.call_count
+
+@mock.patch('functions.ayayot.deadline.remaining', autospec=True)
+def test_get_deadline(remaining: mock.Mock):
+    mut = sut.get
+
+    remaining.return_value = 2.5
+
+    api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    api_client.get.return_value = {'status': 'success', 'data': []}
+
+    mut(api_client, 'AssetAppConfigList')
+    mut(api_client, 'AssetAppConfigList', timeout=1.0)
+
+    assert [
+        mock.call('AssetAppConfigList', timeout=2.5),
+        mock.call('AssetAppConfigList', timeout=1.0),
+    ] == api_client.get.call_args_list
+
+@mock.patch('functions.ayayot.deadline.remaining', autospec=True)
+def test_get_deadline_exceeded(remaining: mock.Mock):
+    mut = sut.get
+
+    remaining.return_value = 0.0
+
+    api_client = mock.create_autospec(spec=ApiClient, instance=True)
+
+    with pytest.raises(sut.deadline.DeadlineExceeded):
+        mut(api_client, 'AssetAppConfigList')
+
+    assert [] == api_client.get.call_args_list
+
+@mock.patch('functions.ayayot.api.BREAKERS', sut.CircuitBreakers(1, 0.0, 0.0))
+def test_get_deadline_exceeded_half_open():
+    mut = sut.get
+
+    api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    api_client.get.side_effect = [ConnectionError, {'status': 'success', 'data': []}]
+
+    with pytest.raises(ConnectionError):
+        mut(api_client, 'AssetAppConfigList')
+
+    breaker = sut.BREAKERS.breaker('AssetAppConfigList')
+    assert State.HALF_OPEN == breaker.state
+
+    with mock.patch('functions.ayayot.deadline.remaining', autospec=True, return_value=0.0):
+        with pytest.raises(sut.deadline.DeadlineExceeded):
+            mut(api_client, 'AssetAppConfigList')
+
+    # The call did not take the probe, so the next one still may
+    assert State.HALF_OPEN == breaker.state
+    assert {'status': 'success', 'data': []} == mut(api_client, 'AssetAppConfigList')
+    assert State.CLOSED == breaker.state
+
+@pytest.mark.parametrize('left,expected', [
+    pytest.param(2.5, sut.deadline.DeadlineExceeded, id='deadline'),
+    pytest.param(None, sut.requests.Timeout, id='without-deadline'),
+])
+def test_get_timeout(left: float | None, expected: type[Exception]):
+    mut = sut.get
+
+    api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    api_client.get.side_effect = sut.requests.Timeout
+
+    with mock.patch('functions.ayayot.deadline.remaining', autospec=True, return_value=left):
+        with pytest.raises(expected):
+            mut(api_client, 'AssetAppConfigList')
+
+    assert {'api.calls.AssetAppConfigList': 1.0} == sut.metrics.snapshot()
+
+@mock.patch('functions.ayayot.deadline.remaining', autospec=True)
+@mock.patch('functions.ayayot.api.backoff_delay', autospec=True)
+@mock.patch('functions.ayayot.api.time.sleep', autospec=True)
+def test_get_rate_limited_deadline(
+        sleep: mock.Mock, backoff_delay: mock.Mock, remaining: mock.Mock,
+    ):
+    mut = sut.get
+
+    remaining.return_value = 0.5
+    backoff_delay.return_value = 0.5
+
+    api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    api_client.get.return_value = RATE_LIMITED
+
+    # No time would be left after the backoff, so it is not retried
+    assert RATE_LIMITED == mut(api_client, 'AssetAppConfigList')
+
+    assert 1 == api_client.get.call_count
+    assert [] == sleep.call_args_list
+
+@mock.patch('functions.ayayot.recording.RECORDER', autospec=True)
+def test_get_recording(RECORDER: mock.Mock):
+    mut = sut.get
+
+    api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    api_client.get.return_value = {'status': 'success', 'data': []}
+
+    mut(api_client, 'AssetDescendantList', {'publicId': 'asset01'})
+
+    assert [
+        mock.call(
+            'AssetDescendantList',
+            (({'publicId': 'asset01'},), {}),
+            mock.ANY,
+            {'status': 'success', 'data': []},
+        ),
+    ] == RECORDER.record.call_args_list
@@ -0,0 +1,405 @@
+from collections.abc import Iterator
+import socketserver
+import struct
+import threading
+import time
+from typing import Any
+from unittest import mock
+import zlib
+
+import pytest
+
+from functions.ayayot import backends as sut
+
+class RespHandler(socketserver.StreamRequestHandler):
+    """
+    Handles the commands used by RedisBackend, like a Redis server would
+    """
+
+    server: 'RespServer'
+
+    def _read_command(self) -> list[bytes] | None:
+        line = self.rfile.readline()
+        if not line:
+            return None
+
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+
+        return args
+
+    def _reply(self, reply: Any) -> bytes:
+        if reply is None:
+            return b'$-1\r\n'
+        if isinstance(reply, int):
+            return b':%d\r\n' % reply
+        if isinstance(reply, bytes):
+            return b'$%d\r\n%s\r\n' % (len(reply), reply)
+        if isinstance(reply, list):
+            return b'*%d\r\n' % len(reply) + b''.join(map(self._reply, reply))
+        return reply.encode()
+
+    def handle(self) -> None:
+        while (args := self._read_command()) is not None:
+            if self.server.drop:
+                self.server.drop = False
+                return
+
+            self.server.commands.append(args)
+            self.wfile.write(self._reply(self.server.execute(args)))
+
+class RespServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self) -> None:
+        super().__init__(('127.0.0.1', 0), RespHandler)
+        self.values: dict[bytes, bytes] = {}
+        self.sets: dict[bytes, set[bytes]] = {}
+        self.sorted_sets: dict[bytes, dict[bytes, float]] = {}
+        self.commands: list[list[bytes]] = []
+        self.password: bytes | None = None
+        self.drop = False
+        """
+        Whether to drop the connection on the next command
+        """
+
+    def execute(self, args: list[bytes]) -> Any:
+        name, *rest = args
+
+        if (command := getattr(self, f'command_{name.decode().lower()}', None)) is None:
+            return f'-ERR unknown command {name.decode()}\r\n'
+
+        return command(*rest)
+
+    def command_auth(self, *args: bytes) -> str:
+        return '+OK\r\n' if args[-1] == self.password else '-WRONGPASS invalid password\r\n'
+
+    def command_select(self, _database: bytes) -> str:
+        return '+OK\r\n'
+
+    def command_get(self, key: bytes) -> bytes | None:
+        return self.values.get(key)
+
+    def command_set(self, key: bytes, value: bytes, *_options: bytes) -> str:
+        self.values[key] = value
+        return '+OK\r\n'
+
+    def command_sadd(self, key: bytes, *members: bytes) -> int:
+        self.sets.setdefault(key, set()).update(members)
+        return len(members)
+
+    def command_pexpire(self, _key: bytes, _ttl: bytes) -> int:
+        return 1
+
+    def command_smembers(self, key: bytes) -> list[bytes]:
+        return sorted(self.sets.get(key, set()))
+
+    def command_zadd(self, key: bytes, score: bytes, member: bytes) -> int:
+        added = member not in self.sorted_sets.setdefault(key, {})
+        self.sorted_sets[key][member] = float(score)
+        return int(added)
+
+    @staticmethod
+    def _in_range(score: float, low: bytes, high: bytes) -> bool:
+        def above(bound: bytes) -> bool:
+            return score > float(bound[1:]) if bound.startswith(b'(') else score >= float(bound)
+
+        def below(bound: bytes) -> bool:
+            return score < float(bound[1:]) if bound.startswith(b'(') else score <= float(bound)
+
+        return above(low) and below(high)
+
+    def command_zremrangebyscore(self, key: bytes, low: bytes, high: bytes) -> int:
+        members = self.sorted_sets.get(key, {})
+        removed = [member for member, score in members.items() if self._in_range(score, low, high)]
+        for member in removed:
+            del members[member]
+        return len(removed)
+
+    def command_zrangebyscore(self, key: bytes, low: bytes, high: bytes, *_options: bytes) -> list:
+        return [
+            reply
+            for member, score in sorted(self.sorted_sets.get(key, {}).items(), key=lambda i: i[1])
+            if self._in_range(score, low, high)
+            for reply in (member, repr(score).encode())
+        ]
+
+    def command_del(self, *keys: bytes) -> int:
+        return sum(
+            self.values.pop(key, None) is not None or self.sets.pop(key, None) is not None
+            for key in keys
+        )
+
+@pytest.fixture(name='resp_server')
+def fixture_resp_server() -> Iterator[RespServer]:
+    server = RespServer()
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+def redis_url(server: RespServer, credentials: str = '', database: str = '') -> str:
+    return f'redis://{credentials}127.0.0.1:{server.server_address[1]}{database}'
+
+@pytest.fixture(name='backend', params=['memory', 'sqlite', 'redis'])
+def fixture_backend(request: Any, tmp_path: Any, resp_server: RespServer) -> Iterator[Any]:
+    if request.param == 'memory':
+        yield sut.MemoryBackend()
+    elif request.param == 'sqlite':
+        yield sut.SqliteBackend(str(tmp_path / 'cache.db'))
+    else:
+        backend = sut.RedisBackend(redis_url(resp_server))
+        yield backend
+        backend.close()
+
+def test_pack_unpack():
+    packed = sut.pack([['asset01', 'Asset 1']], 1000.5, 990.25)
+
+    assert ([['asset01', 'Asset 1']], 1000.5, 990.25) == sut.unpack(packed)
+
+@pytest.mark.parametrize('packed', [
+    pytest.param(b'', id='empty'),
+    pytest.param(struct.pack('>Bd', 0, 1000.0) + zlib.compress(b'[]'), id='other-version'),
+    pytest.param(struct.pack('>Bd', 1, 1000.0) + zlib.compress(b'[]'), id='unscoped-version'),
+    pytest.param(struct.pack('>Bd', 2, 1000.0) + zlib.compress(b'[]'), id='unstamped-version'),
+    pytest.param(
+        struct.pack('>Bdd', sut.FORMAT_VERSION, 1000.0, 990.0) + b'not zlib', id='not-zlib',
+    ),
+    pytest.param(
+        struct.pack('>Bdd', sut.FORMAT_VERSION, 1000.0, 990.0) + zlib.compress(b'not json'),
+        id='not-json',
+    ),
+])
+def test_unpack_invalid(packed: bytes):
+    assert None is sut.unpack(packed)
+
+def test_CacheBackend_incomplete():
+    class IncompleteBackend(sut.CacheBackend):
+        def get(self, key: str) -> bytes | None:
+            return None
+
+    with pytest.raises(TypeError, match='add_mark, delete_tag, get_marks, set'):
+        IncompleteBackend()  # type: ignore[abstract]  # pylint: disable=abstract-class-instantiated
+
+def test_backend_get_set(backend: sut.CacheBackend):
+    assert None is backend.get('key')
+
+    backend.set('key', b'value', 10, ['tag'])
+    backend.set('key', b'\x00\r\nother', 10, ['tag'])
+
+    assert b'\x00\r\nother' == backend.get('key')
+
+def test_backend_delete_tag(backend: sut.CacheBackend):
+    backend.set('a', b'1', 10, ['tag1', 'tag2'])
+    backend.set('b', b'2', 10, ['tag2'])
+    backend.set('c', b'3', 10, [])
+
+    assert 1 == backend.delete_tag('tag1')
+    assert None is backend.get('a')
+    assert b'2' == backend.get('b')
+
+    assert 1 == backend.delete_tag('tag2')
+    assert 0 == backend.delete_tag('tag2')
+    assert None is backend.get('b')
+    assert b'3' == backend.get('c')
+
+def test_backend_marks(backend: sut.CacheBackend):
+    now = time.time()
+
+    assert {} == backend.get_marks('marks', 0.0)
+
+    backend.add_mark('marks', 'asset01', now - 5, 60)
+    backend.add_mark('marks', 'asset02', now - 1, 60)
+    backend.add_mark('other', 'asset03', now - 1, 60)
+
+    assert {'asset01': now - 5, 'asset02': now - 1} == backend.get_marks('marks', 0.0)
+    assert {'asset02': now - 1} == backend.get_marks('marks', now - 5)
+
+    # Marked again
+    backend.add_mark('marks', 'asset01', now, 60)
+    assert {'asset01': now} == backend.get_marks('marks', now - 1)
+
+@pytest.mark.parametrize('backend_type', [sut.MemoryBackend, sut.SqliteBackend])
+def test_backend_marks_expiry(backend_type: Any, tmp_path: Any):
+    backend = backend_type() if backend_type is sut.MemoryBackend else backend_type(
+        str(tmp_path / 'cache.db'),
+    )
+
+    with mock.patch('functions.ayayot.backends.time.time', autospec=True) as time_mock:
+        time_mock.return_value = 1000.0
+        backend.add_mark('marks', 'asset01', 1000.0, 10)
+        backend.add_mark('marks', 'asset02', 1000.0, 20)
+
+        # A mark of an earlier time does not replace a later one
+        backend.add_mark('marks', 'asset02', 999.0, 20)
+
+        time_mock.return_value = 1010.0
+        assert {'asset02': 1000.0} == backend.get_marks('marks', 0.0)
+
+        # Purges the expired marks
+        backend.add_mark('marks', 'asset03', 1010.0, 10)
+
+        time_mock.return_value = 1000.0
+        assert {'asset02': 1000.0, 'asset03': 1010.0} == backend.get_marks('marks', 0.0)
+
+@pytest.mark.parametrize('backend_type', [sut.MemoryBackend, sut.SqliteBackend])
+def test_backend_expiry(backend_type: Any, tmp_path: Any):
+    backend = backend_type() if backend_type is sut.MemoryBackend else backend_type(
+        str(tmp_path / 'cache.db'),
+    )
+
+    with mock.patch('functions.ayayot.backends.time.time', autospec=True) as time_mock:
+        time_mock.return_value = 1000.0
+        backend.set('a', b'1', 10, ['tag'])
+        backend.set('b', b'2', 20, ['tag'])
+
+        time_mock.return_value = 1010.0
+        assert None is backend.get('a')
+        assert b'2' == backend.get('b')
+
+        # Purges the expired entries
+        backend.set('c', b'3', 10, [])
+
+        time_mock.return_value = 1000.0
+        assert None is backend.get('a')
+        assert 1 == backend.delete_tag('tag')
+
+def test_SqliteBackend_shared(tmp_path: Any):
+    path = str(tmp_path / 'cache.db')
+    sut.SqliteBackend(path).set('key', b'value', 10, [])
+
+    results = []
+    thread = threading.Thread(target=lambda: results.append(sut.SqliteBackend(path).get('key')))
+    thread.start()
+    thread.join()
+
+    assert [b'value'] == results
+
+@pytest.mark.parametrize('method,args', [
+    ('get', ('key',)),
+    ('set', ('key', b'value', 10, ())),
+    ('delete_tag', ('tag',)),
+    ('add_mark', ('key', 'member', 1000.0, 10)),
+    ('get_marks', ('key', 0.0)),
+])
+def test_SqliteBackend_error(method: str, args: tuple[Any, ...], tmp_path: Any):
+    backend = sut.SqliteBackend(str(tmp_path))
+
+    with pytest.raises(sut.BackendError):
+        getattr(backend, method)(*args)
+
+def test_RedisBackend_pipelines(resp_server: RespServer):
+    backend = sut.RedisBackend(redis_url(resp_server))
+
+    backend.set('key', b'value', 1.5, ['tag1', 'tag2'])
+    backend.close()
+
+    assert [
+        [b'SET', b'key', b'value', b'PX', b'1500'],
+        [b'SADD', b'tag1', b'key'],
+        [b'PEXPIRE', b'tag1', b'1500'],
+        [b'SADD', b'tag2', b'key'],
+        [b'PEXPIRE', b'tag2', b'1500'],
+    ] == resp_server.commands
+
+def test_RedisBackend_add_mark(resp_server: RespServer):
+    backend = sut.RedisBackend(redis_url(resp_server))
+
+    backend.add_mark('marks', 'asset01', 1000.5, 1.5)
+    backend.close()
+
+    assert [
+        [b'ZADD', b'marks', b'1000.5', b'asset01'],
+        [b'ZREMRANGEBYSCORE', b'marks', b'-inf', b'(999.0'],
+        [b'PEXPIRE', b'marks', b'1500'],
+    ] == resp_server.commands
+
+@pytest.mark.parametrize('credentials,database,expected', [
+    pytest.param('', '/2', [[b'SELECT', b'2']], id='database'),
+    pytest.param(':secret@', '', [[b'AUTH', b'secret']], id='password'),
+    pytest.param('user:secret@', '', [[b'AUTH', b'user', b'secret']], id='user'),
+])
+def test_RedisBackend_connect(
+        resp_server: RespServer, credentials: str, database: str, expected: list[list[bytes]],
+    ):
+    resp_server.password = b'secret'
+    backend = sut.RedisBackend(redis_url(resp_server, credentials, database))
+
+    assert None is backend.get('key')
+    backend.close()
+
+    assert [*expected, [b'GET', b'key']] == resp_server.commands
+
+def test_RedisBackend_error_reply(resp_server: RespServer):
+    resp_server.password = b'secret'
+    backend = sut.RedisBackend(redis_url(resp_server, ':wrong@'))
+
+    with pytest.raises(sut.BackendError, match='WRONGPASS'):
+        backend.get('key')
+
+    assert None is backend._socket
+
+def test_RedisBackend_reconnects(resp_server: RespServer):
+    backend = sut.RedisBackend(redis_url(resp_server))
+    backend.set('key', b'value', 10, [])
+
+    resp_server.drop = True
+
+    with pytest.raises(sut.BackendError, match='Connection closed'):
+        backend.get('key')
+
+    assert b'value' == backend.get('key')
+    backend.close()
+
+def test_RedisBackend_unreachable(resp_server: RespServer):
+    url = redis_url(resp_server)
+    resp_server.shutdown()
+    resp_server.server_close()
+
+    with pytest.raises(sut.BackendError):
+        sut.RedisBackend(url, timeout=0.1).get('key')
+
+@pytest.mark.parametrize('line,message', [
+    pytest.param(b'', 'Connection closed', id='closed'),
+    pytest.param(b'?\r\n', 'Unexpected reply', id='unexpected'),
+])
+def test_RedisBackend__read_invalid(line: bytes, message: str):
+    backend = sut.RedisBackend('redis://localhost')
+    backend._reader = mock.Mock(readline=mock.Mock(return_value=line))
+
+    with pytest.raises(sut.BackendError, match=message):
+        backend._read()
+
+def test_RedisBackend__read_null_array():
+    backend = sut.RedisBackend('redis://localhost')
+    backend._reader = mock.Mock(readline=mock.Mock(return_value=b'*-1\r\n'))
+
+    assert None is backend._read()
+
+@pytest.mark.parametrize('url,expected', [
+    pytest.param('', None, id='empty'),
+    pytest.param('memory', sut.MemoryBackend, id='memory'),
+    pytest.param('sqlite:///tmp/cache.db', sut.SqliteBackend, id='sqlite'),
+    pytest.param('redis://localhost:6379/0', sut.RedisBackend, id='redis'),
+    pytest.param('sqlite://', None, id='sqlite-without-path'),
+    pytest.param('memcached://localhost', None, id='unknown'),
+])
+def test_create(url: str, expected: Any):
+    output = sut.create(url)
+
+    if expected is None:
+        assert None is output
+    else:
+        assert isinstance(output, expected)
+
+def test_create_sqlite_path():
+    output = sut.create('sqlite:///tmp/cache.db')
+
+    assert isinstance(output, sut.SqliteBackend)
+    assert '/tmp/cache.db' == output.path
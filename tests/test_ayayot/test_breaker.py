@@ -0,0 +1,77 @@
+from unittest import mock
+
+import pytest
+
+from functions.ayayot import breaker as sut
+
+@mock.patch('functions.ayayot.breaker.time.monotonic', autospec=True)
+def test_CircuitBreaker(monotonic: mock.Mock):
+    mut = sut.CircuitBreaker(threshold=2, slow_call=1.0, open_seconds=30)
+
+    monotonic.return_value = 100
+
+    assert False is mut.record(0.1, failed=True)
+    assert False is mut.record(0.1, failed=False)
+    assert False is mut.record(0.1, failed=True)
+    assert sut.State.CLOSED == mut.state
+    assert True is mut.allow()
+
+    # Slow calls count as failed
+    assert True is mut.record(1.0, failed=False)
+    assert sut.State.OPEN == mut.state
+    assert False is mut.allow()
+
+    # Calls that were already running do not open it again
+    assert False is mut.record(1.0, failed=False)
+
+    monotonic.return_value = 130
+    assert sut.State.HALF_OPEN == mut.state
+
+    # A single probe is let through
+    assert True is mut.allow()
+    assert False is mut.allow()
+    assert sut.State.OPEN == mut.state
+
+    assert False is mut.record(0.1, failed=False)
+    assert sut.State.CLOSED == mut.state
+    assert True is mut.allow()
+
+@mock.patch('functions.ayayot.breaker.time.monotonic', autospec=True)
+def test_CircuitBreaker_probe_fails(monotonic: mock.Mock):
+    mut = sut.CircuitBreaker(threshold=1, slow_call=0, open_seconds=30)
+
+    monotonic.return_value = 100
+    assert True is mut.record(60, failed=True)
+
+    monotonic.return_value = 130
+    assert True is mut.allow()
+    assert True is mut.record(0.1, failed=True)
+
+    # Open for another open time
+    monotonic.return_value = 159
+    assert False is mut.allow()
+
+    monotonic.return_value = 160
+    assert True is mut.allow()
+
+@pytest.mark.parametrize('threshold', [0, -1])
+def test_CircuitBreaker_disabled(threshold: int):
+    mut = sut.CircuitBreaker(threshold=threshold, slow_call=1.0, open_seconds=30)
+
+    for _ in range(10):
+        assert False is mut.record(10, failed=True)
+
+    assert True is mut.allow()
+
+def test_CircuitBreakers():
+    mut = sut.CircuitBreakers(threshold=3, slow_call=2.0, open_seconds=10)
+
+    breaker = mut.breaker('AssetDescendantList')
+
+    assert breaker is mut.breaker('AssetDescendantList')
+    assert breaker is not mut.breaker('AssetAppConfigList')
+    assert (3, 2.0, 10) == (breaker.threshold, breaker.slow_call, breaker.open_seconds)
+
+    mut.reset()
+
+    assert breaker is not mut.breaker('AssetDescendantList')
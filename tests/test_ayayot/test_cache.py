@@ -0,0 +1,548 @@
+from collections.abc import Iterator
+import time
+from unittest import mock
+
+import pytest
+
+from functions.ayayot import cache as sut
+from functions.ayayot.documents import ObjectIndex, ObjectMeta
+
+@mock.patch('functions.ayayot.cache.time.monotonic', autospec=True)
+def test_TtlCache_get(monotonic: mock.Mock):
+    mut = sut.TtlCache[str, str]('test', ttl=10, max_entries=10)
+
+    monotonic.return_value = 100
+    mut.set('key', 'value')
+
+    monotonic.return_value = 109
+    assert 'value' == mut.get('key')
+    assert None is mut.get('other')
+
+    monotonic.return_value = 110
+    assert None is mut.get('key')
+    assert sut.CacheEntry('value', 110) == mut.entry('key')
+
+def test_TtlCache_set_evicts_least_recently_used():
+    mut = sut.TtlCache[str, int]('test', ttl=10, max_entries=2)
+
+    mut.set('a', 1)
+    mut.set('b', 2)
+    assert 1 == mut.get('a')
+    mut.set('c', 3)
+
+    assert 2 == len(mut)
+    assert 1 == mut.get('a')
+    assert None is mut.get('b')
+    assert 3 == mut.get('c')
+
+def test_TtlCache_set_disabled():
+    mut = sut.TtlCache[str, int]('test', ttl=0, max_entries=2)
+
+    mut.set('a', 1)
+
+    assert 0 == len(mut)
+
+def test_TtlCache_get_or_load():
+    mut = sut.TtlCache[str, int]('test', ttl=10, max_entries=2)
+
+    loader = mock.Mock(return_value=1)
+
+    assert 1 == mut.get_or_load('a', loader)
+    assert 1 == mut.get_or_load('a', loader)
+
+    assert [mock.call()] == loader.call_args_list
+
+def test_TtlCache_delete_and_clear():
+    mut = sut.TtlCache[str, int]('test', ttl=10, max_entries=10)
+
+    mut.set('a', 1)
+    mut.set('b', 2)
+
+    mut.delete('a')
+    mut.delete('missing')
+    assert None is mut.get('a')
+    assert 2 == mut.get('b')
+
+    mut.clear()
+    assert 0 == len(mut)
+
+def test_asset_tree_keys():
+    mut = sut.asset_tree_keys
+
+    assert None is mut('scope01', 'asset01', 'template01')
+
+    sut.DESCENDANTS.set(('scope01', 'asset01'), (('asset02', 'Asset 2'), ('asset03', 'Asset 3')))
+
+    assert (
+        ('scope01', 'asset01'),
+        ('scope01', 'template01', ('asset01', 'asset02', 'asset03')),
+    ) == mut('scope01', 'asset01', 'template01')
+    assert None is mut('scope02', 'asset01', 'template01')
+
+@mock.patch('functions.ayayot.cache.time.monotonic', autospec=True)
+def test_asset_tree_expires_at(monotonic: mock.Mock):
+    mut = sut.asset_tree_expires_at
+
+    assert None is mut('scope01', 'asset01', 'template01')
+
+    monotonic.return_value = 100
+    sut.DESCENDANTS.set(('scope01', 'asset01'), (('asset02', 'Asset 2'),))
+
+    assert None is mut('scope01', 'asset01', 'template01')
+
+    monotonic.return_value = 105
+    sut.APP_CONFIG_OBJECTS.set(
+        ('scope01', 'template01', ('asset01', 'asset02')), ObjectIndex.build((ObjectMeta('file1'),)),
+    )
+
+    assert 100 + sut.DESCENDANTS.ttl == mut('scope01', 'asset01', 'template01')
+
+@mock.patch('functions.ayayot.cache.time.monotonic', autospec=True)
+def test_cached_tree_index(monotonic: mock.Mock):
+    mut = sut.cached_tree_index
+
+    assert None is mut('scope01', 'asset01', 'template01')
+
+    monotonic.return_value = 100
+    sut.DESCENDANTS.set(('scope01', 'asset01'), (('asset02', 'Asset 2'),))
+
+    assert None is mut('scope01', 'asset01', 'template01')
+
+    index = ObjectIndex.build((ObjectMeta('file1'),))
+    sut.APP_CONFIG_OBJECTS.set(('scope01', 'template01', ('asset01', 'asset02')), index)
+    monotonic.return_value = 100 + sut.APP_CONFIG_OBJECTS.ttl + 1
+
+    assert index is mut('scope01', 'asset01', 'template01')
+    assert None is mut('scope02', 'asset01', 'template01')
+
+def test_clear_all():
+    mut = sut.clear_all
+
+    sut.DESCENDANTS.set(('scope01', 'asset01'), ())
+    sut.APP_CONFIG_OBJECTS.set(('scope01', 'template01', ('asset01',)), ObjectIndex.build(()))
+
+    mut()
+
+    assert 0 == len(sut.DESCENDANTS)
+    assert 0 == len(sut.APP_CONFIG_OBJECTS)
+
+@mock.patch('functions.ayayot.cache.time.monotonic', autospec=True)
+def test_TtlCache_get_or_load_fresh(monotonic: mock.Mock):
+    mut = sut.TtlCache[str, int]('test', ttl=10, max_entries=2)
+
+    monotonic.return_value = 100
+    mut.set('a', 1)
+
+    loader = mock.Mock(return_value=2)
+
+    assert 2 == mut.get_or_load('a', loader, sut.Freshness.FRESH)
+    assert 2 == mut.get('a')
+
+    assert {'cache.test.misses': 1.0} == sut.metrics.snapshot()
+
+@mock.patch('functions.ayayot.cache._get_refresher', autospec=True)
+@mock.patch('functions.ayayot.cache.time.monotonic', autospec=True)
+def test_TtlCache_get_or_load_stale(monotonic: mock.Mock, _get_refresher: mock.Mock):
+    mut = sut.TtlCache[str, int]('test', ttl=10, max_entries=2, max_stale=60)
+
+    monotonic.return_value = 100
+    mut.set('a', 1)
+
+    loader = mock.Mock(return_value=2)
+
+    # Expired, but within the maximum staleness
+    monotonic.return_value = 150
+    assert 1 == mut.get_or_load('a', loader, sut.Freshness.STALE)
+    assert 1 == mut.get_or_load('a', loader, sut.Freshness.STALE)
+
+    assert [] == loader.call_args_list
+    assert [
+        mock.call(mut._refresh, 'a', loader, mut._refreshing['a'])
+    ] == _get_refresher.return_value.submit.call_args_list
+
+    # Not served stale when the caller does not allow it
+    assert 2 == mut.get_or_load('a', loader)
+
+    # Expired longer than the maximum staleness ago
+    monotonic.return_value = 300
+    loader.return_value = 3
+    assert 3 == mut.get_or_load('a', loader, sut.Freshness.STALE)
+
+    assert {
+        'cache.test.misses': 2.0,
+        'cache.test.stale_hits': 2.0,
+    } == sut.metrics.snapshot()
+
+def test_TtlCache_get_or_load_stale_missing():
+    mut = sut.TtlCache[str, int]('test', ttl=10, max_entries=2, max_stale=60)
+
+    assert 1 == mut.get_or_load('a', lambda: 1, sut.Freshness.STALE)
+
+def test_TtlCache_refresh():
+    mut = sut.TtlCache[str, int]('test', ttl=10, max_entries=2, max_stale=60)
+
+    mut._refreshing['a'] = token = object()
+    mut._refresh('a', lambda: 1, token)
+
+    assert 1 == mut.get('a')
+    assert {} == mut._refreshing
+
+def test_TtlCache_refresh_invalidated():
+    mut = sut.TtlCache[str, int]('test', ttl=10, max_entries=2, max_stale=60)
+
+    mut._refreshing['a'] = token = object()
+    mut.delete('a')
+    mut._refresh('a', lambda: 1, token)
+
+    assert None is mut.entry('a')
+    assert {} == mut._refreshing
+
+@mock.patch('functions.ayayot.cache.logger', autospec=True)
+def test_TtlCache_refresh_failure(logger: mock.Mock):
+    mut = sut.TtlCache[str, int]('test', ttl=10, max_entries=2, max_stale=60)
+
+    mut._refreshing['a'] = token = object()
+    mut._refresh('a', mock.Mock(side_effect=RuntimeError), token)
+
+    assert None is mut.get('a')
+    assert {} == mut._refreshing
+    assert 1 == logger.exception.call_count
+
+def test_TtlCache_delete_where():
+    mut = sut.TtlCache[str, int]('test', ttl=10, max_entries=10)
+
+    mut.set('a1', 1)
+    mut.set('a2', 2)
+    mut.set('b1', 3)
+    mut._refreshing['a3'] = object()
+    mut._refreshing['b2'] = object()
+
+    assert 2 == mut.delete_where(lambda key: key.startswith('a'))
+
+    assert None is mut.entry('a1')
+    assert None is mut.entry('a2')
+    assert 3 == mut.get('b1')
+    assert ['b2'] == list(mut._refreshing)
+
+def test_invalidate_asset():
+    mut = sut.invalidate_asset
+
+    sut.DESCENDANTS.set(('scope01', 'parent'), (('asset01', 'Asset 1'), ('other', 'Other')))
+    sut.DESCENDANTS.set(('scope01', 'asset01'), (('child', 'Child'),))
+    sut.DESCENDANTS.set(('scope02', 'asset01'), ())
+    sut.DESCENDANTS.set(('scope01', 'other'), ())
+    sut.APP_CONFIG_OBJECTS.set(
+        ('scope01', 'template01', ('parent', 'asset01', 'other', 'child')), ObjectIndex.build(()),
+    )
+    sut.APP_CONFIG_OBJECTS.set(('scope01', 'template01', ('asset01', 'child')), ObjectIndex.build(()))
+    sut.APP_CONFIG_OBJECTS.set(('scope01', 'template01', ('other',)), ObjectIndex.build(()))
+
+    # The lookups of every caller are evicted
+    assert 4 == mut('asset01')
+
+    assert None is sut.DESCENDANTS.entry(('scope01', 'asset01'))
+    assert None is sut.DESCENDANTS.entry(('scope02', 'asset01'))
+    assert None is not sut.DESCENDANTS.entry(('scope01', 'parent'))
+    assert None is not sut.DESCENDANTS.entry(('scope01', 'other'))
+    assert None is sut.APP_CONFIG_OBJECTS.entry(
+        ('scope01', 'template01', ('parent', 'asset01', 'other', 'child')),
+    )
+    assert None is sut.APP_CONFIG_OBJECTS.entry(('scope01', 'template01', ('asset01', 'child')))
+    assert None is not sut.APP_CONFIG_OBJECTS.entry(('scope01', 'template01', ('other',)))
+
+    assert 4 == sut.metrics.snapshot()['cache.invalidated']
+
+def test__get_refresher():
+    mut = sut._get_refresher
+
+    with mock.patch('functions.ayayot.cache._refresher', None):
+        refresher = mut()
+
+        assert refresher is mut()
+
+    refresher.shutdown()
+
+def create_shared(backend: sut.backends.CacheBackend) -> sut.SharedStore[str, int]:
+    return sut.SharedStore(backend, lambda value: value, int, lambda key: (key, 'all'))
+
+def test_TtlCache_shared():
+    backend = sut.backends.MemoryBackend()
+    worker1 = sut.TtlCache[str, int]('test', ttl=10, max_entries=10, max_stale=60)
+    worker2 = sut.TtlCache[str, int]('test', ttl=10, max_entries=10, max_stale=60)
+    worker1.share(create_shared(backend))
+    worker2.share(create_shared(backend))
+
+    worker1.set('a', 1)
+
+    assert 1 == worker2.get('a')
+    assert 1 == worker2.get('a')
+    assert None is worker2.get('b')
+
+    # Cached in the worker itself after the first lookup
+    assert {'cache.test.shared_hits': 1.0} == sut.metrics.snapshot()
+
+    assert 1 == worker2.delete_tag('all')
+    assert 0 == worker2.delete_tag('a')
+    assert None is worker1.delete('a')
+    assert None is worker1.get('a')
+
+def test_TtlCache_shared_expiry():
+    backend = sut.backends.MemoryBackend()
+    mut = sut.TtlCache[str, int]('test', ttl=10, max_entries=10, max_stale=60)
+    mut.share(create_shared(backend))
+
+    backend.set(mut._shared_key('a'), sut.backends.pack(1, time.time() - 5), 60, [])
+    backend.set(mut._shared_key('b'), sut.backends.pack(2, time.time() + 5), 60, [])
+
+    # Expired, but stored so it can be served stale
+    assert None is mut.get('a')
+    assert mut.entry('a')
+    with mock.patch('functions.ayayot.cache._get_refresher', autospec=True):
+        assert 1 == mut.get_or_load('a', lambda: 3, sut.Freshness.STALE)
+
+    # Expires when the entry in the backend expires
+    assert 2 == mut.get('b')
+    entry = mut.entry('b')
+    assert entry
+    assert 4 < entry.expires_at - time.monotonic() <= 5
+
+def test_TtlCache_shared_keeps_newer_entry():
+    backend = sut.backends.MemoryBackend()
+    mut = sut.TtlCache[str, int]('test', ttl=10, max_entries=10, max_stale=60)
+    mut.share(create_shared(backend))
+
+    mut._entries['a'] = sut.CacheEntry(1, time.monotonic() - 10)
+
+    # Stored by another worker, also expired but longer ago
+    backend.set(mut._shared_key('a'), sut.backends.pack(2, time.time() - 15), 60, [])
+
+    assert None is mut.get('a')
+    assert 1 == mut.entry('a').value  # type: ignore[union-attr]
+
+@pytest.mark.parametrize('packed', [
+    pytest.param(b'corrupt', id='corrupt'),
+    pytest.param(sut.backends.pack('not a number', time.time() + 10), id='invalid'),
+])
+def test_TtlCache_shared_invalid(packed: bytes):
+    backend = sut.backends.MemoryBackend()
+    mut = sut.TtlCache[str, int]('test', ttl=10, max_entries=10)
+    mut.share(create_shared(backend))
+
+    backend.set(mut._shared_key('a'), packed, 60, [])
+
+    assert None is mut.get('a')
+    assert None is mut.entry('a')
+
+def test_TtlCache_shared_disabled():
+    backend = mock.create_autospec(spec=sut.backends.CacheBackend, instance=True)
+    mut = sut.TtlCache[str, int]('test', ttl=0, max_entries=10)
+    mut.share(create_shared(backend))
+
+    mut.set('a', 1)
+
+    assert [] == backend.set.call_args_list
+
+@mock.patch('functions.ayayot.cache.logger', autospec=True)
+def test_TtlCache_shared_errors(logger: mock.Mock):
+    backend = mock.create_autospec(spec=sut.backends.CacheBackend, instance=True)
+    backend.get.side_effect = sut.backends.BackendError
+    backend.set.side_effect = sut.backends.BackendError
+    backend.delete_tag.side_effect = sut.backends.BackendError
+    backend.add_mark.side_effect = sut.backends.BackendError
+    backend.get_marks.side_effect = sut.backends.BackendError
+
+    mut = sut.TtlCache[str, int]('test', ttl=10, max_entries=10, sync_interval=0)
+    mut.share(create_shared(backend))
+
+    # The invalidation marks cannot be checked either
+    assert None is mut.get('a')
+    assert 1 == mut.get_or_load('a', lambda: 1, sut.Freshness.FRESH)
+    assert 0 == mut.delete_tag('b')
+    mut.mark_invalidated('b')
+    assert 1 == mut.get('a')
+
+    assert 6 == logger.warning.call_count
+    assert 6 == sut.metrics.snapshot()['cache.test.shared_errors']
+
+def test_TtlCache_shared_invalidated():
+    backend = sut.backends.MemoryBackend()
+    worker1 = sut.TtlCache[str, int]('test', ttl=10, max_entries=10, max_stale=60)
+    worker2 = sut.TtlCache[str, int]('test', ttl=10, max_entries=10, max_stale=60, sync_interval=0)
+    worker1.share(create_shared(backend))
+    worker2.share(create_shared(backend))
+
+    worker1.set('a', 1)
+    worker1.set('b', 2)
+    assert 1 == worker2.get('a')
+    assert 2 == worker2.get('b')
+
+    # Another worker invalidates the entries of a tag in the backend
+    worker1.delete_tag('a')
+    worker1.mark_invalidated('a')
+
+    # Only the entries with the tag loaded before are evicted
+    assert None is worker2.get('a')
+    assert None is worker2.entry('a')
+    assert 2 == worker2.get('b')
+    assert 1 == sut.metrics.snapshot()['cache.test.synced']
+
+    # Entries loaded since are kept, and shared again
+    worker2.set('a', 3)
+    assert 3 == worker2.get('a')
+    assert 1 == sut.metrics.snapshot()['cache.test.synced']
+    worker1.delete('a')
+    assert 3 == worker1.get('a')
+
+def test_TtlCache_shared_invalidated_outdated():
+    backend = sut.backends.MemoryBackend()
+    mut = sut.TtlCache[str, int]('test', ttl=10, max_entries=10, max_stale=60, sync_interval=0)
+    mut.share(create_shared(backend))
+
+    loaded_at = time.monotonic()
+    mut.mark_invalidated('a')
+
+    # Loaded before the mark, as by a refresh that was running meanwhile
+    mut.set('a', 1, loaded_at)
+    assert None is mut.entry('a')
+    assert None is backend.get(mut._shared_key('a'))
+
+    # Stored by a worker that did not know of the mark yet
+    now = time.time()
+    backend.set(mut._shared_key('a'), sut.backends.pack(2, now + 10, now - 1), 60, [])
+    assert None is mut.get('a')
+    assert None is mut.entry('a')
+
+    # Loaded after the mark
+    backend.set(mut._shared_key('a'), sut.backends.pack(3, now + 10, now + 1), 60, [])
+    assert 3 == mut.get('a')
+
+    # Invalidated while it was reloaded in the background
+    def loader() -> int:
+        mut.mark_invalidated('b')
+        return 4
+
+    mut._refreshing['b'] = token = object()
+    mut._refresh('b', loader, token)
+    assert None is mut.entry('b')
+    assert None is backend.get(mut._shared_key('b'))
+
+def test_TtlCache_shared_invalidated_interval():
+    backend = sut.backends.MemoryBackend()
+    mut = sut.TtlCache[str, int]('test', ttl=10, max_entries=10, sync_interval=60)
+    mut.share(create_shared(backend))
+
+    mut.set('a', 1)
+    assert 1 == mut.get('a')
+
+    # The marks are only checked once per interval
+    backend.add_mark(mut._marks_key(), 'a', time.time(), 60)
+    assert 1 == mut.get('a')
+
+    # Evicted, and not taken from the backend, as it was loaded before
+    mut._synced_at = float('-inf')
+    assert None is mut.get('a')
+    assert {'cache.test.synced': 1.0} == sut.metrics.snapshot()
+
+@mock.patch('functions.ayayot.cache.MARK_MARGIN', 0.0)
+def test_TtlCache_shared_invalidated_since():
+    backend = mock.create_autospec(spec=sut.backends.CacheBackend, instance=True)
+    backend.get.return_value = None
+    backend.get_marks.return_value = {}
+
+    mut = sut.TtlCache[str, int]('test', ttl=10, max_entries=10, sync_interval=0)
+    mut.share(create_shared(backend))
+
+    with mock.patch('functions.ayayot.cache.time.time', return_value=1000.0):
+        assert None is mut.get('a')
+    assert None is mut.get('a')
+
+    # Only the marks added since the last check are looked up
+    assert [
+        mock.call(mut._marks_key(), 0.0),
+        mock.call(mut._marks_key(), 1000.0),
+    ] == backend.get_marks.call_args_list
+
+@mock.patch('functions.ayayot.cache.time.monotonic', autospec=True)
+def test_TtlCache_marks_forgotten(monotonic: mock.Mock):
+    backend = sut.backends.MemoryBackend()
+    mut = sut.TtlCache[str, int]('test', ttl=10, max_entries=10, max_stale=60)
+    mut.share(create_shared(backend))
+
+    monotonic.return_value = 1000.0
+    mut.mark_invalidated('a')
+    mut.mark_invalidated('a')
+    assert {'a': 1000.0} == mut._marks
+
+    # No entry loaded before can be served anymore
+    monotonic.return_value = 1071.0
+    mut.mark_invalidated('b')
+    assert {'b': 1071.0} == mut._marks
+
+def test_TtlCache_mark_invalidated_disabled():
+    backend = mock.create_autospec(spec=sut.backends.CacheBackend, instance=True)
+    mut = sut.TtlCache[str, int]('test', ttl=0, max_entries=10)
+
+    mut.mark_invalidated('a')
+    mut.share(create_shared(backend))
+    mut.mark_invalidated('a')
+
+    assert [] == backend.add_mark.call_args_list
+    assert {} == mut._marks
+
+def test_TtlCache_refresh_shared():
+    backend = sut.backends.MemoryBackend()
+    mut = sut.TtlCache[str, int]('test', ttl=10, max_entries=2, max_stale=60)
+    mut.share(create_shared(backend))
+
+    mut._refreshing['a'] = token = object()
+    mut._refresh('a', lambda: 1, token)
+
+    assert backend.get(mut._shared_key('a'))
+
+@pytest.fixture(name='shared_backend')
+def fixture_shared_backend() -> Iterator[sut.backends.MemoryBackend]:
+    backend = sut.backends.MemoryBackend()
+    sut.use_backend(backend)
+
+    yield backend
+
+    sut.use_backend(None)
+
+def test_use_backend(shared_backend: sut.backends.MemoryBackend):
+    descendants = (('asset02', 'Asset 2'),)
+    index = ObjectIndex.build((ObjectMeta('file1', 'Manual', 1, 10, 'application/pdf', 'manuals'),))
+
+    sut.DESCENDANTS.set(('scope01', 'asset01'), descendants)
+    sut.APP_CONFIG_OBJECTS.set(('scope01', 'template01', ('asset01', 'asset02')), index)
+
+    # Looked up in the backend, as by another worker
+    sut.DESCENDANTS.clear()
+    sut.APP_CONFIG_OBJECTS.clear()
+
+    assert descendants == sut.DESCENDANTS.get(('scope01', 'asset01'))
+    output = sut.APP_CONFIG_OBJECTS.get(('scope01', 'template01', ('asset01', 'asset02')))
+    assert output
+    assert index.objects == output.objects
+
+    assert 2 + 2 == sut.invalidate_asset('asset02') + sut.invalidate_asset('asset01')
+    assert None is shared_backend.get(
+        sut.APP_CONFIG_OBJECTS._shared_key(('scope01', 'template01', ('asset01', 'asset02'))),
+    )
+
+    sut.use_backend(None)
+    assert None is sut.DESCENDANTS.shared
+    assert None is sut.APP_CONFIG_OBJECTS.shared
+
+def test_use_backend_scoped(shared_backend: sut.backends.MemoryBackend):
+    sut.DESCENDANTS.set(('scope01', 'asset01'), (('asset02', 'Asset 2'),))
+    sut.APP_CONFIG_OBJECTS.set(
+        ('scope01', 'template01', ('asset01', 'asset02')), ObjectIndex.build((ObjectMeta('file1'),)),
+    )
+
+    # Another worker looks up the same asset for another caller
+    sut.DESCENDANTS.clear()
+    sut.APP_CONFIG_OBJECTS.clear()
+
+    assert None is sut.DESCENDANTS.get(('scope02', 'asset01'))
+    assert None is sut.APP_CONFIG_OBJECTS.get(('scope02', 'template01', ('asset01', 'asset02')))
+    assert 2 == len(shared_backend._values)
@@ -0,0 +1,97 @@
+from ixoncdkingress.function.context import FunctionResource
+from ixoncdkingress.function.objectstorage.types import PathMapping, ResourceType
+
+from functions.ayayot import compact as sut
+
+MAPPINGS = [
+    PathMapping(publicId="asset01", type=ResourceType.ASSET, path="assets/asset01/"),
+    PathMapping(publicId="agent01", type=ResourceType.AGENT, path="agents/agent01/"),
+    PathMapping(publicId="asset02", type=ResourceType.ASSET, path="assets/asset02/"),
+    PathMapping(publicId=None, type=ResourceType.ASSET, path="assets/uuid1"),
+    PathMapping(publicId=None, type=ResourceType.ASSET, path="assets/uuid2"),
+]
+
+def test_encode_mappings():
+    mut = sut.encode_mappings
+
+    output = mut(MAPPINGS)
+
+    assert {
+        "prefixes": {"Asset": "assets/", "Agent": "agents/"},
+        "resources": {"Asset": ["asset01", "asset02"], "Agent": ["agent01"]},
+        "objects": {"Asset": ["uuid1", "uuid2"]},
+        "other": [],
+    } == output
+
+def test_encode_mappings_other():
+    mut = sut.encode_mappings
+
+    other = [
+        PathMapping(publicId="asset01", type=ResourceType.ASSET, path="assets/other/"),
+        PathMapping(publicId=None, type=ResourceType.AGENT, path="assets/uuid1"),
+        PathMapping(publicId=None, type=ResourceType.ASSET, path="assets/uuid1/file"),
+    ]
+
+    output = mut(other)
+
+    assert {} == output["resources"]
+    assert {} == output["objects"]
+    assert other == output["other"]
+
+def test_decode_mappings():
+    mut = sut.decode_mappings
+
+    other = PathMapping(publicId=None, type=ResourceType.ASSET, path="assets/uuid3/file")
+
+    output = mut(sut.encode_mappings([*MAPPINGS, other]))
+
+    assert [
+        MAPPINGS[0], MAPPINGS[2], MAPPINGS[1], MAPPINGS[3], MAPPINGS[4], other,
+    ] == output
+
+def test_pack():
+    data = sut.encode_mappings(MAPPINGS)
+
+    assert data is sut.pack(data, sut.COMPACT)
+    assert data is sut.unpack(data, sut.COMPACT)
+
+    packed = sut.pack(data, sut.COMPACT_GZIP)
+
+    assert isinstance(packed, str)
+    assert data == sut.unpack(packed, sut.COMPACT_GZIP)
+
+def test_encode():
+    mut = sut.encode
+
+    def resource(public_id: str) -> FunctionResource:
+        return FunctionResource(
+            public_id=public_id,
+            name=public_id,
+            custom_properties={},
+            permissions=set(),
+        )
+
+    output = mut(
+        [
+            (resource("asset01"), ResourceType.ASSET),
+            (resource("agent01"), ResourceType.AGENT),
+            (resource("asset02"), ResourceType.ASSET),
+        ],
+        ["uuid1", "uuid2"],
+    )
+
+    assert sut.encode_mappings(MAPPINGS) == output
+    assert [] == mut([], [])["other"]
+
+def test_format_list_response():
+    mut = sut.format_list_response
+
+    response = {"result": "success", "data": MAPPINGS}
+
+    assert response is mut(response, None)
+    assert {
+        "result": "success",
+        "format": sut.COMPACT,
+        "data": sut.encode_mappings(MAPPINGS),
+    } == mut(response, sut.COMPACT)
+    assert True is mut({**response, "partial": True}, sut.COMPACT)["partial"]
@@ -0,0 +1,75 @@
+from unittest import mock
+
+import pytest
+
+from functions.ayayot import deadline as sut
+
+def test_without_budget():
+    assert None is sut.remaining()
+    assert None is sut.timeout()
+    assert True is sut.allows_optional_work()
+
+    sut.skip()
+
+    assert False is sut.is_partial()
+    assert {} == sut.metrics.snapshot()
+
+@mock.patch('functions.ayayot.deadline.BUDGET', 10.0)
+@mock.patch('functions.ayayot.deadline.time.monotonic', autospec=True)
+def test_budgeted(monotonic: mock.Mock):
+    results = []
+
+    @sut.budgeted
+    def mut(elapsed: float) -> str:
+        monotonic.return_value = 100.0 + elapsed
+        results.append((sut.remaining(), sut.timeout(), sut.allows_optional_work()))
+        return 'result'
+
+    monotonic.return_value = 100.0
+
+    assert 'result' == mut(2.5)
+    assert [(7.5, 7.5, True)] == results
+    assert False is sut.is_partial()
+
+    # The deadline is only set during the call
+    assert None is sut.remaining()
+
+@mock.patch('functions.ayayot.deadline.BUDGET', 10.0)
+@mock.patch('functions.ayayot.deadline.OPTIONAL_BUDGET', 1.0)
+@mock.patch('functions.ayayot.deadline.time.monotonic', autospec=True)
+def test_budgeted_skips_optional_work(monotonic: mock.Mock):
+    results = []
+
+    @sut.budgeted
+    def mut() -> None:
+        monotonic.return_value = 109.5
+        results.append(sut.allows_optional_work())
+        results.append(sut.allows_optional_work())
+        results.append(sut.is_partial())
+
+    monotonic.return_value = 100.0
+    mut()
+
+    assert [False, False, True] == results
+    assert {'deadline.partial': 1.0} == sut.metrics.snapshot()
+
+@mock.patch('functions.ayayot.deadline.BUDGET', 10.0)
+@mock.patch('functions.ayayot.deadline.time.monotonic', autospec=True)
+def test_budgeted_exceeded(monotonic: mock.Mock):
+    @sut.budgeted
+    def mut() -> None:
+        monotonic.return_value = 110.0
+        sut.timeout()
+
+    monotonic.return_value = 100.0
+
+    with pytest.raises(sut.DeadlineExceeded):
+        mut()
+
+@mock.patch('functions.ayayot.deadline.BUDGET', 0.0)
+def test_budgeted_disabled():
+    @sut.budgeted
+    def mut() -> float | None:
+        return sut.remaining()
+
+    assert None is mut()
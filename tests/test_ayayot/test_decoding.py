@@ -0,0 +1,121 @@
+from collections.abc import Iterator
+from concurrent.futures.process import BrokenProcessPool
+import os
+import sys
+from unittest import mock
+
+import pytest
+
+from functions.ayayot import decoding as sut, metrics
+from functions.ayayot.documents import ObjectIndex
+
+VALUES = '[{"id": "uuid1", "name": "Manual", "order": 1}, {"name": "no id"}]'
+STATE_VALUES = '[{"id": "uuid2", "size": 10, "type": "pdf", "category": "manuals"}]'
+
+EXPECTED = [
+    sut.ObjectMeta(id='uuid1', name='Manual', order=1),
+    sut.ObjectMeta(id='uuid2', size=10, type='pdf', category='manuals'),
+]
+
+@pytest.fixture
+def pool() -> Iterator[None]:
+    yield
+    sut.shutdown()
+
+@pytest.mark.parametrize('values,state_values,expected', [
+    pytest.param(VALUES, STATE_VALUES, EXPECTED, id='both'),
+    pytest.param(None, '', [], id='empty'),
+])
+def test_decode_objects_inline(
+        values: str | None,
+        state_values: str | None,
+        expected: list[sut.ObjectMeta],
+    ):
+    mut = sut.decode_objects
+
+    with mock.patch('functions.ayayot.decoding.OFFLOAD_THRESHOLD', 0):
+        assert expected == mut(values, state_values)
+
+    assert {} == metrics.snapshot()
+
+@pytest.mark.parametrize('invalid,expected', [
+    pytest.param('{"id": "uuid3", "name": 3}', [sut.ObjectMeta(id='uuid3')], id='name-not-str'),
+    pytest.param('{"id": 3, "name": "Wiring diagram"}', [], id='id-not-str'),
+    pytest.param(
+        '{"id": "uuid3", "category": ["manuals"]}',
+        [sut.ObjectMeta(id='uuid3')],
+        id='unhashable',
+    ),
+])
+def test_decode_objects_invalid(invalid: str, expected: list[sut.ObjectMeta]):
+    mut = sut.decode_objects
+
+    with mock.patch('functions.ayayot.decoding.OFFLOAD_THRESHOLD', 0):
+        output = mut(f'[{invalid}, {VALUES[1:-1]}]', STATE_VALUES)
+
+    assert expected + EXPECTED == output
+
+    # The objects are indexed, searched and compared by their fields
+    index = ObjectIndex.build(tuple(output))
+    assert ['uuid1'] == [obj.id for obj in index.search('manual')]
+    assert index is index.update(tuple(output))
+
+def test_decode_fields():
+    mut = sut.decode_fields
+
+    assert [
+        ('uuid1', 'Manual', 1, None, None, None),
+        ('uuid2', None, None, 10, 'pdf', 'manuals'),
+    ] == mut(VALUES, STATE_VALUES)
+
+@pytest.mark.usefixtures('pool')
+def test_decode_objects_offloaded():
+    mut = sut.decode_objects
+
+    with mock.patch('functions.ayayot.decoding.OFFLOAD_THRESHOLD', 10), \
+            mock.patch('functions.ayayot.decoding.PROCESSES', 1):
+        assert [] == mut('[]', None)
+        assert EXPECTED == mut(VALUES, STATE_VALUES)
+        assert EXPECTED == mut(VALUES, STATE_VALUES)
+
+    assert {'decode.offloaded': 2.0} == metrics.snapshot()
+
+@pytest.mark.usefixtures('pool')
+def test_decode_objects_offloaded_outside_import_path():
+    mut = sut.decode_objects
+
+    # As in the ingress, which removes the function path once it imported
+    # the function module
+    root = sut._import_root()
+    path = [entry for entry in sys.path if os.path.abspath(entry or '.') != root]
+
+    with mock.patch.object(sys, 'path', path), \
+            mock.patch('functions.ayayot.decoding.OFFLOAD_THRESHOLD', 10), \
+            mock.patch('functions.ayayot.decoding.PROCESSES', 1):
+        assert EXPECTED == mut(VALUES, STATE_VALUES)
+
+    assert {'decode.offloaded': 1.0} == metrics.snapshot()
+
+@pytest.mark.usefixtures('pool')
+@mock.patch('functions.ayayot.decoding._broken', False)
+@mock.patch('functions.ayayot.decoding._get_pool', autospec=True)
+def test_decode_objects_broken_pool(_get_pool: mock.Mock):
+    mut = sut.decode_objects
+
+    _get_pool.return_value.submit.return_value.result.side_effect = BrokenProcessPool
+
+    with mock.patch('functions.ayayot.decoding.OFFLOAD_THRESHOLD', 10):
+        assert EXPECTED == mut(VALUES, STATE_VALUES)
+        assert EXPECTED == mut(VALUES, STATE_VALUES)
+
+    # The pool is not started again once it broke
+    assert 1 == _get_pool.call_count
+    assert sut._broken
+    assert {} == metrics.snapshot()
+
+def test_shutdown():
+    mut = sut.shutdown
+
+    mut()
+
+    assert None is sut._pool
@@ -0,0 +1,155 @@
+from typing import Any
+
+import pytest
+
+from functions.ayayot import documents as sut
+
+@pytest.mark.parametrize('names,expected', [
+    pytest.param(
+        ['file10.pdf', 'File2.pdf', 'file1.pdf'],
+        ['file1.pdf', 'File2.pdf', 'file10.pdf'],
+        id='numbers',
+    ),
+    pytest.param(
+        ['b', '10', 'A', '2'],
+        ['2', '10', 'A', 'b'],
+        id='numbers-first',
+    ),
+])
+def test_natural_key(names: list[str], expected: list[str]):
+    mut = sut.natural_key
+
+    assert expected == sorted(names, key=mut)
+
+def test_sort_key():
+    mut = sut.sort_key
+
+    objects = [
+        sut.ObjectMeta(id='5', name='unordered b'),
+        sut.ObjectMeta(id='4', name='Unordered A'),
+        sut.ObjectMeta(id='3', name=None),
+        sut.ObjectMeta(id='2', name='second', order=2),
+        sut.ObjectMeta(id='1', name='first', order=1),
+        sut.ObjectMeta(id='0', name='invalid order', order='x'),  # type: ignore[arg-type]
+        sut.ObjectMeta(id='6', name='first', order=1),
+    ]
+
+    assert ['1', '6', '2', '3', '0', '4', '5'] == [obj.id for obj in sorted(objects, key=mut)]
+
+@pytest.mark.parametrize('category,type_,expected', [
+    pytest.param(None, None, None, id='none'),
+    pytest.param('', '', None, id='empty'),
+    pytest.param('manuals', '', sut.ObjectFilter(category='manuals'), id='category'),
+    pytest.param(None, 'pdf', sut.ObjectFilter(type='pdf'), id='type'),
+])
+def test_ObjectFilter_create(
+        category: str | None,
+        type_: str | None,
+        expected: sut.ObjectFilter | None,
+    ):
+    mut = sut.ObjectFilter.create
+
+    assert expected == mut(category, type_)
+
+@pytest.mark.parametrize('object_filter,expected', [
+    pytest.param(None, ['1', '2', '3', '4'], id='none'),
+    pytest.param(sut.ObjectFilter(), ['1', '2', '3', '4'], id='empty'),
+    pytest.param(sut.ObjectFilter(category='MANUALS'), ['1', '3'], id='category'),
+    pytest.param(sut.ObjectFilter(type='pdf'), ['1', '2'], id='type'),
+    pytest.param(sut.ObjectFilter(category='manuals', type='pdf'), ['1'], id='both'),
+    pytest.param(sut.ObjectFilter(category='drawings'), [], id='unknown'),
+])
+def test_ObjectIndex_select(object_filter: sut.ObjectFilter | None, expected: list[str]):
+    index = sut.ObjectIndex.build((
+        sut.ObjectMeta(id='1', category='Manuals', type='pdf'),
+        sut.ObjectMeta(id='2', type='pdf'),
+        sut.ObjectMeta(id='3', category='manuals', type='txt'),
+        sut.ObjectMeta(id='4', category=1, type=None),  # type: ignore[arg-type]
+    ))
+    mut = index.select
+
+    assert expected == [obj.id for obj in mut(object_filter)]
+
+def create_search_index() -> sut.ObjectIndex:
+    return sut.ObjectIndex.build((
+        sut.ObjectMeta(id='1', name='Installation manual (EN)'),
+        sut.ObjectMeta(id='2', name='Wiring diagram'),
+        sut.ObjectMeta(id='3', name='Manual: maintenance'),
+        sut.ObjectMeta(id='4'),
+        sut.ObjectMeta(id='5', name='Electromechanically installed'),
+        sut.ObjectMeta(id='1', name='Copy'),
+    ))
+
+@pytest.mark.parametrize('query,expected', [
+    pytest.param('', [], id='empty'),
+    pytest.param('  - ', [], id='no-words'),
+    pytest.param('manual', ['1', '3'], id='word'),
+    pytest.param('MAN', ['1', '3'], id='prefix'),
+    pytest.param('man main', ['3'], id='all-words'),
+    pytest.param('install', ['1', '5'], id='same-id'),
+    pytest.param('nual', [], id='not-a-prefix'),
+    pytest.param('electromechanically', ['5'], id='long'),
+    pytest.param('electromechanicalness', [], id='long-mismatch'),
+])
+def test_ObjectIndex_search(query: str, expected: list[str]):
+    mut = create_search_index().search
+
+    assert expected == [obj.id for obj in mut(query)]
+
+def test_ObjectIndex_update():
+    index = create_search_index()
+    mut = index.update
+
+    objects = (
+        sut.ObjectMeta(id='2', name='Wiring diagram'),
+        sut.ObjectMeta(id='3', name='Maintenance'),
+        sut.ObjectMeta(id='6', name='Wiring manual', category='manuals'),
+        sut.ObjectMeta(id='1', name='Copy'),
+    )
+
+    output = mut(objects)
+
+    assert sut.ObjectIndex.build(objects) == output
+    assert ['6'] == [obj.id for obj in output.search('man')]
+    assert ['1', '5'] == [obj.id for obj in index.search('install')]
+
+def test_ObjectIndex_update_unchanged():
+    index = create_search_index()
+    mut = index.update
+
+    assert index is mut(index.objects)
+
+@pytest.mark.parametrize('object_filter,expected', [
+    pytest.param(None, ['3', '1', '2'], id='none'),
+    pytest.param(sut.ObjectFilter(type='pdf'), ['1', '2'], id='type'),
+])
+def test_ObjectIndex_select_sorted(object_filter: sut.ObjectFilter | None, expected: list[str]):
+    index = sut.ObjectIndex.build((
+        sut.ObjectMeta(id='1', name='b', type='pdf'),
+        sut.ObjectMeta(id='2', name='c', type='pdf'),
+        sut.ObjectMeta(id='3', name='a', type='txt'),
+    ))
+    mut = index.select_sorted
+
+    assert expected == [obj.id for obj in mut(object_filter)]
+
+@pytest.mark.parametrize('values,exists,expected', [
+    pytest.param(None, None, (None, 0), id='none'),
+    pytest.param('', None, ('', 0), id='empty'),
+    pytest.param('not json', None, ('not json', 0), id='not-json'),
+    pytest.param('{"id": "uuid1"}', None, ('{"id": "uuid1"}', 0), id='not-a-list'),
+    pytest.param(
+        '[{"id": "uuid1", "name": "A", "size": null}, {"id": "uuid1", "name": "A"}, 1, 1]',
+        None,
+        ('[{"id":"uuid1","name":"A"},1]', 2),
+        id='redundant',
+    ),
+    pytest.param(
+        '[{"id": "uuid1"}, {"id": "uuid2", "name": "Ü"}, {"name": "Without ID"}]',
+        {'uuid2'}.__contains__,
+        ('[{"id":"uuid2","name":"Ü"},{"name":"Without ID"}]', 1),
+        id='not-existing',
+    ),
+])
+def test_compact_app_config(values: str | None, exists: Any, expected: tuple[str | None, int]):
+    assert expected == sut.compact_app_config(values, exists)
@@ -0,0 +1,270 @@
+from typing import Any
+from unittest import mock
+
+import pytest
+
+from ixoncdkingress.function.api_client import ApiClient
+
+from functions.ayayot import maintenance as sut
+
+def app_config(public_id: str, values: str | None, state_values: str | None = None) -> dict:
+    return {
+        'publicId': public_id,
+        'asset': {'publicId': f'asset-{public_id}'},
+        'values': values,
+        'stateValues': state_values,
+    }
+
+def create_api_client(pages: list[list[dict]], current: dict[str, dict] | None = None) -> Any:
+    """
+    Creates an API client listing the given pages of app configs, and
+    answering the requests for a single app config with the current ones
+    """
+    api_client = mock.create_autospec(spec=ApiClient, instance=True)
+
+    def get(url_name: str, url_args: Any = None, query: Any = None, **_kwargs: Any) -> dict:
+        if url_name == 'AssetAppConfig':
+            return {'status': 'success', 'data': (current or {})[url_args['publicId']]}
+
+        page = int(query.get('page-after', 0))
+        return {
+            'status': 'success',
+            'data': pages[page],
+            'moreAfter': str(page + 1) if page + 1 < len(pages) else None,
+        }
+
+    api_client.get.side_effect = get
+    api_client.patch.return_value = {'status': 'success', 'data': {}}
+
+    return api_client
+
+@mock.patch.dict('os.environ', {'IXON_API_ACCESS_TOKEN': 'token'})
+def test_create_api_client():
+    output = sut.create_api_client()
+
+    assert 'Bearer token' == output._default_headers['Authorization']
+
+def test_create_api_client_token_file(tmp_path: Any, monkeypatch: Any):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / '.accesstoken').write_text('token\n')
+
+    output = sut.create_api_client({
+        'IXON_API_BASE_URL': 'https://api.example.com',
+        'IXON_API_COMPANY_ID': 'company01',
+    })
+
+    assert 'https://api.example.com' == output._base_url
+    assert 'Bearer token' == output._default_headers['Authorization']
+    assert 'company01' == output._default_headers['Api-Company']
+
+def test_create_api_client_no_token(tmp_path: Any, monkeypatch: Any):
+    monkeypatch.chdir(tmp_path)
+
+    with pytest.raises(sut.MaintenanceError):
+        sut.create_api_client({})
+
+@pytest.mark.parametrize('size,expected', [
+    (2, [[0, 1], [2, 3], [4]]),
+    (5, [[0, 1, 2, 3, 4]]),
+    (0, [[0], [1], [2], [3], [4]]),
+])
+def test_batched(size: int, expected: list[list[int]]):
+    assert expected == list(sut.batched(range(5), size))
+
+def test_iter_app_configs():
+    api_client = create_api_client([[app_config('1', None)], [app_config('2', None)]])
+
+    output = list(sut.iter_app_configs(api_client, 'template01', 'values'))
+
+    assert ['1', '2'] == [config['publicId'] for config in output]
+    assert [
+        mock.call('AssetAppConfigList', query={
+            'filters': ['eq(app.publicId,"template01")'],
+            'fields': 'values',
+            'page-size': str(sut.PAGE_SIZE),
+        }),
+        mock.call('AssetAppConfigList', query={
+            'filters': ['eq(app.publicId,"template01")'],
+            'fields': 'values',
+            'page-size': str(sut.PAGE_SIZE),
+            'page-after': '1',
+        }),
+    ] == api_client.get.call_args_list
+
+def test_iter_app_configs_error():
+    api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    api_client.get.return_value = {'type': 'Error', 'status': 'error', 'data': []}
+
+    with pytest.raises(sut.MaintenanceError):
+        list(sut.iter_app_configs(api_client, 'template01'))
+
+def test_parse_listing():
+    uuid1 = '0b5f2a4e-9c1d-4e8a-b6f3-2d7c8e9a1b01'
+    uuid2 = '0B5F2A4E-9C1D-4E8A-B6F3-2D7C8E9A1B02'
+
+    output = sut.parse_listing([
+        f'assets/{uuid1}/',
+        f'2024-01-01 10:00:00 1024 s3://bucket/assets/{uuid2}/manual.pdf\n',
+        f'assets/{uuid1}',
+        'assets/SSrcLY2sDOyK/manual.pdf',
+        f'assets/SSrcLY2sDOyK/{uuid1}/',
+        f'assets/{uuid1}0/',
+        'agents/agent01/',
+        '',
+    ])
+
+    assert [
+        (f'assets/{uuid1}/', uuid1),
+        (f's3://bucket/assets/{uuid2}/manual.pdf', uuid2),
+        (f'assets/{uuid1}', uuid1),
+    ] == list(output)
+
+def test_compact_app_configs_dry_run():
+    api_client = create_api_client([
+        [app_config('1', '[{"id": "uuid1", "size": null}]'), app_config('2', '[]')],
+        [app_config('3', '[{"id":"uuid3"}]', '[{"id": "uuid4"}]')],
+    ])
+
+    output = sut.compact_app_configs(
+        api_client,
+        'template01',
+        {'uuid1', 'uuid3'}.__contains__,
+        sut.CompactionOptions(dry_run=True, batch_size=1),
+    )
+
+    assert sut.CompactionReport(
+        configs=3,
+        changed=2,
+        removed=1,
+        bytes_before=len('[{"id": "uuid1", "size": null}]') + len('[{"id":"uuid3"}][{"id": "uuid4"}]'),
+        bytes_after=len('[{"id":"uuid1"}]') + len('[{"id":"uuid3"}][]'),
+    ) == output
+    assert [] == api_client.patch.call_args_list
+
+def test_compact_app_configs():
+    configs = [
+        app_config('1', '[{"id": "uuid1"}]'),
+        app_config('2', '[{"id": "uuid2"}]'),
+        app_config('3', '[{"id": "uuid3"}]'),
+    ]
+    api_client = create_api_client([configs], {
+        '1': configs[0],
+        # Modified since it was read
+        '2': {**configs[1], 'values': '[{"id": "uuid2"}, {"id": "uuid5"}]'},
+        '3': configs[2],
+    })
+    api_client.patch.side_effect = lambda url_name, data, url_args: {
+        'status': 'error' if url_args['publicId'] == '3' else 'success',
+        'data': [],
+    }
+
+    output = sut.compact_app_configs(
+        api_client,
+        'template01',
+        None,
+        sut.CompactionOptions(dry_run=False, concurrency=2),
+    )
+
+    assert (3, 1, 1, 1) == (output.changed, output.written, output.skipped, output.failed)
+    assert [
+        mock.call(
+            'AssetAppConfig',
+            {'values': '[{"id":"uuid1"}]', 'stateValues': None},
+            url_args={'publicId': '1'},
+        ),
+        mock.call(
+            'AssetAppConfig',
+            {'values': '[{"id":"uuid3"}]', 'stateValues': None},
+            url_args={'publicId': '3'},
+        ),
+    ] == sorted(api_client.patch.call_args_list, key=lambda call: call.kwargs['url_args']['publicId'])
+
+UUIDS = [f'00000000-0000-0000-0000-{index:012d}' for index in range(10)]
+
+@mock.patch('functions.ayayot.maintenance.IdSet.RUN_SIZE', 3)
+def test_IdSet():
+    mut = sut.IdSet()
+
+    for object_id in [UUIDS[5], UUIDS[1], UUIDS[3], UUIDS[1], UUIDS[7], 'not-a-uuid']:
+        mut.add(object_id)
+
+    assert 5 == len(mut)
+    assert [True, False, True, False, True, False, True] == [
+        object_id in mut for object_id in UUIDS[1:8]
+    ]
+    assert 'not-a-uuid' in mut
+    assert 'other' not in mut
+    assert None not in mut
+    assert UUIDS[9] not in mut
+
+    # Adding after querying merges the added IDs on the next query
+    mut.add(UUIDS[9])
+    mut.add(UUIDS[0].upper())
+
+    assert UUIDS[0] in mut
+    assert UUIDS[9] in mut
+    assert 7 == len(mut)
+
+def test_IdSet_empty():
+    mut = sut.IdSet()
+
+    assert 0 == len(mut)
+    assert UUIDS[0] not in mut
+
+def test_referenced_ids():
+    api_client = create_api_client([
+        [app_config('1', f'[{{"id": "{UUIDS[0]}"}}]', f'[{{"id": "{UUIDS[1]}"}}]')],
+        [app_config('2', None)],
+    ])
+
+    output = sut.referenced_ids(api_client, 'template01')
+
+    assert 2 == len(output)
+    assert UUIDS[0] in output
+    assert UUIDS[1] in output
+
+def test_referenced_ids_mistyped_fields():
+    api_client = create_api_client([
+        [app_config(
+            '1',
+            f'[{{"id": "{UUIDS[0]}", "size": 1024.0}}, "other", {{"id": 1}}]',
+            f'[{{"id": "{UUIDS[1]}", "order": "1", "name": ["a"]}}]',
+        )],
+    ])
+
+    output = sut.referenced_ids(api_client, 'template01')
+
+    assert 2 == len(output)
+    assert UUIDS[0] in output
+    assert UUIDS[1] in output
+
+@pytest.mark.parametrize('values', [
+    pytest.param('not json', id='not-json'),
+    pytest.param('{"id": "a"}', id='not-list'),
+])
+def test_referenced_ids_invalid(values: str):
+    api_client = create_api_client([[app_config('1', values)]])
+
+    with pytest.raises(sut.MaintenanceError, match='app config 1'):
+        sut.referenced_ids(api_client, 'template01')
+
+def test_find_orphans():
+    referenced = sut.IdSet()
+    referenced.add(UUIDS[0])
+
+    output = sut.find_orphans(
+        [(f'assets/{UUIDS[0]}/', UUIDS[0]), (f'assets/{UUIDS[1]}/', UUIDS[1])],
+        referenced,
+    )
+
+    assert [f'assets/{UUIDS[1]}/'] == list(output)
+
+@mock.patch('functions.ayayot.maintenance.time.sleep', autospec=True)
+def test_delete_in_batches(sleep: mock.Mock):
+    delete = mock.Mock()
+
+    output = sut.delete_in_batches(iter(['a', 'b', 'c']), delete, 2, 0.0)
+
+    assert 3 == output
+    assert [mock.call(['a', 'b']), mock.call(['c'])] == delete.call_args_list
+    assert [mock.call(0.0), mock.call(0.0)] == sleep.call_args_list
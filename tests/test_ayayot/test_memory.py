@@ -0,0 +1,135 @@
+from collections.abc import Iterator
+import tracemalloc
+from unittest import mock
+
+import pytest
+
+from functions.ayayot import memory as sut, metrics
+
+@pytest.fixture
+def tracing() -> Iterator[None]:
+    yield
+    tracemalloc.stop()
+
+def allocate(size: int) -> int:
+    return len(bytearray(size))
+
+def test_accounted_disabled():
+    mut = sut.accounted(allocate)
+
+    with mock.patch('functions.ayayot.memory.ENABLED', False):
+        assert 10 == mut(10)
+
+    assert not tracemalloc.is_tracing()
+    assert {} == metrics.snapshot()
+    assert 'allocate' == mut.__name__
+
+@pytest.mark.usefixtures('tracing')
+def test_accounted():
+    mut = sut.accounted(allocate)
+
+    with mock.patch('functions.ayayot.memory.ENABLED', True):
+        assert 1_000_000 == mut(1_000_000)
+        mut(10)
+
+    output = metrics.snapshot()
+
+    assert tracemalloc.is_tracing()
+    assert 2 == output['memory.calls.allocate']
+    assert 1_000_000 <= output['memory.max_peak_bytes.allocate'] < 1_100_000
+    assert output['memory.max_peak_bytes.allocate'] <= output['memory.peak_bytes.allocate']
+
+@pytest.mark.usefixtures('tracing')
+def test_accounted_overlapping():
+    mut = sut.accounted(allocate)
+
+    with mock.patch('functions.ayayot.memory.ENABLED', True), \
+            mock.patch('functions.ayayot.memory._active', 1), \
+            mock.patch('functions.ayayot.memory.tracemalloc.reset_peak') as reset_peak:
+        mut(10)
+
+        # Another call is still being traced
+        assert 1 == sut._active
+
+    assert [] == reset_peak.call_args_list
+
+@pytest.mark.usefixtures('tracing')
+def test__over_budget():
+    mut = sut._over_budget
+
+    def hold(size: int) -> bool:
+        held = bytearray(size)
+        return bool(held) and mut()
+
+    with mock.patch('functions.ayayot.memory.ENABLED', True), \
+            mock.patch('functions.ayayot.memory.BUDGET', 100_000):
+        assert not mut()
+        assert not sut.accounted(hold)(10)
+        assert sut.accounted(hold)(1_000_000)
+
+    assert not mut()
+
+@mock.patch('functions.ayayot.memory.MAX_DIVISOR', 4)
+@mock.patch('functions.ayayot.memory._over_budget', autospec=True)
+def test_chunks(_over_budget: mock.Mock):
+    mut = sut.chunks
+
+    _over_budget.side_effect = [False, True, False, True]
+
+    output = list(mut(tuple(range(20)), 8))
+
+    # Halved while the call holds more than the budget, down to the smallest
+    assert [8, 4, 4, 2, 2] == [len(chunk) for chunk in output]
+    assert tuple(range(20)) == sum(output, ())
+    assert 4 == _over_budget.call_count
+    assert {'memory.rechunked': 2.0} == metrics.snapshot()
+
+@mock.patch('functions.ayayot.memory._divisor', 4)
+def test_chunks_shrunk():
+    mut = sut.chunks
+
+    assert [(0, 1), (2, 3), (4,)] == list(mut(tuple(range(5)), 8))
+
+@pytest.mark.parametrize('budget,peak,over_budget', [
+    pytest.param(0, 1000, False, id='no-budget'),
+    pytest.param(1000, 1000, False, id='within'),
+    pytest.param(1000, 1001, True, id='over'),
+])
+@pytest.mark.usefixtures('tracing')
+def test_report(budget: int, peak: int, over_budget: bool):
+    mut = sut.report
+
+    tracemalloc.start()
+
+    with mock.patch('functions.ayayot.memory.BUDGET', budget), \
+            mock.patch('functions.ayayot.memory.logger', autospec=True) as logger:
+        mut('fn', peak)
+
+    assert over_budget == (1 == metrics.snapshot().get('memory.over_budget.fn'))
+    assert over_budget == bool(logger.warning.call_args_list)
+    assert peak == metrics.snapshot()['memory.peak_bytes.fn']
+
+@pytest.mark.parametrize('budget,peaks,expected', [
+    pytest.param(0, [2000], 100, id='no-budget'),
+    pytest.param(1000, [1001], 50, id='over'),
+    pytest.param(1000, [1001, 1001, 1000], 25, id='within'),
+    pytest.param(1000, [1001, 1001, 499], 50, id='well-within'),
+    pytest.param(1000, [499], 100, id='not-shrunk'),
+    pytest.param(1000, [1001] * 10, 1, id='smallest'),
+])
+@pytest.mark.usefixtures('tracing')
+def test_report_chunk_size(budget: int, peaks: list[int], expected: int):
+    mut = sut.chunk_size
+
+    tracemalloc.start()
+
+    with mock.patch('functions.ayayot.memory.BUDGET', budget), \
+            mock.patch('functions.ayayot.memory.logger', autospec=True):
+        for peak in peaks:
+            sut.report('fn', peak)
+
+    assert expected == mut(100)
+    assert sut._divisor <= sut.MAX_DIVISOR
+
+    sut.reset()
+    assert 100 == mut(100)
@@ -0,0 +1,23 @@
+from functions.ayayot import metrics as sut
+
+def test_increment():
+    sut.increment('b')
+    sut.increment('a', 0.5)
+    sut.increment('b', 2)
+
+    assert {'a': 0.5, 'b': 3.0} == sut.snapshot()
+    assert ['a', 'b'] == list(sut.snapshot())
+
+def test_maximum():
+    sut.maximum('a', 2)
+    sut.maximum('a', 1)
+    sut.maximum('b', -1)
+
+    assert {'a': 2.0, 'b': -1.0} == sut.snapshot()
+
+def test_reset():
+    sut.increment('a')
+
+    sut.reset()
+
+    assert {} == sut.snapshot()
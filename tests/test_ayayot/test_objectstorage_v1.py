@@ -1,3 +1,4 @@
+import os
 from typing import Any, Callable
 from unittest import mock
 
@@ -11,13 +12,19 @@ from functions.ayayot import objectstorage_v1 as sut
 
 def create_context_mock() -> Any:
     context = mock.create_autospec(spec=FunctionContext, instance=True)
-    context.company = mock.create_autospec(spec=FunctionResource, instance=True)
+    context.api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    context.company = mock.create_autospec(spec=FunctionResource, instance=True, public_id='company01')
     context.asset = mock.create_autospec(spec=FunctionResource, instance=True)
     context.agent = mock.create_autospec(spec=FunctionResource, instance=True)
     context.template = mock.create_autospec(spec=FunctionResource, instance=True, public_id='test')
 
     return context
 
+SCOPE = sut.api.caller_scope('company01', mock.create_autospec(spec=ApiClient, instance=True))
+"""
+The scope of the lookups of the contexts created by create_context_mock
+"""
+
 @pytest.mark.parametrize('company_perms,res_perms,expected', [
     (set(), set(), False),
     ({'COMPANY_ADMIN'}, {'COMPANY_ADMIN'}, True),
@@ -251,8 +258,8 @@ def test__authorize_single_no_access(
     [
         (sut.authorize_upload, True, {"upload": True}),
         (sut.authorize_download, False, {}),
-        (sut.authorize_update, True, {}),
-        (sut.authorize_delete, True, {}),
+        (sut.authorize_update, True, {"freshness": sut.MUTATION_FRESHNESS}),
+        (sut.authorize_delete, True, {"freshness": sut.MUTATION_FRESHNESS}),
     ],
 )
 @mock.patch('functions.ayayot.objectstorage_v1._authorize_single', autospec=True)
@@ -293,9 +300,15 @@ def test_authorize_list_agent(
     ] == _request_for.call_args_list
 
     assert [
-        mock.call(context, [(mock.sentinel.target, sut.ResourceType.AGENT)])
+        mock.call(
+            context,
+            [(mock.sentinel.target, sut.ResourceType.AGENT)],
+            sut.cache.Freshness.STALE,
+            None,
+        )
     ] == _create_multi_response.call_args_list
 
+@mock.patch('functions.ayayot.objectstorage_v1._record_authorization', autospec=True)
 @mock.patch(
     "functions.ayayot.objectstorage_v1._add_asset_descendant_resources", autospec=True
 )
@@ -305,6 +318,7 @@ def test_authorize_list_asset_with_linked_agent(
     _request_for: mock.Mock,
     _create_multi_response: mock.Mock,
     _add_asset_descendant_resources: mock.Mock,
+    _record_authorization: mock.Mock,
 ):
     mut = sut.authorize_list
 
@@ -328,9 +342,14 @@ def test_authorize_list_asset_with_linked_agent(
                 (mock.sentinel.target, sut.ResourceType.ASSET),
                 (context.agent, sut.ResourceType.AGENT),
             ],
+            sut.cache.Freshness.STALE,
         ),
     ] == _add_asset_descendant_resources.call_args_list
 
+    assert [
+        mock.call(context, mock.sentinel.target)
+    ] == _record_authorization.call_args_list
+
     assert [
         mock.call(
             context,
@@ -338,9 +357,12 @@ def test_authorize_list_asset_with_linked_agent(
                 (mock.sentinel.target, sut.ResourceType.ASSET),
                 (context.agent, sut.ResourceType.AGENT),
             ],
+            sut.cache.Freshness.STALE,
+            None,
         )
     ] == _create_multi_response.call_args_list
 
+@mock.patch('functions.ayayot.objectstorage_v1._record_authorization', autospec=True)
 @mock.patch(
     "functions.ayayot.objectstorage_v1._add_asset_descendant_resources", autospec=True
 )
@@ -350,6 +372,7 @@ def test_authorize_list_asset_without_linked_agent(
     _request_for: mock.Mock,
     _create_multi_response: mock.Mock,
     _add_asset_descendant_resources: mock.Mock,
+    _record_authorization: mock.Mock,
 ):
     mut = sut.authorize_list
 
@@ -367,15 +390,25 @@ def test_authorize_list_asset_without_linked_agent(
     ] == _request_for.call_args_list
 
     assert [
-        mock.call(context, [(mock.sentinel.target, sut.ResourceType.ASSET)]),
+        mock.call(
+            context,
+            [(mock.sentinel.target, sut.ResourceType.ASSET)],
+            sut.cache.Freshness.STALE,
+        ),
     ] == _add_asset_descendant_resources.call_args_list
 
+    assert [
+        mock.call(context, mock.sentinel.target)
+    ] == _record_authorization.call_args_list
+
     assert [
         mock.call(
             context,
             [
                 (mock.sentinel.target, sut.ResourceType.ASSET),
             ],
+            sut.cache.Freshness.STALE,
+            None,
         )
     ] == _create_multi_response.call_args_list
 
@@ -404,7 +437,7 @@ def test_authorize_list_no_target(
 def test__add_asset_descendant_resources():
     mut = sut._add_asset_descendant_resources
 
-    context = mock.create_autospec(spec=FunctionContext, instance=True)
+    context = create_context_mock()
     context.api_client = mock.create_autospec(spec=ApiClient, instance=True)
 
     context.api_client.get.return_value = {
@@ -663,7 +696,7 @@ def test_authorize_list_asset_with_other_assets():
 def test__get_asset_app_config_object_mappings():
     mut = sut._get_asset_app_config_object_mappings
 
-    context = mock.create_autospec(spec=FunctionContext, instance=True)
+    context = create_context_mock()
     context.api_client = mock.create_autospec(spec=ApiClient, instance=True)
     context.template = mock.create_autospec(spec=FunctionResource, instance=True)
     context.template.public_id = "template01"
@@ -763,6 +796,7 @@ def test__parse_asset_meta_null_values():
     assert [] == output
 
 
+@mock.patch('functions.ayayot.objectstorage_v1._record_authorization', autospec=True)
 @mock.patch('functions.ayayot.objectstorage_v1._add_asset_descendant_resources', autospec=True)
 @mock.patch('functions.ayayot.objectstorage_v1._get_asset_app_config_object_mappings', autospec=True)
 @mock.patch('functions.ayayot.objectstorage_v1._create_single_response', autospec=True)
@@ -772,6 +806,7 @@ def test__authorize_single_with_direct_path(
         _create_single_response: mock.Mock,
         _get_asset_app_config_object_mappings: mock.Mock,
         _add_asset_descendant_resources: mock.Mock,
+        _record_authorization: mock.Mock,
     ):
     mut = sut._authorize_single
 
@@ -808,13 +843,18 @@ def test__authorize_single_with_direct_path(
     ] == _request_for.call_args_list
 
     assert [
-        mock.call(context, [(target, sut.ResourceType.ASSET)])
+        mock.call(context, [(target, sut.ResourceType.ASSET)], sut.cache.Freshness.CACHED)
     ] == _add_asset_descendant_resources.call_args_list
 
     assert [
-        mock.call(context, []),
+        mock.call(context, target)
+    ] == _record_authorization.call_args_list
+
+    assert [
+        mock.call(context, [], sut.cache.Freshness.CACHED),
     ] == _get_asset_app_config_object_mappings.call_args_list
 
+@mock.patch('functions.ayayot.objectstorage_v1._record_authorization', autospec=True)
 @mock.patch('functions.ayayot.objectstorage_v1._add_asset_descendant_resources', autospec=True)
 @mock.patch('functions.ayayot.objectstorage_v1._get_asset_app_config_object_mappings', autospec=True)
 @mock.patch('functions.ayayot.objectstorage_v1._create_single_response', autospec=True)
@@ -824,6 +864,7 @@ def test__authorize_single_without_direct_path(
         _create_single_response: mock.Mock,
         _get_asset_app_config_object_mappings: mock.Mock,
         _add_asset_descendant_resources: mock.Mock,
+        _record_authorization: mock.Mock,
     ):
     mut = sut._authorize_single
 
@@ -860,14 +901,200 @@ def test__authorize_single_without_direct_path(
     ] == _request_for.call_args_list
 
     assert [
-        mock.call(context, [(target, sut.ResourceType.ASSET)])
+        mock.call(context, [(target, sut.ResourceType.ASSET)], sut.cache.Freshness.CACHED)
     ] == _add_asset_descendant_resources.call_args_list
 
     assert [
-        mock.call(context, []),
+        mock.call(context, target)
+    ] == _record_authorization.call_args_list
+
+    assert [
+        mock.call(context, [], sut.cache.Freshness.CACHED),
     ] == _get_asset_app_config_object_mappings.call_args_list
 
 
+@pytest.mark.parametrize('freshness,cached,expected_path', [
+    pytest.param(sut.cache.Freshness.CACHED, True, 'assets/uuid123/', id='cached'),
+    pytest.param(sut.cache.Freshness.CACHED, False, 'assets/asset01/', id='not-cached'),
+    pytest.param(sut.cache.Freshness.FRESH, True, 'assets/asset01/', id='fresh'),
+])
+@mock.patch('functions.ayayot.objectstorage_v1._has_cached_object', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1._record_authorization', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1._add_asset_descendant_resources', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1._request_for', autospec=True)
+def test__authorize_single_circuit_open(
+        _request_for: mock.Mock,
+        _add_asset_descendant_resources: mock.Mock,
+        _record_authorization: mock.Mock,
+        _has_cached_object: mock.Mock,
+        freshness: sut.cache.Freshness,
+        cached: bool,
+        expected_path: str,
+    ):
+    mut = sut._authorize_single
+
+    target = FunctionResource(
+        public_id="asset01",
+        name="Asset",
+        custom_properties={},
+        permissions=set()
+    )
+    _request_for.return_value = (target, sut.ResourceType.ASSET)
+    _add_asset_descendant_resources.side_effect = sut.CircuitOpenError
+    _has_cached_object.return_value = cached
+
+    context = mock.create_autospec(spec=FunctionContext, instance=True)
+    context.company = mock.create_autospec(spec=FunctionResource, instance=True)
+
+    output = mut(context, "uuid123", check_has_manage=False, freshness=freshness)
+
+    assert {'data': {'path': expected_path}, 'result': 'success'} == output
+    assert {'degraded.authorize_single': 1.0} == sut.metrics.snapshot()
+
+    if freshness is sut.cache.Freshness.FRESH:
+        assert [] == _has_cached_object.call_args_list
+    else:
+        assert [mock.call(context, target, "uuid123")] == _has_cached_object.call_args_list
+
+def test__has_cached_object():
+    mut = sut._has_cached_object
+
+    context = create_context_mock()
+    context.template.public_id = "template01"
+    target = FunctionResource(
+        public_id="asset01",
+        name="Asset",
+        custom_properties={},
+        permissions=set()
+    )
+
+    assert False is mut(context, target, "uuid1")
+
+    sut.cache.DESCENDANTS.set((SCOPE, "asset01"), (("asset02", "Asset 2"),))
+    assert False is mut(context, target, "uuid1")
+
+    sut.cache.APP_CONFIG_OBJECTS.set(
+        (SCOPE, "template01", ("asset01", "asset02")),
+        sut.ObjectIndex.build((sut.ObjectMeta("uuid1"),)),
+    )
+    assert True is mut(context, target, "uuid1")
+    assert False is mut(context, target, "uuid2")
+
+    context.template = None
+    assert False is mut(context, target, "uuid1")
+
+@mock.patch('functions.ayayot.objectstorage_v1._record_authorization', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1._add_asset_descendant_resources', autospec=True)
+def test_authorize_list_circuit_open(
+        _add_asset_descendant_resources: mock.Mock,
+        _record_authorization: mock.Mock,
+    ):
+    mut = sut.authorize_list
+
+    _add_asset_descendant_resources.side_effect = sut.CircuitOpenError
+
+    context = create_context_mock()
+    context.asset.public_id = 'assetpubid01'
+    context.agent.public_id = 'agentpubid01'
+
+    output = mut(context, category='manuals')
+
+    assert {
+        "result": "success",
+        "data": [
+            {"publicId": "assetpubid01", "type": "Asset", "path": "assets/assetpubid01/"},
+            {"publicId": "agentpubid01", "type": "Agent", "path": "agents/agentpubid01/"},
+        ],
+        "partial": True,
+    } == output
+    assert {'degraded.authorize_list': 1.0} == sut.metrics.snapshot()
+
+@mock.patch('functions.ayayot.objectstorage_v1._record_authorization', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1._add_asset_descendant_resources', autospec=True)
+def test_authorize_list_deadline_exceeded(
+        _add_asset_descendant_resources: mock.Mock,
+        _record_authorization: mock.Mock,
+    ):
+    mut = sut.authorize_list
+
+    _add_asset_descendant_resources.side_effect = sut.deadline.DeadlineExceeded
+
+    context = create_context_mock()
+    context.asset.public_id = 'assetpubid01'
+    context.agent.public_id = 'agentpubid01'
+
+    output = mut(context)
+
+    assert {
+        "result": "success",
+        "data": [
+            {"publicId": "assetpubid01", "type": "Asset", "path": "assets/assetpubid01/"},
+            {"publicId": "agentpubid01", "type": "Agent", "path": "agents/agentpubid01/"},
+        ],
+        "partial": True,
+    } == output
+    assert {
+        'deadline.partial': 1.0,
+        'degraded.authorize_list': 1.0,
+    } == sut.metrics.snapshot()
+
+@mock.patch('functions.ayayot.deadline.remaining', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1._get_asset_app_config_object_mappings', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1._record_authorization', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1._add_asset_descendant_resources', autospec=True)
+def test_authorize_list_skips_optional_work(
+        _add_asset_descendant_resources: mock.Mock,
+        _record_authorization: mock.Mock,
+        _get_asset_app_config_object_mappings: mock.Mock,
+        remaining: mock.Mock,
+    ):
+    mut = sut.authorize_list
+
+    remaining.return_value = sut.deadline.OPTIONAL_BUDGET / 2
+
+    context = create_context_mock()
+    context.asset.public_id = 'assetpubid01'
+    context.agent.public_id = 'agentpubid01'
+
+    output = mut(context)
+
+    assert {
+        "result": "success",
+        "data": [
+            {"publicId": "assetpubid01", "type": "Asset", "path": "assets/assetpubid01/"},
+            {"publicId": "agentpubid01", "type": "Agent", "path": "agents/agentpubid01/"},
+        ],
+        "partial": True,
+    } == output
+
+    assert [] == _add_asset_descendant_resources.call_args_list
+    assert [] == _get_asset_app_config_object_mappings.call_args_list
+    assert {'deadline.partial': 1.0} == sut.metrics.snapshot()
+
+@mock.patch('functions.ayayot.deadline.remaining', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1._get_asset_app_config_objects', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1._record_authorization', autospec=True)
+def test_authorize_list_compact_skips_optional_work(
+        _record_authorization: mock.Mock,
+        _get_asset_app_config_objects: mock.Mock,
+        remaining: mock.Mock,
+    ):
+    mut = sut.authorize_list
+
+    remaining.return_value = sut.deadline.OPTIONAL_BUDGET / 2
+
+    context = create_context_mock()
+    context.asset.public_id = 'assetpubid01'
+    context.agent.public_id = 'agentpubid01'
+
+    output = mut(context, response_format='compact')
+
+    assert output is not None
+    assert True is output["partial"]
+    assert {"Asset": ["assetpubid01"], "Agent": ["agentpubid01"]} == output["data"]["resources"]
+    assert {} == output["data"]["objects"]
+    assert [] == _get_asset_app_config_objects.call_args_list
+
 @mock.patch('functions.ayayot.objectstorage_v1._create_single_response', autospec=True)
 @mock.patch('functions.ayayot.objectstorage_v1._has_access_to_files_of_resource', autospec=True)
 @mock.patch('functions.ayayot.objectstorage_v1._request_for', autospec=True)
@@ -936,3 +1163,1458 @@ def test_ObjectMeta_from_dict_none():
     out_put = mut(data)
 
     assert out_put is None
+
+@pytest.mark.parametrize('data', [
+    pytest.param(["id"], id='not-a-dict'),
+    pytest.param({"id": 1}, id='id-not-str'),
+    pytest.param({"id": ["id"]}, id='id-unhashable'),
+])
+def test_ObjectMeta_from_dict_invalid(data: Any):
+    mut = sut.ObjectMeta.from_dict
+
+    assert None is mut(data)
+
+@pytest.mark.parametrize('data,expected', [
+    pytest.param(
+        {"id": "id", "name": 1, "order": "1", "size": 1.5},
+        sut.ObjectMeta(id="id", order="1", size=1.5),  # type: ignore[arg-type]
+        id='mistyped',
+    ),
+    pytest.param(
+        {"id": "id", "order": [1], "type": ["manual"], "category": {"name": "manuals"}},
+        sut.ObjectMeta(id="id"),
+        id='unhashable',
+    ),
+])
+def test_ObjectMeta_from_dict_mistyped(data: dict, expected: sut.ObjectMeta):
+    mut = sut.ObjectMeta.from_dict
+
+    assert expected == mut(data)
+
+def test__add_asset_descendant_resources_cached():
+    mut = sut._add_asset_descendant_resources
+
+    context = create_context_mock()
+    context.api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    context.api_client.get.return_value = {
+        "data": [
+            {"publicId": "assetpubid02", "name": "Asset"},
+        ]
+    }
+
+    asset = FunctionResource(
+        public_id="assetpubid01",
+        name="Asset",
+        custom_properties={},
+        permissions=set(),
+    )
+
+    first = mut(context, [(asset, sut.ResourceType.ASSET)])
+    second = mut(context, [(asset, sut.ResourceType.ASSET)])
+
+    assert repr(first) == repr(second)
+
+    assert [
+        mock.call(
+            "AssetDescendantList",
+            {"publicId": "assetpubid01", "fields": "publicId,name"},
+        )
+    ] == context.api_client.get.call_args_list
+
+def test__add_asset_descendant_resources_error():
+    mut = sut._add_asset_descendant_resources
+
+    context = create_context_mock()
+    context.api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    context.api_client.get.return_value = {"status": "error", "data": []}
+
+    asset = FunctionResource(
+        public_id="assetpubid01",
+        name="Asset",
+        custom_properties={},
+        permissions=set(),
+    )
+
+    with pytest.raises(sut.api.ApiError):
+        mut(context, [(asset, sut.ResourceType.ASSET)])
+
+    assert None is sut.cache.DESCENDANTS.get((SCOPE, "assetpubid01"))
+
+def test__get_asset_app_config_object_mappings_cached():
+    mut = sut._get_asset_app_config_object_mappings
+
+    context = create_context_mock()
+    context.api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    context.template = mock.create_autospec(spec=FunctionResource, instance=True)
+    context.template.public_id = "template01"
+    context.api_client.get.return_value = {
+        "data": [
+            {
+                "values": '[{"id": "file1.txt"}]',
+                "stateValues": '',
+            }
+        ]
+    }
+
+    asset = FunctionResource(
+        public_id="asset01",
+        name="Asset",
+        custom_properties={},
+        permissions=set()
+    )
+
+    first = mut(context, [asset])
+    second = mut(context, [asset])
+
+    assert [
+        {
+            "publicId": None,
+            "type": "Asset",
+            "path": "assets/file1.txt"
+        },
+    ] == first == second
+
+    assert 1 == context.api_client.get.call_count
+
+def test_refresh_asset_tree_caches():
+    mut = sut.refresh_asset_tree_caches
+
+    api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    api_client.get.side_effect = [
+        {"data": [{"publicId": "asset02", "name": "Asset 2"}]},
+        {"data": [{"values": '[{"id": "file1.txt"}]', "stateValues": '[]'}]},
+    ]
+
+    sut.cache.DESCENDANTS.set((SCOPE, "asset01"), ())
+
+    mut(api_client, SCOPE, "asset01", "template01")
+
+    assert (("asset02", "Asset 2"),) == sut.cache.DESCENDANTS.get((SCOPE, "asset01"))
+    assert sut.ObjectIndex.build((sut.ObjectMeta("file1.txt"),)) == sut.cache.APP_CONFIG_OBJECTS.get(
+        (SCOPE, "template01", ("asset01", "asset02"))
+    )
+
+    assert [
+        mock.call(
+            "AssetDescendantList",
+            {"publicId": "asset01", "fields": "publicId,name"},
+        ),
+        mock.call(
+            "AssetAppConfigList",
+            query={
+                "filters": [
+                    'eq(app.publicId,"template01")',
+                    'in(asset.publicId,"asset01","asset02")',
+                ],
+                "fields": "values,stateValues",
+            },
+        ),
+    ] == api_client.get.call_args_list
+
+@mock.patch('functions.ayayot.objectstorage_v1.APP_CONFIG_CHUNK_SIZE', 2)
+def test__fetch_asset_app_config_objects_chunked():
+    mut = sut._fetch_asset_app_config_objects
+
+    api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    api_client.get.side_effect = [
+        {"data": [{"values": '[{"id": "uuid1"}]', "stateValues": '[]'}]},
+        {"data": [{"values": '[{"id": "uuid3"}]', "stateValues": None}]},
+    ]
+
+    output = mut(api_client, SCOPE, "template01", ("asset01", "asset02", "asset03"))
+
+    assert (sut.ObjectMeta("uuid1"), sut.ObjectMeta("uuid3")) == output.objects
+
+    assert [
+        mock.call(
+            "AssetAppConfigList",
+            query={
+                "filters": [
+                    'eq(app.publicId,"template01")',
+                    'in(asset.publicId,"asset01","asset02")',
+                ],
+                "fields": "values,stateValues",
+            },
+        ),
+        mock.call(
+            "AssetAppConfigList",
+            query={
+                "filters": [
+                    'eq(app.publicId,"template01")',
+                    'in(asset.publicId,"asset03")',
+                ],
+                "fields": "values,stateValues",
+            },
+        ),
+    ] == api_client.get.call_args_list
+
+@mock.patch('functions.ayayot.memory._divisor', 2)
+@mock.patch('functions.ayayot.objectstorage_v1.APP_CONFIG_CHUNK_SIZE', 4)
+def test__fetch_asset_app_config_objects_over_budget():
+    mut = sut._fetch_asset_app_config_objects
+
+    api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    api_client.get.return_value = {"data": []}
+
+    mut(api_client, SCOPE, "template01", ("asset01", "asset02", "asset03"))
+
+    # Shrunk, as calls exceeded the memory budget
+    assert [
+        'in(asset.publicId,"asset01","asset02")',
+        'in(asset.publicId,"asset03")',
+    ] == [call.kwargs["query"]["filters"][1] for call in api_client.get.call_args_list]
+
+@mock.patch('functions.ayayot.memory._over_budget', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1.APP_CONFIG_CHUNK_SIZE', 2)
+def test__fetch_asset_app_config_objects_rechunked(_over_budget: mock.Mock):
+    mut = sut._fetch_asset_app_config_objects
+
+    _over_budget.side_effect = [False, True]
+
+    api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    api_client.get.return_value = {"data": []}
+
+    mut(api_client, SCOPE, "template01", ("asset01", "asset02", "asset03", "asset04"))
+
+    # Shrunk for the rest of the call, as it exceeded the memory budget
+    assert [
+        'in(asset.publicId,"asset01","asset02")',
+        'in(asset.publicId,"asset03")',
+        'in(asset.publicId,"asset04")',
+    ] == [call.kwargs["query"]["filters"][1] for call in api_client.get.call_args_list]
+
+def test__fetch_asset_app_config_objects_update():
+    mut = sut._fetch_asset_app_config_objects
+
+    api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    api_client.get.return_value = {
+        "data": [{"values": '[{"id": "uuid2", "name": "Manual"}]', "stateValues": '[]'}],
+    }
+
+    previous = mock.create_autospec(spec=sut.ObjectIndex, instance=True)
+    sut.cache.APP_CONFIG_OBJECTS.set((SCOPE, "template01", ("asset01",)), previous)
+
+    output = mut(api_client, SCOPE, "template01", ("asset01",))
+
+    assert previous.update.return_value is output
+    assert [
+        mock.call((sut.ObjectMeta("uuid2", name="Manual"),))
+    ] == previous.update.call_args_list
+
+@mock.patch('functions.ayayot.objectstorage_v1.refresh_asset_tree_caches', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1.WARMER', autospec=True)
+def test__record_authorization(WARMER: mock.Mock, refresh_asset_tree_caches: mock.Mock):
+    mut = sut._record_authorization
+
+    context = create_context_mock()
+    context.api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    context.template.public_id = "template01"
+
+    target = mock.create_autospec(spec=FunctionResource, instance=True)
+    target.public_id = "asset01"
+
+    mut(context, target)
+
+    assert 1 == WARMER.record.call_count
+    scope, asset_id, template_id, refresh = WARMER.record.call_args.args
+    assert (SCOPE, "asset01", "template01") == (scope, asset_id, template_id)
+
+    refresh()
+
+    assert [
+        mock.call(context.api_client, SCOPE, "asset01", "template01")
+    ] == refresh_asset_tree_caches.call_args_list
+
+@mock.patch('functions.ayayot.objectstorage_v1.WARMER', autospec=True)
+def test__record_authorization_no_template(WARMER: mock.Mock):
+    mut = sut._record_authorization
+
+    context = create_context_mock()
+    context.template = None
+
+    mut(context, mock.sentinel.target)
+
+    assert [] == WARMER.record.call_args_list
+
+def test_lookups_scoped_to_caller():
+    def create_caller(authorization: str, descendants: list[dict], values: str) -> Any:
+        context = create_context_mock()
+        context.api_client._default_headers = {"Authorization": authorization}
+        context.template.public_id = "template01"
+        context.agent = None
+        context.asset = FunctionResource(
+            public_id="asset01",
+            name="Asset",
+            custom_properties={},
+            permissions=set(),
+        )
+        context.api_client.get.side_effect = [
+            {"data": descendants},
+            {"data": [{"values": values, "stateValues": None}]},
+        ]
+        return context
+
+    # Both callers hit the same asset, but only the first may see its descendant
+    admin = create_caller(
+        "Bearer admin",
+        [{"publicId": "asset02", "name": "Asset 2"}],
+        '[{"id": "uuid1"}, {"id": "uuid2"}]',
+    )
+    user = create_caller("Bearer user", [], '[{"id": "uuid1"}]')
+
+    admin_output = sut.authorize_list(admin)
+    user_output = sut.authorize_list(user)
+
+    assert admin_output is not None
+    assert [
+        "assets/asset01/", "assets/asset02/", "assets/uuid1", "assets/uuid2",
+    ] == [mapping["path"] for mapping in admin_output["data"]]
+    assert user_output is not None
+    assert [
+        "assets/asset01/", "assets/uuid1",
+    ] == [mapping["path"] for mapping in user_output["data"]]
+
+    # The cached lookups of the first caller do not authorize the other
+    assert {"result": "success", "data": {"path": "assets/uuid2/"}} == sut.authorize_download(
+        admin, "uuid2",
+    )
+    assert {"result": "success", "data": {"path": "assets/asset01/"}} == sut.authorize_download(
+        user, "uuid2",
+    )
+
+    assert 2 == admin.api_client.get.call_count
+    assert 2 == user.api_client.get.call_count
+
+@pytest.mark.integration_test
+@pytest.mark.parametrize('mut,expected', [
+    pytest.param(sut.authorize_download, 'assets/asset01/', id='download-cached'),
+    pytest.param(sut.authorize_delete, 'assets/uuid123/', id='delete-fresh'),
+])
+def test_authorize_mutation_freshness_integration(
+        mut: Callable[..., PathResponse],
+        expected: str,
+    ):
+    context = create_context_mock()
+    context.api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    context.template.public_id = "template01"
+    context.company.permissions = set()
+    context.asset = FunctionResource(
+        public_id="asset01",
+        name="Asset",
+        custom_properties={},
+        permissions={"MANAGE_AGENT"},
+    )
+    context.api_client.get.side_effect = [
+        {"data": []},
+        {"data": [{"values": '[{"id": "uuid123"}]', "stateValues": ''}]},
+    ]
+
+    sut.cache.DESCENDANTS.set((SCOPE, "asset01"), ())
+    sut.cache.APP_CONFIG_OBJECTS.set((SCOPE, "template01", ("asset01",)), sut.ObjectIndex.build(()))
+
+    output = mut(context, "uuid123")
+
+    assert {"result": "success", "data": {"path": expected}} == output
+
+@pytest.mark.parametrize('typ,evicted', [
+    pytest.param(sut.ResourceType.ASSET, 3, id='asset'),
+    pytest.param(sut.ResourceType.AGENT, 0, id='agent'),
+])
+@mock.patch('functions.ayayot.objectstorage_v1.cache.invalidate_asset', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1._has_access_to_files_of_resource', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1._request_for', autospec=True)
+def test_invalidate_documents(
+        _request_for: mock.Mock,
+        _has_access_to_files_of_resource: mock.Mock,
+        invalidate_asset: mock.Mock,
+        typ: sut.ResourceType,
+        evicted: int,
+    ):
+    mut = sut.invalidate_documents
+
+    target = mock.create_autospec(spec=FunctionResource, instance=True)
+    target.public_id = "asset01"
+    _request_for.return_value = (target, typ)
+    _has_access_to_files_of_resource.return_value = True
+    invalidate_asset.return_value = 3
+
+    context = create_context_mock()
+
+    output = mut(context)
+
+    assert {'result': 'success', 'data': {'evicted': evicted}} == output
+
+    assert [
+        mock.call(context.company, target)
+    ] == _has_access_to_files_of_resource.call_args_list
+
+    if typ == sut.ResourceType.ASSET:
+        assert [mock.call("asset01")] == invalidate_asset.call_args_list
+    else:
+        assert [] == invalidate_asset.call_args_list
+
+@mock.patch('functions.ayayot.objectstorage_v1.cache.invalidate_asset', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1._has_access_to_files_of_resource', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1._request_for', autospec=True)
+def test_invalidate_documents_no_access(
+        _request_for: mock.Mock,
+        _has_access_to_files_of_resource: mock.Mock,
+        invalidate_asset: mock.Mock,
+    ):
+    mut = sut.invalidate_documents
+
+    _request_for.return_value = (mock.sentinel.target, sut.ResourceType.ASSET)
+    _has_access_to_files_of_resource.return_value = False
+
+    context = create_context_mock()
+
+    assert None is mut(context)
+
+    assert [] == invalidate_asset.call_args_list
+
+@mock.patch('functions.ayayot.objectstorage_v1._request_for', autospec=True)
+def test_invalidate_documents_no_target(_request_for: mock.Mock):
+    mut = sut.invalidate_documents
+
+    _request_for.return_value = None
+
+    context = create_context_mock()
+
+    assert None is mut(context)
+
+@pytest.mark.integration_test
+def test_list_documents_integration():
+    mut = sut.list_documents
+
+    context = create_context_mock()
+    context.api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    context.template.public_id = "template01"
+    context.asset.public_id = "asset01"
+    context.agent = None
+    context.api_client.get.side_effect = [
+        {"data": [{"publicId": "asset02", "name": "Asset 2"}]},
+        {
+            "data": [
+                {
+                    "values": '[{"id": "uuid2", "name": "Manual 10", "size": 20}]',
+                    "stateValues": '[{"id": "uuid1", "name": "Manual 2", "category": "manuals"}]',
+                },
+                {
+                    "values": '[{"id": "uuid3", "name": "Zeta", "order": 1, "type": "pdf"}]',
+                    "stateValues": None,
+                },
+            ]
+        },
+    ]
+
+    output = mut(context)
+
+    assert {
+        "result": "success",
+        "data": {
+            "mappings": [
+                {"publicId": "asset01", "type": "Asset", "path": "assets/asset01/"},
+                {"publicId": "asset02", "type": "Asset", "path": "assets/asset02/"},
+                {"publicId": None, "type": "Asset", "path": "assets/uuid3"},
+                {"publicId": None, "type": "Asset", "path": "assets/uuid1"},
+                {"publicId": None, "type": "Asset", "path": "assets/uuid2"},
+            ],
+            "documents": [
+                {
+                    "id": "uuid3",
+                    "path": "assets/uuid3/",
+                    "name": "Zeta",
+                    "order": 1,
+                    "size": None,
+                    "type": "pdf",
+                    "category": None,
+                },
+                {
+                    "id": "uuid1",
+                    "path": "assets/uuid1/",
+                    "name": "Manual 2",
+                    "order": None,
+                    "size": None,
+                    "type": None,
+                    "category": "manuals",
+                },
+                {
+                    "id": "uuid2",
+                    "path": "assets/uuid2/",
+                    "name": "Manual 10",
+                    "order": None,
+                    "size": 20,
+                    "type": None,
+                    "category": None,
+                },
+            ],
+            "total": 3,
+            "version": mock.ANY,
+        },
+    } == output
+
+@pytest.mark.integration_test
+def test_list_filtered_integration():
+    context = create_context_mock()
+    context.api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    context.template.public_id = "template01"
+    context.asset.public_id = "asset01"
+    context.agent = None
+    context.api_client.get.side_effect = [
+        {"data": []},
+        {
+            "data": [
+                {
+                    "values": '[{"id": "uuid1", "category": "Manuals", "type": "pdf"}, '
+                              '{"id": "uuid2", "category": "drawings", "type": "pdf"}]',
+                    "stateValues": '[{"id": "uuid3", "category": "manuals", "type": "txt"}]',
+                },
+            ]
+        },
+    ]
+
+    output = sut.authorize_list(context, category="manuals")
+
+    assert {
+        "result": "success",
+        "data": [
+            {"publicId": None, "type": "Asset", "path": "assets/uuid1"},
+            {"publicId": None, "type": "Asset", "path": "assets/uuid3"},
+        ],
+    } == output
+
+    output = sut.list_documents(context, category="manuals", object_type="pdf")
+
+    assert {
+        "result": "success",
+        "data": {
+            "mappings": [
+                {"publicId": None, "type": "Asset", "path": "assets/uuid1"},
+            ],
+            "documents": [
+                {
+                    "id": "uuid1",
+                    "path": "assets/uuid1/",
+                    "name": None,
+                    "order": None,
+                    "size": None,
+                    "type": "pdf",
+                    "category": "Manuals",
+                },
+            ],
+            "total": 1,
+            "version": mock.ANY,
+        },
+    } == output
+
+    assert 2 == context.api_client.get.call_count
+
+@pytest.mark.parametrize('response_format,partial', [
+    ('compact', True),
+    ('compact+gzip', False),
+])
+@mock.patch('functions.ayayot.objectstorage_v1._get_asset_app_config_index', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1._list_resources', autospec=True)
+def test_authorize_list_compact(
+        _list_resources: mock.Mock,
+        _get_asset_app_config_index: mock.Mock,
+        response_format: str,
+        partial: bool,
+    ):
+    mut = sut.authorize_list
+
+    asset = FunctionResource(
+        public_id="asset01",
+        name="Asset",
+        custom_properties={},
+        permissions=set(),
+    )
+
+    def list_resources(_context: FunctionContext) -> list:
+        if partial:
+            sut.deadline.skip()
+        return [(asset, sut.ResourceType.ASSET)]
+
+    _list_resources.side_effect = list_resources
+    _get_asset_app_config_index.return_value = sut.ObjectIndex.build((
+        sut.ObjectMeta(id="uuid1"),
+    ))
+
+    context = create_context_mock()
+
+    output = mut(context, response_format=response_format)
+
+    assert output is not None
+    assert ("success", response_format, partial) == (
+        output["result"], output["format"], "partial" in output,
+    )
+    assert [
+        {"publicId": "asset01", "type": "Asset", "path": "assets/asset01/"},
+        {"publicId": None, "type": "Asset", "path": "assets/uuid1"},
+    ] == sut.compact.decode_mappings(sut.compact.unpack(output["data"], response_format))
+    assert 1 == sut.metrics.snapshot()[f"format.{response_format}"]
+
+@mock.patch('functions.ayayot.objectstorage_v1._list_resources', autospec=True)
+def test_authorize_list_compact_circuit_open(_list_resources: mock.Mock):
+    mut = sut.authorize_list
+
+    _list_resources.side_effect = sut.CircuitOpenError("AssetDescendantList")
+
+    context = create_context_mock()
+    context.asset.public_id = "asset01"
+    context.agent = None
+
+    output = mut(context, response_format="compact")
+
+    assert {
+        "result": "success",
+        "format": "compact",
+        "data": {
+            "prefixes": {"Asset": "assets/", "Agent": "agents/"},
+            "resources": {"Asset": ["asset01"]},
+            "objects": {},
+            "other": [],
+        },
+        "partial": True,
+    } == output
+
+@mock.patch('functions.ayayot.objectstorage_v1._get_asset_app_config_index', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1._list_resources', autospec=True)
+def test_search_documents_compact_partial(
+        _list_resources: mock.Mock,
+        _get_asset_app_config_index: mock.Mock,
+    ):
+    mut = sut.search_documents
+
+    def list_resources(_context: FunctionContext) -> list:
+        sut.deadline.skip()
+        return []
+
+    _list_resources.side_effect = list_resources
+    _get_asset_app_config_index.return_value = sut.ObjectIndex.build((
+        sut.ObjectMeta(id="uuid1", name="Manual"),
+    ))
+
+    context = create_context_mock()
+
+    output = mut(context, "manual", response_format="compact")
+
+    assert output is not None
+    assert True is output["partial"]
+    assert {"Asset": ["uuid1"]} == output["data"]["objects"]
+
+@pytest.mark.parametrize('response_format', [None, 'unknown'])
+@mock.patch('functions.ayayot.objectstorage_v1._get_asset_app_config_index', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1._list_resources', autospec=True)
+def test_search_documents_default_format(
+        _list_resources: mock.Mock,
+        _get_asset_app_config_index: mock.Mock,
+        response_format: str | None,
+    ):
+    mut = sut.search_documents
+
+    _list_resources.return_value = []
+    _get_asset_app_config_index.return_value = sut.ObjectIndex.build((
+        sut.ObjectMeta(id="uuid1", name="Manual"),
+    ))
+
+    context = create_context_mock()
+
+    output = mut(context, "manual", response_format=response_format)
+
+    assert {
+        "result": "success",
+        "data": [{"publicId": None, "type": "Asset", "path": "assets/uuid1"}],
+    } == output
+
+@mock.patch('functions.ayayot.objectstorage_v1._request_for', autospec=True)
+def test_list_documents_no_target(_request_for: mock.Mock):
+    mut = sut.list_documents
+
+    _request_for.return_value = None
+
+    context = create_context_mock()
+
+    assert None is mut(context)
+
+@mock.patch('functions.ayayot.objectstorage_v1._get_asset_app_config_index', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1._list_resources', autospec=True)
+def test_list_documents(
+        _list_resources: mock.Mock,
+        _get_asset_app_config_index: mock.Mock,
+    ):
+    mut = sut.list_documents
+
+    asset = FunctionResource(
+        public_id="asset01",
+        name="Asset",
+        custom_properties={},
+        permissions=set(),
+    )
+    agent = FunctionResource(
+        public_id="agent01",
+        name="Agent",
+        custom_properties={},
+        permissions=set(),
+    )
+    _list_resources.return_value = [
+        (asset, sut.ResourceType.ASSET),
+        (agent, sut.ResourceType.AGENT),
+    ]
+    _get_asset_app_config_index.return_value = sut.ObjectIndex.build((
+        sut.ObjectMeta(id="uuid2", name="B"),
+        sut.ObjectMeta(id="uuid1", name="A", size=10),
+    ))
+
+    context = create_context_mock()
+
+    output = mut(context)
+
+    assert {
+        "result": "success",
+        "data": {
+            "mappings": [
+                {"publicId": "asset01", "type": "Asset", "path": "assets/asset01/"},
+                {"publicId": "agent01", "type": "Agent", "path": "agents/agent01/"},
+                {"publicId": None, "type": "Asset", "path": "assets/uuid1"},
+                {"publicId": None, "type": "Asset", "path": "assets/uuid2"},
+            ],
+            "documents": [
+                {
+                    "id": "uuid1",
+                    "path": "assets/uuid1/",
+                    "name": "A",
+                    "order": None,
+                    "size": 10,
+                    "type": None,
+                    "category": None,
+                },
+                {
+                    "id": "uuid2",
+                    "path": "assets/uuid2/",
+                    "name": "B",
+                    "order": None,
+                    "size": None,
+                    "type": None,
+                    "category": None,
+                },
+            ],
+            "total": 2,
+            "version": mock.ANY,
+        },
+    } == output
+
+    assert [
+        mock.call(context, [asset], sut.cache.Freshness.STALE)
+    ] == _get_asset_app_config_index.call_args_list
+
+@mock.patch('functions.ayayot.objectstorage_v1._get_asset_app_config_index', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1._list_resources', autospec=True)
+def test_list_documents_version(
+        _list_resources: mock.Mock,
+        _get_asset_app_config_index: mock.Mock,
+    ):
+    mut = sut.list_documents
+
+    asset = FunctionResource(
+        public_id="asset01",
+        name="Asset",
+        custom_properties={},
+        permissions=set(),
+    )
+    _list_resources.return_value = [(asset, sut.ResourceType.ASSET)]
+    _get_asset_app_config_index.return_value = sut.ObjectIndex.build((
+        sut.ObjectMeta(id="uuid1", name="A"),
+        sut.ObjectMeta(id="uuid2", name="B"),
+    ))
+
+    context = create_context_mock()
+
+    output = mut(context, limit=1)
+
+    assert output is not None
+    version = output["data"]["version"]
+
+    assert {
+        "result": "success",
+        "data": {
+            "mappings": [],
+            "documents": [],
+            "total": 2,
+            "version": version,
+            "unchanged": True,
+        },
+    } == mut(context, limit=1, version=version)
+
+    # A renamed document changes the version
+    _get_asset_app_config_index.return_value = sut.ObjectIndex.build((
+        sut.ObjectMeta(id="uuid1", name="A"),
+        sut.ObjectMeta(id="uuid2", name="C"),
+    ))
+
+    output = mut(context, limit=1, version=version)
+
+    assert output is not None
+    assert "unchanged" not in output["data"]
+    assert ["uuid1"] == [document["id"] for document in output["data"]["documents"]]
+    assert version != output["data"]["version"]
+
+@pytest.mark.parametrize('offset,limit,expected', [
+    pytest.param(0, None, ["uuid1", "uuid2", "uuid3"], id='all'),
+    pytest.param(1, None, ["uuid2", "uuid3"], id='offset'),
+    pytest.param(0, 2, ["uuid1", "uuid2"], id='limit'),
+    pytest.param(2, 2, ["uuid3"], id='last-page'),
+    pytest.param(3, 2, [], id='past-end'),
+    pytest.param(-1, -1, [], id='negative'),
+])
+@mock.patch('functions.ayayot.objectstorage_v1._get_asset_app_config_index', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1._list_resources', autospec=True)
+def test_list_documents_page(
+        _list_resources: mock.Mock,
+        _get_asset_app_config_index: mock.Mock,
+        offset: int,
+        limit: int | None,
+        expected: list[str],
+    ):
+    mut = sut.list_documents
+
+    agent = FunctionResource(
+        public_id="agent01",
+        name="Agent",
+        custom_properties={},
+        permissions=set(),
+    )
+    _list_resources.return_value = [(agent, sut.ResourceType.AGENT)]
+    _get_asset_app_config_index.return_value = sut.ObjectIndex.build((
+        sut.ObjectMeta(id="uuid3", name="C"),
+        sut.ObjectMeta(id="uuid2", name="B"),
+        sut.ObjectMeta(id="uuid1", name="A"),
+    ))
+
+    context = create_context_mock()
+
+    output = mut(context, category="", offset=offset, limit=limit)
+
+    assert output is not None
+    assert expected == [document["id"] for document in output["data"]["documents"]]
+    assert 3 == output["data"]["total"]
+
+@mock.patch('functions.ayayot.objectstorage_v1._request_for', autospec=True)
+def test_search_documents_no_target(_request_for: mock.Mock):
+    mut = sut.search_documents
+
+    _request_for.return_value = None
+
+    context = create_context_mock()
+
+    assert None is mut(context, "manual")
+
+@mock.patch('functions.ayayot.objectstorage_v1._get_asset_app_config_index', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1._list_resources', autospec=True)
+def test_search_documents(
+        _list_resources: mock.Mock,
+        _get_asset_app_config_index: mock.Mock,
+    ):
+    mut = sut.search_documents
+
+    asset = FunctionResource(
+        public_id="asset01",
+        name="Asset",
+        custom_properties={},
+        permissions=set(),
+    )
+    _list_resources.return_value = [
+        (asset, sut.ResourceType.ASSET),
+        (mock.sentinel.agent, sut.ResourceType.AGENT),
+    ]
+    _get_asset_app_config_index.return_value = sut.ObjectIndex.build((
+        sut.ObjectMeta(id="uuid1", name="Wiring diagram"),
+        sut.ObjectMeta(id="uuid2", name="Installation manual"),
+    ))
+
+    context = create_context_mock()
+
+    output = mut(context, "manual")
+
+    assert {
+        "result": "success",
+        "data": [
+            {"publicId": None, "type": "Asset", "path": "assets/uuid2"},
+        ],
+    } == output
+
+    assert [
+        mock.call(context, [asset], sut.cache.Freshness.STALE)
+    ] == _get_asset_app_config_index.call_args_list
+
+@pytest.mark.parametrize('function', [sut.list_documents, sut.search_documents])
+@mock.patch('functions.ayayot.objectstorage_v1._get_asset_app_config_index', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1._list_resources', autospec=True)
+def test_documents_partial(
+        _list_resources: mock.Mock,
+        _get_asset_app_config_index: mock.Mock,
+        function: Any,
+    ):
+    mut = function
+
+    def list_resources(_context: FunctionContext) -> list:
+        # The descendants are skipped, as too little time is left
+        sut.deadline.skip()
+        return []
+
+    _list_resources.side_effect = list_resources
+    _get_asset_app_config_index.return_value = sut.ObjectIndex.build(())
+
+    context = create_context_mock()
+
+    output = mut(context)
+
+    assert True is output["partial"]
+
+DEGRADING_EXCEPTIONS = [
+    pytest.param(sut.CircuitOpenError("AssetDescendantList"), {}, id='circuit-open'),
+    pytest.param(sut.deadline.DeadlineExceeded(), {'deadline.partial': 1.0}, id='deadline-exceeded'),
+]
+"""
+The exceptions on which the listing functions degrade, with the metrics
+they count besides the degraded response
+"""
+
+@pytest.mark.parametrize('exception,metrics', DEGRADING_EXCEPTIONS)
+@pytest.mark.parametrize('cached', [
+    pytest.param(True, id='cached'),
+    pytest.param(False, id='not-cached'),
+])
+@mock.patch('functions.ayayot.objectstorage_v1._list_resources', autospec=True)
+def test_list_documents_degraded(
+        _list_resources: mock.Mock,
+        cached: bool,
+        exception: Exception,
+        metrics: dict[str, float],
+    ):
+    mut = sut.list_documents
+
+    _list_resources.side_effect = exception
+
+    if cached:
+        sut.cache.DESCENDANTS.set((SCOPE, "asset01"), (("asset02", "Asset 2"),))
+        sut.cache.APP_CONFIG_OBJECTS.set(
+            (SCOPE, "test", ("asset01", "asset02")),
+            sut.ObjectIndex.build((sut.ObjectMeta(id="uuid1", name="A"),)),
+        )
+
+    context = create_context_mock()
+    context.asset.public_id = "asset01"
+    context.agent = None
+
+    output = mut(context)
+
+    assert {
+        "result": "success",
+        "data": {
+            "mappings": [
+                {"publicId": "asset01", "type": "Asset", "path": "assets/asset01/"},
+                *([{"publicId": None, "type": "Asset", "path": "assets/uuid1"}] if cached else []),
+            ],
+            "documents": [
+                {
+                    "id": "uuid1",
+                    "path": "assets/uuid1/",
+                    "name": "A",
+                    "order": None,
+                    "size": None,
+                    "type": None,
+                    "category": None,
+                },
+            ] if cached else [],
+            "total": 1 if cached else 0,
+            "version": mock.ANY,
+        },
+        "partial": True,
+    } == output
+    assert {'degraded.list_documents': 1.0, **metrics} == sut.metrics.snapshot()
+
+@pytest.mark.parametrize('exception,metrics', DEGRADING_EXCEPTIONS)
+@pytest.mark.parametrize('typ,expected', [
+    pytest.param(
+        sut.ResourceType.ASSET,
+        [{"publicId": None, "type": "Asset", "path": "assets/uuid2"}],
+        id='asset',
+    ),
+    pytest.param(sut.ResourceType.AGENT, [], id='agent'),
+    pytest.param(None, [], id='no-target'),
+])
+@mock.patch('functions.ayayot.objectstorage_v1._request_for', autospec=True)
+@mock.patch('functions.ayayot.objectstorage_v1._list_resources', autospec=True)
+def test_search_documents_degraded(
+        _list_resources: mock.Mock,
+        _request_for: mock.Mock,
+        typ: sut.ResourceType | None,
+        expected: list[dict[str, Any]],
+        exception: Exception,
+        metrics: dict[str, float],
+    ):
+    mut = sut.search_documents
+
+    target = FunctionResource(
+        public_id="asset01",
+        name="Target",
+        custom_properties={},
+        permissions=set(),
+    )
+    _request_for.return_value = None if typ is None else (target, typ)
+    _list_resources.side_effect = exception
+
+    sut.cache.DESCENDANTS.set((SCOPE, "asset01"), ())
+    sut.cache.APP_CONFIG_OBJECTS.set(
+        (SCOPE, "test", ("asset01",)),
+        sut.ObjectIndex.build((
+            sut.ObjectMeta(id="uuid1", name="Wiring diagram"),
+            sut.ObjectMeta(id="uuid2", name="Installation manual"),
+        )),
+    )
+
+    context = create_context_mock()
+
+    output = mut(context, "manual")
+
+    assert {"result": "success", "data": expected, "partial": True} == output
+    assert {'degraded.search_documents': 1.0, **metrics} == sut.metrics.snapshot()
+
+@pytest.mark.integration_test
+def test_search_documents_integration():
+    mut = sut.search_documents
+
+    context = create_context_mock()
+    context.api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    context.template.public_id = "template01"
+    context.asset.public_id = "asset01"
+    context.agent = None
+    context.api_client.get.side_effect = [
+        {"data": [{"publicId": "asset02", "name": "Asset 2"}]},
+        {
+            "data": [
+                {
+                    "values": '[{"id": "uuid1", "name": "Wiring diagram"}]',
+                    "stateValues": '[{"id": "uuid2", "name": "Wiring manual"}]',
+                },
+            ]
+        },
+    ]
+
+    assert {
+        "result": "success",
+        "data": [
+            {"publicId": None, "type": "Asset", "path": "assets/uuid1"},
+            {"publicId": None, "type": "Asset", "path": "assets/uuid2"},
+        ],
+    } == mut(context, "wir")
+
+    assert {
+        "result": "success",
+        "data": [
+            {"publicId": None, "type": "Asset", "path": "assets/uuid2"},
+        ],
+    } == mut(context, "wiring man")
+
+def test__fetch_app_config_objects_by_asset():
+    mut = sut._fetch_app_config_objects_by_asset
+
+    api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    api_client.get.side_effect = [
+        {"data": [
+            {"asset": {"publicId": "asset01"}, "values": '[{"id": "uuid1"}]', "stateValues": None},
+            {"asset": {"publicId": "asset02"}, "values": '[{"id": "uuid2"}]', "stateValues": '[]'},
+        ]},
+        {"data": [
+            {"asset": {"publicId": "asset03"}, "values": None, "stateValues": '[{"id": "uuid3"}]'},
+        ]},
+    ]
+
+    with mock.patch.object(sut, 'APP_CONFIG_CHUNK_SIZE', 2):
+        output = mut(api_client, "template01", ("asset01", "asset02", "asset03"))
+
+    assert {
+        "asset01": [sut.ObjectMeta("uuid1")],
+        "asset02": [sut.ObjectMeta("uuid2")],
+        "asset03": [sut.ObjectMeta("uuid3")],
+    } == output
+
+    assert [
+        mock.call(
+            "AssetAppConfigList",
+            query={
+                "filters": [
+                    'eq(app.publicId,"template01")',
+                    'in(asset.publicId,"asset01","asset02")',
+                ],
+                "fields": "asset.publicId,values,stateValues",
+            },
+        ),
+        mock.call(
+            "AssetAppConfigList",
+            query={
+                "filters": [
+                    'eq(app.publicId,"template01")',
+                    'in(asset.publicId,"asset03")',
+                ],
+                "fields": "asset.publicId,values,stateValues",
+            },
+        ),
+    ] == api_client.get.call_args_list
+
+def test__fetch_accessible_assets():
+    mut = sut._fetch_accessible_assets
+
+    api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    api_client.get.return_value = {"data": [{"publicId": "asset01", "name": "Asset 1"}]}
+
+    output = mut(api_client, ["asset01", "asset02"])
+
+    assert {"asset01": "Asset 1"} == output
+
+    assert [
+        mock.call(
+            "AssetList",
+            query={
+                "filters": ['in(publicId,"asset01","asset02")'],
+                "fields": "publicId,name",
+            },
+        ),
+    ] == api_client.get.call_args_list
+
+def test__get_batch_app_config_indexes_no_template():
+    mut = sut._get_batch_app_config_indexes
+
+    context = create_context_mock()
+    context.template = None
+
+    output = mut(context, {"asset01": ("asset01",)})
+
+    assert ["asset01"] == list(output)
+    assert () == output["asset01"].objects
+
+@mock.patch('functions.ayayot.objectstorage_v1._fetch_app_config_objects_by_asset', autospec=True)
+def test__get_batch_app_config_indexes_cached(_fetch_app_config_objects_by_asset: mock.Mock):
+    mut = sut._get_batch_app_config_indexes
+
+    context = create_context_mock()
+    context.template.public_id = "template01"
+
+    index = sut.ObjectIndex.build((sut.ObjectMeta("uuid1"),))
+    sut.cache.APP_CONFIG_OBJECTS.set((SCOPE, "template01", ("asset01", "asset02")), index)
+
+    output = mut(context, {"asset01": ("asset01", "asset02")})
+
+    assert {"asset01": index} == output
+    assert [] == _fetch_app_config_objects_by_asset.call_args_list
+
+@mock.patch('functions.ayayot.objectstorage_v1._fetch_app_config_objects_by_asset', autospec=True)
+def test__get_batch_app_config_indexes(_fetch_app_config_objects_by_asset: mock.Mock):
+    mut = sut._get_batch_app_config_indexes
+
+    context = create_context_mock()
+    context.api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    context.template.public_id = "template01"
+
+    cached = sut.ObjectIndex.build((sut.ObjectMeta("uuid1"),))
+    sut.cache.APP_CONFIG_OBJECTS.set((SCOPE, "template01", ("asset01",)), cached)
+
+    _fetch_app_config_objects_by_asset.return_value = {
+        "asset02": [sut.ObjectMeta("uuid2")],
+        "asset03": [sut.ObjectMeta("uuid3")],
+    }
+
+    output = mut(context, {
+        "asset01": ("asset01",),
+        "asset02": ("asset02", "asset03"),
+        "asset03": ("asset03",),
+        "asset04": ("asset04",),
+    })
+
+    assert cached is output["asset01"]
+    assert (sut.ObjectMeta("uuid2"), sut.ObjectMeta("uuid3")) == output["asset02"].objects
+    assert (sut.ObjectMeta("uuid3"),) == output["asset03"].objects
+    assert () == output["asset04"].objects
+
+    assert output["asset02"] is sut.cache.APP_CONFIG_OBJECTS.get(
+        (SCOPE, "template01", ("asset02", "asset03")),
+    )
+
+    assert [
+        mock.call(context.api_client, "template01", ("asset02", "asset03", "asset04"))
+    ] == _fetch_app_config_objects_by_asset.call_args_list
+
+@pytest.mark.parametrize('company,asset_ids', [
+    pytest.param(None, ["asset01"], id='no-company'),
+    pytest.param(mock.sentinel.company, ["", ""], id='no-assets'),
+    pytest.param(mock.sentinel.company, ["asset01", "asset02", "asset03"], id='too-many-assets'),
+])
+@mock.patch('functions.ayayot.objectstorage_v1._fetch_accessible_assets', autospec=True)
+def test_authorize_list_batch_rejected(
+        _fetch_accessible_assets: mock.Mock,
+        company: Any,
+        asset_ids: list[str],
+    ):
+    mut = sut.authorize_list_batch
+
+    context = create_context_mock()
+    context.company = company
+
+    with mock.patch.object(sut, 'BATCH_MAX_ASSETS', 2):
+        assert None is mut(context, asset_ids)
+
+    assert [] == _fetch_accessible_assets.call_args_list
+
+@pytest.mark.parametrize('category,expected_asset01', [
+    pytest.param(
+        None,
+        [
+            {"publicId": "asset01", "type": "Asset", "path": "assets/asset01/"},
+            {"publicId": "asset03", "type": "Asset", "path": "assets/asset03/"},
+            {"publicId": None, "type": "Asset", "path": "assets/uuid1"},
+            {"publicId": None, "type": "Asset", "path": "assets/uuid3"},
+        ],
+        id='all',
+    ),
+    pytest.param(
+        "manuals",
+        [
+            {"publicId": None, "type": "Asset", "path": "assets/uuid3"},
+        ],
+        id='category',
+    ),
+])
+@mock.patch('functions.ayayot.objectstorage_v1._record_authorization', autospec=True)
+def test_authorize_list_batch(
+        _record_authorization: mock.Mock,
+        category: str | None,
+        expected_asset01: list[dict[str, Any]],
+    ):
+    mut = sut.authorize_list_batch
+
+    context = create_context_mock()
+    context.api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    context.template.public_id = "template01"
+    context.api_client.get.side_effect = [
+        {"data": [
+            {"publicId": "asset01", "name": "Asset 1"},
+            {"publicId": "asset03", "name": "Asset 3"},
+        ]},
+        {"data": [{"publicId": "asset03", "name": "Asset 3"}]},
+        {"data": []},
+        {"data": [
+            {"asset": {"publicId": "asset01"}, "values": '[{"id": "uuid1"}]', "stateValues": None},
+            {
+                "asset": {"publicId": "asset03"},
+                "values": '[{"id": "uuid3", "category": "Manuals"}]',
+                "stateValues": None,
+            },
+        ]},
+    ]
+
+    output = mut(context, ["asset01", "asset02", "asset01", "asset03"], category=category)
+
+    assert {
+        "result": "success",
+        "data": {
+            "asset01": expected_asset01,
+            "asset02": None,
+            "asset03": [
+                *([] if category else [
+                    {"publicId": "asset03", "type": "Asset", "path": "assets/asset03/"},
+                ]),
+                {"publicId": None, "type": "Asset", "path": "assets/uuid3"},
+            ],
+        },
+    } == output
+
+    assert [
+        "asset01", "asset03"
+    ] == [call.args[1].public_id for call in _record_authorization.call_args_list]
+
+    assert 4 == context.api_client.get.call_count
+
+@mock.patch('functions.ayayot.objectstorage_v1._record_authorization', autospec=True)
+def test_authorize_list_batch_compact(_record_authorization: mock.Mock):
+    mut = sut.authorize_list_batch
+
+    context = create_context_mock()
+    context.api_client = mock.create_autospec(spec=ApiClient, instance=True)
+    context.template.public_id = "template01"
+    context.api_client.get.side_effect = [
+        {"data": [{"publicId": "asset01", "name": "Asset 1"}]},
+        {"data": []},
+        {"data": [
+            {"asset": {"publicId": "asset01"}, "values": '[{"id": "uuid1"}]', "stateValues": None},
+        ]},
+    ]
+
+    output = mut(context, ["asset01", "asset02"], response_format="compact+gzip")
+
+    assert output is not None
+    assert "compact+gzip" == output["format"]
+    assert {
+        "asset01": {
+            "prefixes": {"Asset": "assets/", "Agent": "agents/"},
+            "resources": {"Asset": ["asset01"]},
+            "objects": {"Asset": ["uuid1"]},
+            "other": [],
+        },
+        "asset02": None,
+    } == sut.compact.unpack(output["data"], output["format"])
+    assert 1 == sut.metrics.snapshot()["format.compact+gzip"]
+
+@pytest.mark.parametrize('exception,metrics', DEGRADING_EXCEPTIONS)
+@pytest.mark.parametrize('failing,expected', [
+    pytest.param(
+        '_fetch_accessible_assets',
+        {
+            "asset01": {"error": "Access check skipped, the IXON API is failing or too slow"},
+            "asset02": {"error": "Access check skipped, the IXON API is failing or too slow"},
+        },
+        id='assets',
+    ),
+    pytest.param(
+        '_add_asset_descendant_resources',
+        {
+            "asset01": [
+                {"publicId": "asset01", "type": "Asset", "path": "assets/asset01/"},
+                {"publicId": None, "type": "Asset", "path": "assets/uuid1"},
+            ],
+            "asset02": None,
+        },
+        id='descendants',
+    ),
+])
+@mock.patch('functions.ayayot.objectstorage_v1._record_authorization', autospec=True)
+def test_authorize_list_batch_degraded(
+        _record_authorization: mock.Mock,
+        failing: str,
+        expected: dict[str, Any],
+        exception: Exception,
+        metrics: dict[str, float],
+    ):
+    mut = sut.authorize_list_batch
+
+    sut.cache.DESCENDANTS.set((SCOPE, "asset01"), ())
+    sut.cache.APP_CONFIG_OBJECTS.set(
+        (SCOPE, "test", ("asset01",)),
+        sut.ObjectIndex.build((sut.ObjectMeta(id="uuid1"),)),
+    )
+
+    context = create_context_mock()
+    context.api_client.get.return_value = {"data": [{"publicId": "asset01", "name": "Asset 1"}]}
+
+    with mock.patch.object(sut, failing, autospec=True, side_effect=exception):
+        output = mut(context, ["asset01", "asset02"])
+
+    assert {"result": "success", "data": expected, "partial": True} == output
+    assert {'degraded.authorize_list_batch': 1.0, **metrics} == {
+        name: value for name, value in sut.metrics.snapshot().items()
+        if name.startswith(('degraded.', 'deadline.'))
+    }
+
+@pytest.mark.parametrize('response_format', [
+    pytest.param(None, id='default'),
+    pytest.param('compact+gzip', id='compact-gzip'),
+])
+@mock.patch('functions.ayayot.objectstorage_v1._record_authorization', autospec=True)
+def test_authorize_list_batch_error(_record_authorization: mock.Mock, response_format: str | None):
+    mut = sut.authorize_list_batch
+
+    context = create_context_mock()
+    context.api_client.get.return_value = {
+        "status": "error",
+        "data": [{"message": "Internal server error"}],
+    }
+
+    output = mut(context, ["asset01", "asset02"], response_format=response_format)
+
+    assert output is not None
+    assert {
+        "asset01": {"error": "Access check failed: Internal server error"},
+        "asset02": {"error": "Access check failed: Internal server error"},
+    } == sut.compact.unpack(output["data"], response_format or '')
+    assert True is output.get("partial")
+    assert [] == _record_authorization.call_args_list
+    assert {'degraded.authorize_list_batch': 1.0} == {
+        name: value for name, value in sut.metrics.snapshot().items()
+        if name.startswith('degraded.')
+    }
+
+@mock.patch('functions.ayayot.objectstorage_v1._record_authorization', autospec=True)
+def test_authorize_list_batch_descendants_error(_record_authorization: mock.Mock):
+    mut = sut.authorize_list_batch
+
+    context = create_context_mock()
+    context.api_client.get.side_effect = [
+        {"status": "success", "data": [{"publicId": "asset01", "name": "Asset 1"}]},
+        {"status": "error", "data": [{"message": "Internal server error"}]},
+    ]
+
+    output = mut(context, ["asset01", "asset02"])
+
+    assert {
+        "result": "success",
+        "data": {
+            "asset01": [{"publicId": "asset01", "type": "Asset", "path": "assets/asset01/"}],
+            "asset02": None,
+        },
+        "partial": True,
+    } == output
+    assert None is sut.cache.DESCENDANTS.get((SCOPE, "asset01"))
+
+@pytest.mark.parametrize('permissions,reset,expected', [
+    pytest.param(
+        {'COMPANY_ADMIN'},
+        False,
+        {'result': 'success', 'data': {'samples': 2, 'stacks': 'a;b 2\n'}},
+        id='admin',
+    ),
+    pytest.param(
+        {'COMPANY_ADMIN'},
+        True,
+        {'result': 'success', 'data': {'samples': 2, 'stacks': 'a;b 2\n'}},
+        id='reset',
+    ),
+    pytest.param(set(), False, None, id='no-admin'),
+    pytest.param(None, False, None, id='no-permissions'),
+])
+def test_get_profile(permissions: set[str] | None, reset: bool, expected: Any):
+    mut = sut.get_profile
+
+    sut.profiling.SAMPLER._stacks['a;b'] = 2
+
+    context = create_context_mock()
+    context.company.permissions = permissions
+
+    assert expected == mut(context, reset=reset)
+    assert (0 if reset else 2) == sut.profiling.SAMPLER.samples()
+
+def test_get_profile_no_company():
+    mut = sut.get_profile
+
+    context = create_context_mock()
+    context.company = None
+
+    assert None is mut(context)
+
+@pytest.mark.parametrize('permissions,expected', [
+    pytest.param({'COMPANY_ADMIN'}, True, id='admin'),
+    pytest.param(set(), False, id='no-admin'),
+])
+def test_get_metrics(permissions: set[str], expected: bool):
+    mut = sut.get_metrics
+
+    sut.metrics.increment('api.calls.AssetList')
+
+    context = create_context_mock()
+    context.company.permissions = permissions
+
+    output = mut(context)
+
+    assert ({
+        'result': 'success',
+        'data': {'worker': os.getpid(), 'counters': {'api.calls.AssetList': 1.0}},
+    } if expected else None) == output
@@ -0,0 +1,229 @@
+"""
+Performance regression tests, which bound the amount of IXON API calls of
+the exposed functions by the size of the asset tree, and the time it takes
+to parse and list the documents of a large asset tree
+"""
+from collections import Counter
+import json
+import math
+import re
+import time
+from typing import Any, Callable
+from unittest import mock
+
+import pytest
+
+from ixoncdkingress.function.context import FunctionContext, FunctionResource
+
+from functions.ayayot import objectstorage_v1 as sut
+
+TREE_SIZES = [0, 1, 99, 100, 101, 1000]
+
+PARSE_BUDGET = 1.0
+"""
+Seconds it may take to parse the app config of an asset with 20,000 objects
+"""
+LIST_BUDGET = 3.0
+"""
+Seconds it may take to fetch and list the paths of a tree of 1,000 assets
+with 20,000 objects
+"""
+CACHED_LIST_BUDGET = 0.5
+"""
+Seconds it may take to list the paths of that tree from the cache
+"""
+
+_ASSET_IDS = re.compile(r'"([^"]+)"')
+
+def create_objects(asset_id: str, count: int) -> str:
+    return json.dumps([
+        {
+            'id': f'{asset_id}-{index}',
+            'name': f'Manual {index}.pdf',
+            'order': index % 10,
+            'size': index,
+            'type': 'application/pdf',
+            'category': 'manuals',
+        }
+        for index in range(count)
+    ])
+
+class CountingApiClient:
+    """
+    Fake API client for a tree of assets below assetpubid01, which counts
+    the calls per endpoint
+    """
+
+    calls: Counter[str]
+
+    def __init__(self, tree_size: int, objects_per_asset: int = 1) -> None:
+        self.tree_size = tree_size
+        self.objects_per_asset = objects_per_asset
+        self.calls = Counter()
+
+    def get(
+            self,
+            url_name: str,
+            url_args: dict[str, str] | None = None,
+            query: dict[str, Any] | None = None,
+            timeout: float | None = None,
+        ) -> dict[str, Any]:
+        assert timeout is None or timeout > 0
+        self.calls[url_name] += 1
+
+        if url_name == 'AssetDescendantList':
+            assert url_args
+            return {'status': 'success', 'data': [
+                {'publicId': f'{url_args["publicId"]}-{index}', 'name': f'Asset {index}'}
+                for index in range(self.tree_size)
+            ]}
+
+        if url_name == 'AssetAppConfigList':
+            assert query
+            asset_ids = _ASSET_IDS.findall(query['filters'][1])
+            return {'status': 'success', 'data': [
+                {
+                    'asset': {'publicId': asset_id},
+                    'values': create_objects(asset_id, self.objects_per_asset),
+                    'stateValues': None,
+                }
+                for asset_id in asset_ids
+            ]}
+
+        if url_name == 'AssetList':
+            assert query
+            return {'status': 'success', 'data': [
+                {'publicId': asset_id, 'name': asset_id}
+                for asset_id in _ASSET_IDS.findall(query['filters'][0])
+            ]}
+
+        raise AssertionError(f'Unexpected call to {url_name}')
+
+def create_context(api_client: CountingApiClient) -> Any:
+    context = mock.create_autospec(spec=FunctionContext, instance=True)
+    context.api_client = api_client
+    context.company = FunctionResource(
+        public_id='companypubid01',
+        name='Company',
+        custom_properties={},
+        permissions={'COMPANY_ADMIN'},
+    )
+    context.asset = FunctionResource(
+        public_id='assetpubid01',
+        name='Asset',
+        custom_properties={},
+        permissions=set(),
+    )
+    context.agent = None
+    context.template = mock.create_autospec(spec=FunctionResource, instance=True, public_id='test')
+
+    return context
+
+def max_calls(tree_size: int) -> int:
+    """
+    The calls it may take to look up a tree: its descendants, and the app
+    configs of the tree in chunks
+    """
+    return 1 + math.ceil((tree_size + 1) / sut.APP_CONFIG_CHUNK_SIZE)
+
+def best_time(function: Callable[[], Any], runs: int = 3) -> float:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+@pytest.mark.parametrize('tree_size', TREE_SIZES)
+@pytest.mark.parametrize('mut,args', [
+    pytest.param(sut.authorize_list, (), id='authorize_list'),
+    pytest.param(sut.list_documents, (), id='list_documents'),
+    pytest.param(sut.search_documents, ('manual',), id='search_documents'),
+    pytest.param(sut.authorize_download, ('assetpubid01-0',), id='authorize_download'),
+])
+def test_api_calls_cached(mut: Callable[..., Any], args: tuple[Any, ...], tree_size: int):
+    api_client = CountingApiClient(tree_size)
+    context = create_context(api_client)
+
+    mut(context, *args)
+
+    assert max_calls(tree_size) >= sum(api_client.calls.values())
+
+    api_client.calls.clear()
+    mut(context, *args)
+
+    assert 0 == sum(api_client.calls.values())
+
+@pytest.mark.parametrize('tree_size', TREE_SIZES)
+@pytest.mark.parametrize('mut', [
+    sut.authorize_update,
+    sut.authorize_delete,
+])
+def test_api_calls_fresh(mut: Callable[..., Any], tree_size: int):
+    api_client = CountingApiClient(tree_size)
+    context = create_context(api_client)
+
+    for _ in range(2):
+        api_client.calls.clear()
+        mut(context, 'assetpubid01-0')
+
+        assert max_calls(tree_size) >= sum(api_client.calls.values())
+
+@pytest.mark.parametrize('tree_size', TREE_SIZES)
+def test_api_calls_shared(tree_size: int):
+    api_client = CountingApiClient(tree_size)
+    context = create_context(api_client)
+
+    sut.authorize_list(context)
+    sut.list_documents(context, category='manuals')
+    sut.search_documents(context, 'manual')
+    sut.authorize_download(context, 'assetpubid01-0')
+
+    assert max_calls(tree_size) >= sum(api_client.calls.values())
+
+@pytest.mark.parametrize('tree_size', [0, 1, 10])
+def test_api_calls_list_batch(tree_size: int):
+    api_client = CountingApiClient(tree_size)
+    context = create_context(api_client)
+    asset_ids = [f'assetpubid{index:02}' for index in range(50)]
+
+    sut.authorize_list_batch(context, asset_ids)
+
+    # The access check, the descendants per asset and the app configs of
+    # all trees at once
+    assert (
+        1 + len(asset_ids) + math.ceil(len(asset_ids) * (tree_size + 1) / sut.APP_CONFIG_CHUNK_SIZE)
+    ) >= sum(api_client.calls.values())
+
+    api_client.calls.clear()
+    sut.authorize_list_batch(context, asset_ids)
+
+    assert {'AssetList': 1} == api_client.calls
+
+def test__parse_asset_meta_time():
+    mut = sut._parse_asset_meta
+
+    app_config = sut.AssetAppResult(
+        values=create_objects('assetpubid01', 10000),
+        stateValues=create_objects('assetpubid01-state', 10000),
+    )
+
+    assert 20000 == len(mut(app_config))
+    assert PARSE_BUDGET >= best_time(lambda: mut(app_config))
+
+def test__create_multi_response_time():
+    mut = sut._create_multi_response
+
+    context = create_context(CountingApiClient(999, objects_per_asset=20))
+    resources = sut._list_resources(context)
+    assert resources
+
+    def create() -> None:
+        sut.cache.clear_all()
+        sut.api.LIMITER.reset()
+        mut(context, resources)
+
+    assert 1000 + 20000 == len(mut(context, resources)['data'])
+    assert LIST_BUDGET >= best_time(create)
+    assert CACHED_LIST_BUDGET >= best_time(lambda: mut(context, resources))
@@ -0,0 +1,129 @@
+import os
+import sys
+import threading
+import time
+from unittest import mock
+
+from functions.ayayot import metrics, profiling as sut
+
+def outer(event: threading.Event | None = None) -> str | None:
+    return inner(event)
+
+def inner(event: threading.Event | None) -> str | None:
+    if event is not None:
+        event.wait(5)
+        return None
+
+    return sut.collapse(sys._getframe(), outer.__code__)
+
+def test_collapse():
+    mut = outer
+
+    assert f'{__name__}.outer;{__name__}.inner' == mut()
+
+def test_collapse_no_root():
+    mut = sut.collapse
+
+    assert None is mut(sys._getframe(), outer.__code__)
+
+@mock.patch.object(sut.StackSampler, '_start', autospec=True)
+def test_StackSampler_sample(_start: mock.Mock):
+    sampler = sut.StackSampler(interval=0.01, max_stacks=1)
+    mut = sampler.sample
+
+    with sampler.track(test_StackSampler_sample.__wrapped__.__code__):  # type: ignore[attr-defined]
+        mut()
+        mut()
+
+    with sampler.track(outer.__code__):
+        mut()
+
+    mut()
+
+    assert [mock.call(sampler)] * 2 == _start.call_args_list
+    assert 2 == sampler.samples()
+    assert (
+        f'{__name__}.test_StackSampler_sample;functions.ayayot.profiling.StackSampler.sample 2\n'
+        == sampler.collapsed()
+    )
+
+@mock.patch.object(sut.StackSampler, '_start', autospec=True)
+def test_StackSampler_sample_truncated(_start: mock.Mock):
+    sampler = sut.StackSampler(interval=0.01, max_stacks=1)
+    mut = sampler.sample
+
+    sampler._stacks['other'] = 1
+
+    with sampler.track(test_StackSampler_sample_truncated.__wrapped__.__code__):  # type: ignore[attr-defined]
+        mut()
+
+    assert '[truncated] 1\nother 1\n' == sampler.collapsed()
+
+    sampler.reset()
+
+    assert '' == sampler.collapsed()
+
+def test_StackSampler_thread():
+    sampler = sut.StackSampler(interval=0.001, max_stacks=10)
+    event = threading.Event()
+
+    with sampler.track(outer.__code__):
+        thread = threading.Thread(target=lambda: time.sleep(0.05) or event.set())
+        thread.start()
+        outer(event)
+        thread.join()
+
+    with sampler.track(outer.__code__):
+        pass
+
+    assert sampler.samples() > 0
+    assert f'{__name__}.outer;{__name__}.inner' in sampler.collapsed()
+
+def test_StackSampler_write(tmp_path):
+    sampler = sut.StackSampler(interval=0.01, max_stacks=10)
+    mut = sampler.write
+
+    sampler._stacks['a;b'] = 2
+
+    output = mut(str(tmp_path / 'profiles'))
+
+    assert str(tmp_path / 'profiles' / f'profile-{os.getpid()}.folded') == output
+    with open(output, encoding='utf-8') as file:
+        assert 'a;b 2\n' == file.read()
+    assert ['profile-{}.folded'.format(os.getpid())] == os.listdir(tmp_path / 'profiles')
+
+@mock.patch('functions.ayayot.profiling.SAMPLER', autospec=True)
+def test_profiled_disabled(SAMPLER: mock.Mock):
+    mut = sut.profiled(outer)
+
+    with mock.patch('functions.ayayot.profiling.SAMPLE_RATE', 0.0):
+        assert f'{__name__}.outer;{__name__}.inner' == mut()
+
+    assert [] == SAMPLER.track.call_args_list
+    assert 'outer' == mut.__name__
+
+@mock.patch('functions.ayayot.profiling._write', autospec=True)
+@mock.patch('functions.ayayot.profiling.SAMPLER', autospec=True)
+def test_profiled(SAMPLER: mock.Mock, _write: mock.Mock):
+    mut = sut.profiled(outer)
+
+    with mock.patch('functions.ayayot.profiling.SAMPLE_RATE', 1.0), \
+            mock.patch('functions.ayayot.profiling.OUTPUT_DIR', '/tmp/profiles'):
+        assert f'{__name__}.outer;{__name__}.inner' == mut()
+
+    with mock.patch('functions.ayayot.profiling.SAMPLE_RATE', 1.0):
+        mut()
+
+    assert [mock.call(outer.__code__)] * 2 == SAMPLER.track.call_args_list
+    assert [mock.call('/tmp/profiles')] == _write.call_args_list
+    assert {'profile.calls': 2.0} == metrics.snapshot()
+
+@mock.patch('functions.ayayot.profiling.SAMPLER', autospec=True)
+def test__write(SAMPLER: mock.Mock):
+    mut = sut._write
+
+    SAMPLER.write.side_effect = OSError
+
+    mut('/tmp/profiles')
+
+    assert [mock.call('/tmp/profiles')] == SAMPLER.write.call_args_list
@@ -0,0 +1,139 @@
+from unittest import mock
+
+import pytest
+
+from functions.ayayot import ratelimit as sut
+
+@pytest.mark.parametrize('value,expected', [
+    pytest.param('10', sut.Limit(10, 10), id='rate'),
+    pytest.param('10/25', sut.Limit(10, 25), id='rate-burst'),
+    pytest.param('ten', None, id='invalid'),
+])
+def test_Limit_parse(value: str, expected: sut.Limit | None):
+    mut = sut.Limit.parse
+
+    assert expected == mut(value)
+
+def test_parse_limits():
+    mut = sut.parse_limits
+
+    output = mut(' AssetDescendantList=10/20, AssetAppConfigList = 5 ,=1,Broken=x,')
+
+    assert {
+        'AssetDescendantList': sut.Limit(10, 20),
+        'AssetAppConfigList': sut.Limit(5, 5),
+    } == output
+
+@mock.patch('functions.ayayot.ratelimit.time.monotonic', autospec=True)
+def test_TokenBucket_reserve(monotonic: mock.Mock):
+    monotonic.return_value = 100
+    bucket = sut.TokenBucket(sut.Limit(rate=2, burst=2))
+
+    assert 0 == bucket.reserve()
+    assert 0 == bucket.reserve()
+    assert 0.5 == bucket.reserve()
+    assert 1.0 == bucket.reserve()
+
+    # Refills at the rate, up to the burst
+    monotonic.return_value = 110
+    assert 0 == bucket.reserve()
+    assert 0 == bucket.reserve()
+    assert 0.5 == bucket.reserve()
+
+def test_TokenBucket_reserve_unlimited():
+    bucket = sut.TokenBucket(sut.Limit(rate=0, burst=0))
+
+    assert [0.0] * 3 == [bucket.reserve() for _ in range(3)]
+
+def test_TokenBucket_adapts_rate():
+    bucket = sut.TokenBucket(sut.Limit(rate=10, burst=10))
+
+    bucket.slow_down()
+    assert 5 == bucket.rate
+
+    for _ in range(4):
+        bucket.slow_down()
+    assert 1 == bucket.rate
+
+    bucket.speed_up()
+    assert 2 == bucket.rate
+
+    for _ in range(20):
+        bucket.speed_up()
+    assert 10 == bucket.rate
+
+def test_RateLimiter_bucket():
+    limiter = sut.RateLimiter(
+        sut.Limit(20, 40),
+        {'AssetAppConfigList': sut.Limit(5, 10)},
+    )
+
+    bucket = limiter.bucket('AssetAppConfigList')
+
+    assert bucket is limiter.bucket('AssetAppConfigList')
+    assert sut.Limit(5, 10) == bucket.limit
+    assert sut.Limit(20, 40) == limiter.bucket('AssetDescendantList').limit
+
+    limiter.reset()
+
+    assert bucket is not limiter.bucket('AssetAppConfigList')
+
+@mock.patch('functions.ayayot.ratelimit.time.sleep', autospec=True)
+def test_RateLimiter_acquire(sleep: mock.Mock):
+    limiter = sut.RateLimiter(sut.Limit(1, 1), {})
+
+    assert 0 == limiter.acquire('AssetDescendantList')
+    delay = limiter.acquire('AssetDescendantList')
+
+    assert 0 < delay <= 1
+    assert [mock.call(delay)] == sleep.call_args_list
+
+@mock.patch('functions.ayayot.deadline.remaining', autospec=True)
+@mock.patch('functions.ayayot.ratelimit.time.sleep', autospec=True)
+def test_RateLimiter_acquire_deadline(sleep: mock.Mock, remaining: mock.Mock):
+    limiter = sut.RateLimiter(sut.Limit(1, 1), {})
+
+    remaining.return_value = 0.5
+
+    assert 0 == limiter.acquire('AssetDescendantList')
+
+    # No time would be left after waiting, so the token is returned
+    with pytest.raises(sut.deadline.DeadlineExceeded):
+        limiter.acquire('AssetDescendantList')
+    with pytest.raises(sut.deadline.DeadlineExceeded):
+        limiter.acquire('AssetDescendantList')
+
+    assert [] == sleep.call_args_list
+
+    remaining.return_value = 5.0
+    delay = limiter.acquire('AssetDescendantList')
+
+    assert 0 < delay <= 1
+    assert [mock.call(delay)] == sleep.call_args_list
+
+def test_TokenBucket_cancel():
+    bucket = sut.TokenBucket(sut.Limit(rate=1, burst=1))
+    unlimited = sut.TokenBucket(sut.Limit(rate=0, burst=0))
+
+    bucket.reserve()
+    bucket.cancel()
+    bucket.cancel()
+    unlimited.cancel()
+
+    # Not refilled beyond the burst
+    assert 0 == bucket.reserve()
+    assert 0 < bucket.reserve()
+    assert 0 == unlimited.reserve()
+
+@pytest.mark.parametrize('attempt,cap,upper', [
+    (0, 10.0, 0.5),
+    (3, 10.0, 4.0),
+    (10, 10.0, 10.0),
+])
+def test_backoff_delay(attempt: int, cap: float, upper: float):
+    mut = sut.backoff_delay
+
+    with mock.patch.object(sut._random, 'uniform', autospec=True) as uniform:
+        assert uniform.return_value is mut(attempt, 0.5, cap)
+
+    assert [mock.call(0, upper)] == uniform.call_args_list
@@ -0,0 +1,155 @@
+import json
+from typing import Any
+from unittest import mock
+
+import pytest
+
+from functions.ayayot import recording as sut
+
+@pytest.mark.parametrize('text,expected', [
+    ('Manual 2 (EN).pdf', 'xxxxxx 2 (xx).xxx'),
+    ('Überblick_10', 'xxxxxxxxx_10'),
+    ('', ''),
+])
+def test_mask(text: str, expected: str):
+    assert expected == sut.mask(text)
+
+def test_Recorder_pseudonym():
+    mut = sut.Recorder('recording.jsonl')
+
+    pseudonym = mut.pseudonym('asset01')
+
+    assert 12 == len(pseudonym)
+    assert 'asset01' != pseudonym
+    assert pseudonym == mut.pseudonym('asset01')
+    assert pseudonym != mut.pseudonym('asset02')
+
+    # Other recordings have other pseudonyms
+    assert pseudonym != sut.Recorder('recording.jsonl').pseudonym('asset01')
+
+def test_Recorder_sanitise():
+    mut = sut.Recorder('recording.jsonl')
+    p = mut.pseudonym
+
+    values = json.dumps([
+        {'id': 'uuid1', 'name': 'Manual 1.pdf', 'order': 2, 'type': 'pdf', 'category': 'manuals'},
+        'not an object',
+    ])
+
+    output = mut.sanitise({
+        'endpoint': 'AssetAppConfigList',
+        'url_args': None,
+        'query': {
+            'filters': ['eq(app.publicId,"template01")', 'in(asset.publicId,"asset01","asset02")'],
+            'fields': 'asset.publicId,values,stateValues',
+        },
+        'seconds': 0.5,
+        'response': {'status': 'success', 'data': [
+            {'asset': {'publicId': 'asset01'}, 'values': values, 'stateValues': 'not json'},
+            {'asset': {'publicId': 'asset02'}, 'values': '{"id": "uuid2"}', 'stateValues': None},
+        ]},
+    })
+
+    assert {
+        'endpoint': 'AssetAppConfigList',
+        'url_args': None,
+        'query': {
+            'filters': [
+                f'eq(app.publicId,"{p("template01")}")',
+                f'in(asset.publicId,"{p("asset01")}","{p("asset02")}")',
+            ],
+            'fields': 'asset.publicId,values,stateValues',
+        },
+        'seconds': 0.5,
+        'response': {'status': 'success', 'data': [
+            {
+                'asset': {'publicId': p('asset01')},
+                'values': json.dumps([
+                    {
+                        'id': 'uuid1',
+                        'name': 'xxxxxx 1.xxx',
+                        'order': 2,
+                        'type': 'pdf',
+                        'category': 'manuals',
+                    },
+                    'not an object',
+                ]),
+                'stateValues': 'xxx xxxx',
+            },
+            {'asset': {'publicId': p('asset02')}, 'values': '{"xx": "xxxx2"}', 'stateValues': None},
+        ]},
+    } == output
+
+def test_Recorder_sanitise_descendants():
+    mut = sut.Recorder('recording.jsonl')
+    p = mut.pseudonym
+
+    output = mut.sanitise({
+        'endpoint': 'AssetDescendantList',
+        'url_args': {'publicId': 'asset01', 'fields': 'publicId,name'},
+        'query': {'fields': 'publicId'},
+        'seconds': 0.5,
+        'response': {'status': 'success', 'data': [
+            {'publicId': 'asset02', 'name': 'Pump 2'},
+            'not an object',
+        ]},
+    })
+
+    assert {
+        'endpoint': 'AssetDescendantList',
+        'url_args': {'publicId': p('asset01'), 'fields': 'publicId,name'},
+        'query': {'fields': 'publicId'},
+        'seconds': 0.5,
+        'response': {'status': 'success', 'data': [
+            {'publicId': p('asset02'), 'name': 'xxxx 2'},
+            'not an object',
+        ]},
+    } == output
+
+@pytest.mark.parametrize('response', [
+    pytest.param({'type': 'Error', 'data': None}, id='no-data'),
+    pytest.param(None, id='no-response'),
+])
+def test_Recorder_sanitise_error(response: Any):
+    mut = sut.Recorder('recording.jsonl')
+
+    call = {'endpoint': 'AssetAppConfigList', 'url_args': {}, 'query': None, 'response': response}
+
+    assert call == mut.sanitise(call)
+
+def test_Recorder_record(tmp_path: Any):
+    path = tmp_path / 'recording.jsonl'
+    mut = sut.Recorder(str(path))
+
+    response = {'status': 'success', 'data': []}
+
+    mut.record('AssetDescendantList', (({'publicId': 'asset01'},), {}), 0.25, response)
+    mut.record('AssetAppConfigList', ((), {'query': {'fields': 'values'}, 'timeout': 1.0}), 0.5, response)
+    mut.record('AssetList', ((), {}), 0.5, response)
+
+    assert [
+        {
+            'endpoint': 'AssetDescendantList',
+            'url_args': {'publicId': mut.pseudonym('asset01')},
+            'query': None,
+            'seconds': 0.25,
+            'response': response,
+        },
+        {
+            'endpoint': 'AssetAppConfigList',
+            'url_args': None,
+            'query': {'fields': 'values'},
+            'seconds': 0.5,
+            'response': response,
+        },
+    ] == [json.loads(line) for line in path.read_text().splitlines()]
+
+@mock.patch('functions.ayayot.recording.logger', autospec=True)
+def test_Recorder_record_error(logger: mock.Mock, tmp_path: Any):
+    mut = sut.Recorder(str(tmp_path))
+
+    mut.record('AssetDescendantList', ((None, {'fields': 'values'}), {}), 0.25, {})
+
+    assert [
+        mock.call('Failed to record a call to %s', 'AssetDescendantList')
+    ] == logger.exception.call_args_list
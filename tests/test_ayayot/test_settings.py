@@ -0,0 +1,50 @@
+from unittest import mock
+
+import pytest
+
+from functions.ayayot import settings as sut
+
+@pytest.mark.parametrize('environ,expected', [
+    pytest.param({}, 1.5, id='unset'),
+    pytest.param({'OBJECTSTORAGE_SETTING': ' '}, 1.5, id='blank'),
+    pytest.param({'OBJECTSTORAGE_SETTING': 'abc'}, 1.5, id='invalid'),
+    pytest.param({'OBJECTSTORAGE_SETTING': ' 2.5 '}, 2.5, id='valid'),
+])
+def test_get_float(environ: dict[str, str], expected: float):
+    mut = sut.get_float
+
+    with mock.patch.dict('os.environ', environ, clear=True):
+        assert expected == mut('SETTING', 1.5)
+
+@pytest.mark.parametrize('environ,expected', [
+    pytest.param({}, 3, id='unset'),
+    pytest.param({'OBJECTSTORAGE_SETTING': '2.5'}, 3, id='invalid'),
+    pytest.param({'OBJECTSTORAGE_SETTING': '7'}, 7, id='valid'),
+])
+def test_get_int(environ: dict[str, str], expected: int):
+    mut = sut.get_int
+
+    with mock.patch.dict('os.environ', environ, clear=True):
+        assert expected == mut('SETTING', 3)
+
+@pytest.mark.parametrize('environ,default,expected', [
+    pytest.param({}, True, True, id='unset'),
+    pytest.param({'OBJECTSTORAGE_SETTING': 'Yes'}, False, True, id='yes'),
+    pytest.param({'OBJECTSTORAGE_SETTING': '1'}, False, True, id='one'),
+    pytest.param({'OBJECTSTORAGE_SETTING': 'off'}, True, False, id='off'),
+])
+def test_get_bool(environ: dict[str, str], default: bool, expected: bool):
+    mut = sut.get_bool
+
+    with mock.patch.dict('os.environ', environ, clear=True):
+        assert expected is mut('SETTING', default)
+
+@pytest.mark.parametrize('environ,expected', [
+    pytest.param({}, 'default', id='unset'),
+    pytest.param({'OBJECTSTORAGE_SETTING': ' value '}, 'value', id='set'),
+])
+def test_get_str(environ: dict[str, str], expected: str):
+    mut = sut.get_str
+
+    with mock.patch.dict('os.environ', environ, clear=True):
+        assert expected == mut('SETTING', 'default')
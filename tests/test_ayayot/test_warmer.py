@@ -0,0 +1,141 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from unittest import mock
+
+from functions.ayayot import cache, warmer as sut
+from functions.ayayot.documents import ObjectIndex
+
+def create_warmer(**kwargs) -> sut.CacheWarmer:
+    config = {
+        'enabled': True,
+        'top_n': 2,
+        'lead_time': 5.0,
+        'concurrency': 1,
+        'rate': 0.0,
+        'interval': 0.01,
+        'client_max_age': 60.0,
+        **kwargs,
+    }
+
+    return sut.CacheWarmer(sut.WarmerConfig(**config))
+
+@mock.patch('functions.ayayot.warmer.CacheWarmer.start', autospec=True)
+def test_CacheWarmer_record(start: mock.Mock):
+    warmer = create_warmer()
+
+    warmer.record('scope01', 'asset01', 'template01', mock.sentinel.refresh1)
+    warmer.record('scope01', 'asset01', 'template01', mock.sentinel.refresh2)
+    warmer.record('scope01', 'asset02', 'template01', mock.sentinel.refresh3)
+    warmer.record('scope02', 'asset01', 'template01', mock.sentinel.refresh4)
+
+    due = warmer._targets
+
+    assert 2 == due[('scope01', 'asset01', 'template01')].hits
+    assert mock.sentinel.refresh2 is due[('scope01', 'asset01', 'template01')].refresh
+    assert 1 == due[('scope01', 'asset02', 'template01')].hits
+    # Another caller refreshes the pair with its own client
+    assert mock.sentinel.refresh4 is due[('scope02', 'asset01', 'template01')].refresh
+
+    assert [mock.call(warmer)] * 4 == start.call_args_list
+
+@mock.patch('functions.ayayot.warmer.CacheWarmer.start', autospec=True)
+def test_CacheWarmer_record_disabled(start: mock.Mock):
+    warmer = create_warmer(enabled=False)
+
+    warmer.record('scope01', 'asset01', 'template01', mock.sentinel.refresh)
+
+    assert [] == warmer.due(0)
+    assert [] == start.call_args_list
+
+@mock.patch('functions.ayayot.warmer.cache.asset_tree_expires_at', autospec=True)
+@mock.patch('functions.ayayot.warmer.time.monotonic', autospec=True)
+@mock.patch('functions.ayayot.warmer.CacheWarmer.start', autospec=True)
+def test_CacheWarmer_due(
+        start: mock.Mock,
+        monotonic: mock.Mock,
+        asset_tree_expires_at: mock.Mock,
+    ):
+    del start
+
+    warmer = create_warmer()
+
+    monotonic.return_value = 0
+    warmer.record('scope01', 'stale', 'template01', mock.sentinel.stale)
+
+    monotonic.return_value = 50
+    for _ in range(3):
+        warmer.record('scope01', 'hot', 'template01', mock.sentinel.hot)
+    for _ in range(2):
+        warmer.record('scope01', 'fresh', 'template01', mock.sentinel.fresh)
+    warmer.record('scope01', 'cold', 'template01', mock.sentinel.cold)
+
+    asset_tree_expires_at.side_effect = lambda _, asset_id, __: {
+        'hot': 104,
+        'fresh': 200,
+    }.get(asset_id)
+
+    output = warmer.due(100)
+
+    assert [('scope01', 'hot', 'template01')] == [key for key, _ in output]
+    assert 1.5 == output[0][1].hits
+
+    # The stale pair is dropped, the cold one falls outside of the top 2
+    assert [
+        mock.call('scope01', 'hot', 'template01'),
+        mock.call('scope01', 'fresh', 'template01'),
+    ] == asset_tree_expires_at.call_args_list
+
+@mock.patch('functions.ayayot.warmer.CacheWarmer.due', autospec=True)
+def test_CacheWarmer_run_once(due: mock.Mock):
+    warmer = create_warmer(rate=1000.0)
+
+    refresh1 = mock.Mock()
+    refresh2 = mock.Mock(side_effect=RuntimeError)
+
+    due.return_value = [
+        (('scope01', 'asset01', 'template01'), sut.WarmTarget(1, refresh1, 0)),
+        (('scope01', 'asset02', 'template01'), sut.WarmTarget(1, refresh2, 0)),
+    ]
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert 2 == warmer.run_once(executor)
+
+    assert [mock.call()] == refresh1.call_args_list
+    assert [mock.call()] == refresh2.call_args_list
+
+@mock.patch('functions.ayayot.warmer.CacheWarmer.due', autospec=True)
+def test_CacheWarmer_run_once_stopped(due: mock.Mock):
+    warmer = create_warmer(rate=1.0)
+    warmer._stop.set()
+
+    refresh = mock.Mock()
+
+    due.return_value = [
+        (('scope01', 'asset01', 'template01'), sut.WarmTarget(1, refresh, 0)),
+        (('scope01', 'asset02', 'template01'), sut.WarmTarget(1, refresh, 0)),
+    ]
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert 1 == warmer.run_once(executor)
+
+    assert [mock.call()] == refresh.call_args_list
+
+def test_CacheWarmer_start_stop():
+    warmer = create_warmer()
+
+    refreshed = threading.Event()
+
+    def refresh() -> None:
+        cache.DESCENDANTS.set(('scope01', 'asset01'), ())
+        cache.APP_CONFIG_OBJECTS.set(('scope01', 'template01', ('asset01',)), ObjectIndex.build(()))
+        refreshed.set()
+
+    warmer.record('scope01', 'asset01', 'template01', refresh)
+    warmer.start()
+
+    assert refreshed.wait(5)
+
+    warmer.stop()
+    warmer.stop()
+
+    assert None is warmer._thread
@@ -0,0 +1,38 @@
+import os
+from unittest import mock
+
+from ixoncdkingress.function.caller import call_function
+from ixoncdkingress.function.context import FunctionContext
+from ixoncdkingress.webserver.config import Config
+from ixoncdkingress.webserver.response import Response
+from ixoncdkingress.webserver.utils import parse_function_location
+
+from tools import prefork as sut
+
+CBC_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'functions',
+)
+"""
+The CBC path of `make run`, from which the function module can be imported
+under another name than the one in the function path
+"""
+
+def test_warm():
+    mut = sut.warm
+
+    config = mock.create_autospec(spec=Config, instance=True)
+    config.cbc_path = CBC_PATH
+    config.production_mode = True
+
+    module = mut(config, sut.FUNCTION)
+
+    context = mock.create_autospec(spec=FunctionContext, instance=True)
+    response = mock.create_autospec(spec=Response, instance=True)
+
+    with mock.patch.object(module, 'authorize_list', autospec=True) as authorize_list:
+        authorize_list.exposed = True
+        output = call_function(config, context, parse_function_location(sut.FUNCTION), {}, response)
+
+    assert authorize_list.return_value is output
+    assert [mock.call(context)] == authorize_list.call_args_list
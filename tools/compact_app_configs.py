@@ -0,0 +1,69 @@
+"""
+Compacts the values and state values of the app configs of all assets of a
+template, which every request for documents fetches and decodes
+
+Fields without a value and repeated entries are removed. When a listing of
+the object storage is given, with the key of an object on every line, the
+entries of the objects that are not in it are removed too. Take the listing
+while no documents are uploaded, as the entries of documents uploaded after
+it would be removed.
+
+Nothing is written unless --write is given. The IXON API is reached with the
+`IXON_API_*` settings that are also used to deploy.
+
+Usage: python tools/compact_app_configs.py TEMPLATE [--listing FILE] [--write]
+    [--batch-size N] [--concurrency N]
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable-next=wrong-import-position
+from functions.ayayot import maintenance
+
+def main() -> None:
+    """
+    Runs the compaction and prints the report
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('template')
+    parser.add_argument('--listing', help='listing of the object storage, one key per line')
+    parser.add_argument('--write', action='store_true', help='write the compacted app configs')
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    exists = None
+    if args.listing:
+        with open(args.listing, encoding='utf-8') as file:
+            listed = frozenset(object_id for _, object_id in maintenance.parse_listing(file))
+        if not listed:
+            sys.exit(f'No objects found in {args.listing}, refusing to remove all entries')
+        exists = listed.__contains__
+
+    report = maintenance.compact_app_configs(
+        maintenance.create_api_client(),
+        args.template,
+        exists,
+        maintenance.CompactionOptions(
+            dry_run=not args.write,
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+        ),
+    )
+
+    print(f'app configs: {report.configs}, changed: {report.changed}')
+    print(f'entries removed: {report.removed}')
+    print(f'size of the changed app configs: {report.bytes_before} -> {report.bytes_after} bytes')
+    if args.write:
+        print(f'written: {report.written}, skipped: {report.skipped}, failed: {report.failed}')
+    else:
+        print('dry run, pass --write to write the compacted app configs')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Serves the cloud functions with several worker processes, forked from a
+process that imported and warmed the function module
+
+The workers share the imported modules copy-on-write, and accept calls on
+the same socket, so calls are spread over all cores. The cached lookups are
+not preloaded, as they are scoped to the caller that looked them up, so
+every worker fills its caches with the calls it handles.
+
+Every worker keeps its own caches and metrics, `get_metrics` returns those
+of the worker handling the call. The workers share their cached lookups, and
+the invalidations by `invalidate_documents`, through the cache backend. When
+none is configured, they share a SQLite backend in a temporary directory, so
+no worker serves an invalidated lookup for longer than the sync interval of
+the caches. The ingress is configured through the environment as with
+`make run`. In development mode it reloads the function
+module on every call, so warming only pays off in production mode.
+
+Only available where processes can be forked, such as Linux and macOS.
+
+Usage: python tools/prefork.py [--workers N] [--function FUNCTION]
+"""
+import argparse
+import functools
+import gc
+import importlib
+import logging
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+from types import ModuleType
+from typing import NoReturn
+import wsgiref.simple_server
+
+from ixoncdkingress.webserver import wsgi
+from ixoncdkingress.webserver.config import Config, get_config
+from ixoncdkingress.webserver.servlet import Servlet
+from ixoncdkingress.webserver.utils import parse_function_location
+
+logger = logging.getLogger(__name__)
+
+FUNCTION = 'functions.ayayot.objectstorage_v1.authorize_list'
+"""
+The path of a function as the component calls it, of which the module is
+warmed
+"""
+
+def warm(config: Config, function: str) -> ModuleType:
+    """
+    Imports the module of the function with the given path from the CBC
+    path, as the ingress does on the first call, so the workers are forked
+    with the module that serves the calls
+
+    The module name is parsed from the path as the ingress parses it, as the
+    same file imported under another name is another module.
+    """
+    name, _ = parse_function_location(function)
+
+    sys.path.insert(0, config.cbc_path)
+    try:
+        return importlib.import_module(name)
+    finally:
+        del sys.path[0]
+
+def serve(httpd: wsgiref.simple_server.WSGIServer, module: ModuleType, backend: str) -> NoReturn:
+    """
+    Serves calls in a forked worker until it is terminated
+    """
+    # The connections of the cache backend are not shared with the other
+    # workers, every worker makes its own
+    module.cache.use_backend(module.cache.backends.create(backend))
+
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+    os._exit(0)
+
+def fork(httpd: wsgiref.simple_server.WSGIServer, module: ModuleType, backend: str) -> int:
+    """
+    Forks a worker serving calls, and returns its process ID
+    """
+    if (pid := os.fork()) == 0:
+        serve(httpd, module, backend)
+
+    return pid
+
+def supervise(
+    httpd: wsgiref.simple_server.WSGIServer,
+    module: ModuleType,
+    backend: str,
+    count: int,
+) -> None:
+    """
+    Forks the given amount of workers, and replaces the ones that exit until
+    the server is terminated
+    """
+    workers = {fork(httpd, module, backend) for _ in range(max(count, 1))}
+    logger.info(
+        'Listening on http://%s:%s/ with %d workers', *httpd.server_address[:2], len(workers),
+    )
+
+    try:
+        while True:
+            pid, status = os.wait()
+            if pid in workers:
+                workers.remove(pid)
+                logger.warning('Worker %d exited with status %d, replacing it', pid, status)
+                # Keeps a worker that fails right away from being forked in a loop
+                time.sleep(1.0)
+                workers.add(fork(httpd, module, backend))
+    except KeyboardInterrupt:
+        logger.info('Stopping %d workers', len(workers))
+
+    for pid in workers:
+        try:
+            os.kill(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
+        except (ChildProcessError, ProcessLookupError):
+            pass
+
+    httpd.server_close()
+
+def main() -> None:
+    """
+    Warms the function module, and serves calls with forked workers sharing
+    a cache backend until the server is terminated
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--function', default=FUNCTION)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    # The ingress is run with `python -m`, which puts the working directory
+    # first on the path rather than the directory of the script, so the
+    # function paths are resolved here as they are there
+    sys.path[0] = os.getcwd()
+
+    config = get_config()
+    if not config.production_mode:
+        logger.warning('Not in production mode, the function module is reloaded on every call')
+
+    httpd = wsgiref.simple_server.make_server(
+        config.http_server_bind,
+        config.http_server_port,
+        functools.partial(wsgi.restapi_wsgi, config, Servlet(config)),
+    )
+
+    module = warm(config, args.function)
+
+    # Without a backend, a worker would not know of the invalidations by
+    # the others until its cached lookups expire
+    backend_dir = None
+    if not (backend := module.settings.get_str('CACHE_BACKEND', '')):
+        backend_dir = tempfile.mkdtemp(prefix='objectstorage-cache-')
+        backend = f'sqlite://{os.path.join(backend_dir, "cache.sqlite")}'
+        logger.info('No cache backend configured, sharing the caches through %s', backend)
+
+    # Threads are not forked along, so the process pool may not be running,
+    # and the warm objects are kept out of the garbage collector so it does
+    # not touch, and thereby copy, their pages in every worker
+    module.decoding.shutdown()
+    gc.collect()
+    gc.freeze()
+
+    signal.signal(signal.SIGTERM, wsgi.raise_ki_on_signal)
+
+    try:
+        supervise(httpd, module, backend, args.workers)
+    finally:
+        if backend_dir is not None:
+            shutil.rmtree(backend_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
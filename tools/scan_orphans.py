@@ -0,0 +1,70 @@
+"""
+Finds the objects in the object storage that no app config of the template
+references anymore, and reports or deletes them
+
+The listing of the object storage has the key of an object on every line.
+Take it before running the scan: objects uploaded after the app configs
+were read would be reported otherwise.
+
+The keys of the orphaned objects are printed, one per line. They are only
+deleted when a delete command is given, which is run with a batch of keys as
+its arguments, such as `aws s3 rm` in a loop or `s3cmd del`. The IXON API is
+reached with the `IXON_API_*` settings that are also used to deploy.
+
+Usage: python tools/scan_orphans.py TEMPLATE LISTING [--delete-command CMD]
+    [--batch-size N] [--rate N]
+"""
+import argparse
+import logging
+import os
+import shlex
+import subprocess  # nosec B404
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable-next=wrong-import-position
+from functions.ayayot import maintenance
+
+def main() -> None:
+    """
+    Runs the scan and prints or deletes the orphaned objects
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('template')
+    parser.add_argument('listing', help='listing of the object storage, one key per line')
+    parser.add_argument('--delete-command', help='command deleting the keys given as arguments')
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--rate', type=float, default=1.0, help='batches deleted per second')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    referenced = maintenance.referenced_ids(maintenance.create_api_client(), args.template)
+    logging.info('%d objects are referenced by the app configs', len(referenced))
+
+    with open(args.listing, encoding='utf-8') as file:
+        orphans = maintenance.find_orphans(maintenance.parse_listing(file), referenced)
+
+        if not args.delete_command:
+            count = 0
+            for count, key in enumerate(orphans, 1):
+                print(key)
+            logging.info('%d orphaned objects found', count)
+            return
+
+        if not referenced:
+            sys.exit('No objects are referenced, refusing to delete all objects')
+
+        command = shlex.split(args.delete_command)
+
+        def delete(keys: list[str]) -> None:
+            subprocess.run([*command, *keys], check=True)  # nosec B603
+            for key in keys:
+                print(key)
+
+        deleted = maintenance.delete_in_batches(orphans, delete, args.batch_size, args.rate)
+        logging.info('%d orphaned objects deleted', deleted)
+
+if __name__ == '__main__':
+    main()